@@ -0,0 +1,186 @@
+"""
+Mock adb server speaking the smart-socket protocol on a local port.
+
+Implements the host services AdbClient uses (version, connect, get-state,
+forward, transport) and the device services shell:, exec:sh and sync: (SEND).
+Shell commands run in a local `sh` rooted at --root, and pushed files land
+under it, so the protocol path can be exercised without a device.
+
+    python -m stend.bench.fake_adb --port 5038 --device 127.0.0.1:5555
+"""
+import os
+import signal
+import struct
+import asyncio
+import argparse
+import tempfile
+from typing import Set
+
+
+class FakeAdbServer:
+    def __init__(self, root: str, devices: Set[str]):
+        self.root = root
+        self.devices = set(devices)
+        self.forwards = {}
+        self.requests = []
+
+    async def _read_request(self, reader) -> str:
+        length = int(await reader.readexactly(4), 16)
+        payload = (await reader.readexactly(length)).decode("utf-8")
+        self.requests.append(payload)
+        return payload
+
+    @staticmethod
+    def _okay(writer, payload=None):
+        writer.write(b"OKAY")
+        if payload is not None:
+            data = payload.encode("utf-8")
+            writer.write(b"%04x" % len(data) + data)
+
+    @staticmethod
+    def _fail(writer, message):
+        data = message.encode("utf-8")
+        writer.write(b"FAIL" + b"%04x" % len(data) + data)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            req = await self._read_request(reader)
+            if req == "host:version":
+                self._okay(writer, "0029")
+            elif req.startswith("host:connect:"):
+                target = req[len("host:connect:"):]
+                self.devices.add(target)
+                self._okay(writer, f"connected to {target}")
+            elif req.startswith("host-serial:"):
+                if req.endswith(":get-state"):
+                    serial = req[len("host-serial:"):-len(":get-state")]
+                    if serial in self.devices:
+                        self._okay(writer, "device")
+                    else:
+                        self._fail(writer, f"device '{serial}' not found")
+                elif ":forward:" in req:
+                    serial, rule = req[len("host-serial:"):].split(":forward:", 1)
+                    local, remote = rule.split(";", 1)
+                    self.forwards[local] = (serial, remote)
+                    writer.write(b"OKAYOKAY")
+                else:
+                    self._fail(writer, f"unsupported: {req}")
+            elif req.startswith("host:transport:"):
+                serial = req[len("host:transport:"):]
+                if serial not in self.devices:
+                    self._fail(writer, f"device '{serial}' not found")
+                else:
+                    self._okay(writer)
+                    await writer.drain()
+                    await self._device_service(await self._read_request(reader), reader, writer)
+            else:
+                self._fail(writer, f"unknown host service: {req}")
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _device_service(self, service: str, reader, writer):
+        if service.startswith("shell:"):
+            self._okay(writer)
+            proc = await asyncio.create_subprocess_shell(service[len("shell:"):], cwd=self.root, start_new_session=True,
+                                                         stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            try:
+                while True:
+                    chunk = await proc.stdout.read(4096)
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    await writer.drain()
+            finally:
+                await self._hang_up(proc)
+        elif service == "exec:sh":
+            self._okay(writer)
+            await writer.drain()
+            proc = await asyncio.create_subprocess_exec("sh", cwd=self.root, start_new_session=True, stdin=asyncio.subprocess.PIPE,
+                                                        stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+
+            async def pump_in():
+                while True:
+                    data = await reader.read(4096)
+                    if not data:
+                        break
+                    proc.stdin.write(data)
+                    await proc.stdin.drain()
+                proc.stdin.close()
+
+            async def pump_out():
+                while True:
+                    data = await proc.stdout.read(4096)
+                    if not data:
+                        break
+                    writer.write(data)
+                    await writer.drain()
+
+            feeder = asyncio.ensure_future(pump_in())
+            try:
+                await pump_out()
+            finally:
+                feeder.cancel()
+                await self._hang_up(proc)
+        elif service == "sync:":
+            self._okay(writer)
+            await self._sync(reader, writer)
+        else:
+            self._fail(writer, f"unsupported device service: {service}")
+
+    @staticmethod
+    async def _hang_up(proc):
+        # Like adbd closing the pty: the whole command (children included) goes, also on cancellation
+        if proc.returncode is None:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        await asyncio.shield(proc.wait())
+
+    async def _sync(self, reader, writer):
+        while True:
+            cmd = await reader.readexactly(4)
+            length = struct.unpack("<I", await reader.readexactly(4))[0]
+            if cmd == b"QUIT":
+                return
+            if cmd != b"SEND":
+                writer.write(b"FAIL" + struct.pack("<I", 7) + b"badcmd!")
+                return
+            spec = (await reader.readexactly(length)).decode("utf-8")
+            remote = spec.rsplit(",", 1)[0]
+            path = os.path.join(self.root, remote.lstrip("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                while True:
+                    kind = await reader.readexactly(4)
+                    size = struct.unpack("<I", await reader.readexactly(4))[0]
+                    if kind == b"DATA":
+                        f.write(await reader.readexactly(size))
+                    elif kind == b"DONE":
+                        break
+            writer.write(b"OKAY" + struct.pack("<I", 0))
+            await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=5038):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock adb server for protocol tests and benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5038)
+    parser.add_argument("--root", default=None, help="Directory standing in for the device filesystem")
+    parser.add_argument("--device", action="append", default=[], help="Serial reported as attached")
+    args = parser.parse_args()
+    root = args.root or tempfile.mkdtemp(prefix="stend-fake-adb-")
+    print(f"[FakeAdb] Listening on {args.host}:{args.port} (root: {root})")
+    asyncio.run(FakeAdbServer(root, set(args.device)).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+"""
+Local stand-in for the Iris Android subsystem.
+
+Serves /ws, /reply, /query, /aot, /dashboard/status and the /api/v1/* routes
+from an in-memory SQLite copy of the KakaoTalk tables, with configurable
+latency and error injection. Benchmark control lives under /_bench.
+
+    python -m stend.bench.fake_iris --port 3000 --latency-ms 5 --error-rate 0.01
+"""
+import re
+import json
+import time
+import random
+import sqlite3
+import asyncio
+import argparse
+import threading
+from typing import Dict, List, Optional, Set
+
+import uvicorn
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse
+
+app = FastAPI(title="Fake Iris")
+
+CONFIG = {"latency_ms": 0.0, "jitter_ms": 0.0, "error_rate": 0.0}
+
+SEQ_RE = re.compile(r"#(\d+)")
+
+
+class FakeKakaoDB:
+    """Just enough of the KakaoTalk schema for the proxy routes and log-id queries."""
+
+    def __init__(self, rooms=20, users=200):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.lock = threading.Lock()
+        self.conn.executescript("""
+            CREATE TABLE chat_logs (_id INTEGER PRIMARY KEY AUTOINCREMENT, id INTEGER, type INTEGER,
+                chat_id INTEGER, user_id INTEGER, message TEXT, attachment TEXT, created_at INTEGER, v TEXT);
+            CREATE INDEX chat_logs_chat ON chat_logs(chat_id, _id);
+            CREATE TABLE chat_rooms (id INTEGER PRIMARY KEY, type TEXT, active_member_count INTEGER,
+                last_log_id INTEGER, private_meta TEXT);
+            CREATE TABLE friends (id INTEGER PRIMARY KEY, name TEXT, profile_image_url TEXT, enc INTEGER);
+        """)
+        self.conn.executemany("INSERT INTO chat_rooms VALUES (?, 'OM', ?, 0, ?)",
+                              [(1000 + r, users // rooms, json.dumps({"name": f"Room {r}"})) for r in range(rooms)])
+        self.conn.executemany("INSERT INTO friends VALUES (?, ?, '', 0)",
+                              [(5000 + u, f"User {u}") for u in range(users)])
+        self.rooms = [1000 + r for r in range(rooms)]
+        self.users = [5000 + u for u in range(users)]
+        self.next_log_id = 1
+
+    def insert_log(self, chat_id, user_id, message) -> Dict[str, str]:
+        with self.lock:
+            log_id = self.next_log_id
+            self.next_log_id += 1
+            now = int(time.time())
+            cur = self.conn.execute(
+                "INSERT INTO chat_logs (id, type, chat_id, user_id, message, attachment, created_at, v) "
+                "VALUES (?, 1, ?, ?, ?, '{}', ?, '{}')", (log_id, chat_id, user_id, message, now))
+            self.conn.execute("UPDATE chat_rooms SET last_log_id = ? WHERE id = ?", (log_id, chat_id))
+            return {"_id": str(cur.lastrowid), "id": str(log_id), "type": "1", "chat_id": str(chat_id),
+                    "user_id": str(user_id), "message": message, "attachment": "{}",
+                    "created_at": str(now), "v": "{}"}
+
+    def query(self, sql, binds=()) -> List[Dict[str, str]]:
+        with self.lock:
+            cur = self.conn.execute(sql, list(binds))
+            cols = [d[0] for d in cur.description] if cur.description else []
+            rows = cur.fetchall()
+            self.conn.commit()
+        return [{c: (None if v is None else str(v)) for c, v in zip(cols, row)} for row in rows]
+
+
+db = FakeKakaoDB()
+
+
+class BenchState:
+    def __init__(self):
+        self.clients: Set[WebSocket] = set()
+        self.sent_at: Dict[int, float] = {}
+        self.latencies: List[float] = []
+        self.replies = 0
+        self.next_seq = 1
+        self.injecting = False
+        # Event-stream connections are refused until this time (simulated outage)
+        self.refuse_until = 0.0
+
+    def reset(self):
+        self.sent_at.clear()
+        self.latencies.clear()
+        self.replies = 0
+
+
+bench = BenchState()
+
+
+@app.middleware("http")
+async def inject_faults(request: Request, call_next):
+    if request.url.path.startswith("/_bench"):
+        return await call_next(request)
+    delay = CONFIG["latency_ms"] + random.uniform(0, CONFIG["jitter_ms"])
+    if delay:
+        await asyncio.sleep(delay / 1000.0)
+    if CONFIG["error_rate"] and random.random() < CONFIG["error_rate"]:
+        return JSONResponse({"message": "injected failure"}, status_code=500)
+    return await call_next(request)
+
+
+# --- Event stream ---
+@app.websocket("/ws")
+async def ws_events(websocket: WebSocket):
+    if time.time() < bench.refuse_until:
+        await websocket.close()
+        return
+    await websocket.accept()
+    bench.clients.add(websocket)
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        bench.clients.discard(websocket)
+
+
+async def _broadcast(frame: str):
+    for ws in list(bench.clients):
+        try:
+            await ws.send_text(frame)
+        except Exception:
+            bench.clients.discard(ws)
+
+
+def make_message(seq: int, text: str = "bench") -> str:
+    chat_id = random.choice(db.rooms)
+    user_id = random.choice(db.users)
+    raw = db.insert_log(chat_id, user_id, f"{text} #{seq}")
+    return json.dumps({"msg": raw["message"], "room": f"Room {chat_id - 1000}",
+                       "sender": f"User {user_id - 5000}", "json": raw}, ensure_ascii=False)
+
+
+async def _inject(count: int, rate: float, text: str, duplicate_rate: float):
+    bench.injecting = True
+    interval = 1.0 / rate if rate else 0.0
+    start = time.perf_counter()
+    try:
+        for i in range(count):
+            seq = bench.next_seq
+            bench.next_seq += 1
+            frame = make_message(seq, text)
+            bench.sent_at[seq] = time.perf_counter()
+            await _broadcast(frame)
+            if duplicate_rate and random.random() < duplicate_rate:
+                await _broadcast(frame)
+            if interval:
+                delay = start + (i + 1) * interval - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif i % 100 == 99:
+                await asyncio.sleep(0)
+    finally:
+        bench.injecting = False
+
+
+# --- Core Iris routes ---
+@app.post("/reply")
+async def reply(req: dict):
+    now = time.perf_counter()
+    bench.replies += 1
+    m = SEQ_RE.search(str(req.get("data", "")))
+    if m:
+        sent = bench.sent_at.pop(int(m.group(1)), None)
+        if sent is not None:
+            bench.latencies.append((now - sent) * 1000)
+    return {"success": True, "message": "success"}
+
+
+@app.post("/query")
+@app.post("/api/v1/query")
+async def query(req: dict):
+    binds = [b.get("content") for b in (req.get("bind") or [])]
+    try:
+        return {"data": db.query(req["query"], binds)}
+    except sqlite3.Error as e:
+        return JSONResponse({"message": f"Query 오류: query={req.get('query')}, err={e}"}, status_code=500)
+
+
+@app.post("/decrypt")
+@app.post("/api/v1/decrypt")
+async def decrypt(req: dict):
+    return {"plain_text": req.get("b64_ciphertext", "")}
+
+
+@app.get("/aot")
+async def aot():
+    return {"success": True, "aot": {"access_token": "fake-token", "d_id": "fake-device", "expires_in": 3600}}
+
+
+@app.get("/dashboard/status")
+async def dashboard_status():
+    return {"isObserving": True, "statusMessage": "Observing database", "lastLogs": []}
+
+
+@app.get("/config")
+async def config():
+    return {"bot_name": "fake", "bot_http_port": 3000, "web_server_endpoint": "", "db_polling_rate": 100,
+            "message_send_rate": 50, "bot_id": 1}
+
+
+# --- Grand service (/api/v1) ---
+@app.get("/api/v1/rooms")
+async def rooms():
+    rows = db.query("SELECT id, type, active_member_count, last_log_id, private_meta FROM chat_rooms ORDER BY last_log_id DESC")
+    for r in rows:
+        r["name"] = json.loads(r["private_meta"]).get("name")
+    return rows
+
+
+@app.get("/api/v1/rooms/{room_id}/members")
+async def members(room_id: int):
+    return db.query("SELECT id AS user_id, name AS nickname, profile_image_url, enc, 0 AS member_type FROM friends "
+                    "WHERE id IN (SELECT user_id FROM chat_logs WHERE chat_id = ? GROUP BY user_id)", [room_id])
+
+
+@app.get("/api/v1/rooms/{room_id}/history")
+async def history(room_id: int, limit: int = 100):
+    return db.query("SELECT * FROM chat_logs WHERE chat_id = ? ORDER BY _id DESC LIMIT ?", [room_id, limit])
+
+
+@app.get("/api/v1/rooms/{room_id}/search")
+async def search(room_id: int, q: str = "", limit: int = 100):
+    return db.query("SELECT * FROM chat_logs WHERE chat_id = ? AND message LIKE ? ORDER BY _id DESC LIMIT ?",
+                    [room_id, f"%{q}%", limit])
+
+
+@app.get("/api/v1/rooms/{room_id}/stats")
+async def stats(room_id: int):
+    return db.query("SELECT user_id, COUNT(*) AS count FROM chat_logs WHERE chat_id = ? "
+                    "GROUP BY user_id ORDER BY count DESC", [room_id])
+
+
+@app.get("/api/v1/rooms/{room_id}/link")
+async def link(room_id: int):
+    return {"url": f"https://open.kakao.com/o/fake{room_id}"}
+
+
+@app.post("/api/v1/rooms/{room_id}/read")
+@app.post("/api/v1/rooms/{room_id}/read_direct")
+async def read(room_id: int):
+    return {"success": True}
+
+
+@app.post("/api/v1/chats/{chat_id}/send_direct")
+async def send_direct(chat_id: int, request: Request):
+    await request.body()
+    return {"success": True}
+
+
+@app.get("/api/v1/chats/{chat_id}/context")
+async def context(chat_id: int, limit: int = 10, dir: str = "prev"):
+    op, order = ("<", "DESC") if dir == "prev" else (">", "ASC")
+    return db.query(f"SELECT * FROM chat_logs WHERE _id {op} ? ORDER BY _id {order} LIMIT ?", [chat_id, limit])
+
+
+@app.get("/api/v1/chats/{chat_id}/media_info")
+async def media_info(chat_id: int):
+    return {"id": chat_id, "type": "text", "details": {}}
+
+
+@app.get("/api/v1/users/{user_id}")
+async def user(user_id: int):
+    rows = db.query("SELECT id, name FROM friends WHERE id = ?", [user_id])
+    return rows[0] if rows else {}
+
+
+@app.get("/api/v1/friends")
+async def friends():
+    return db.query("SELECT id, name, profile_image_url FROM friends")
+
+
+@app.get("/api/v1/auth/info")
+async def auth_info():
+    return {"user_id": 1, "aot": "fake-token"}
+
+
+@app.get("/api/v1/db/tables")
+async def tables():
+    return [r["name"] for r in db.query("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+
+@app.get("/api/v1/db/columns")
+async def columns(table: str = ""):
+    return db.query(f"PRAGMA table_info({table})") if table.isidentifier() else []
+
+
+# --- Benchmark control ---
+@app.post("/_bench/config")
+async def bench_config(req: dict):
+    CONFIG.update({k: float(v) for k, v in req.items() if k in CONFIG})
+    return CONFIG
+
+
+@app.post("/_bench/inject")
+async def bench_inject(req: dict):
+    # { "count": 1000, "rate": 500 (msgs/sec, 0 = as fast as possible), "duplicate_rate": 0.0 }
+    asyncio.create_task(_inject(int(req.get("count", 100)), float(req.get("rate", 0)),
+                                req.get("text", "bench"), float(req.get("duplicate_rate", 0))))
+    return {"queued": req.get("count", 100), "clients": len(bench.clients)}
+
+
+@app.post("/_bench/disconnect")
+async def bench_disconnect(req: Optional[dict] = None):
+    # { "hold_s": 2.0 } drops every event-stream client and refuses reconnects for hold_s seconds
+    bench.refuse_until = time.time() + float((req or {}).get("hold_s", 0))
+    dropped = len(bench.clients)
+    for ws in list(bench.clients):
+        try:
+            await ws.close()
+        except Exception:
+            pass
+        bench.clients.discard(ws)
+    return {"dropped": dropped}
+
+
+@app.get("/_bench/stats")
+async def bench_stats():
+    return {"clients": len(bench.clients), "injecting": bench.injecting, "sent": bench.next_seq - 1,
+            "pending": len(bench.sent_at), "replies": bench.replies, "latencies_ms": bench.latencies}
+
+
+@app.post("/_bench/reset")
+async def bench_reset():
+    bench.reset()
+    return {"success": True}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Iris server for Stend benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    CONFIG.update(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
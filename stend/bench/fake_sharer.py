@@ -0,0 +1,98 @@
+"""
+Local stand-in for sharer.kakao.com's legacy picker flow.
+
+POST /picker/link answers with a page embedding `window.serverData`
+(base64url JSON with shortKey/checksum/csrfToken and the receiver lists);
+POST /picker/send checks the short key and records the delivery. Point the
+API node at it with STEND_KAKAO_SHARER_URL.
+
+    python -m stend.bench.fake_sharer --port 3100 --rooms 50 --friends 500 --latency-ms 200
+"""
+import json
+import base64
+import asyncio
+import argparse
+import itertools
+from typing import Any, Dict, List
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse
+
+app = FastAPI(title="Fake Sharer")
+
+STATE: Dict[str, Any] = {"rooms": 50, "friends": 500, "token": None, "latency_ms": 0.0,
+                         "keys": {}, "sent": [], "link_calls": 0, "send_calls": 0}
+_seq = itertools.count(1)
+
+
+def _receivers() -> Dict[str, List[Dict[str, Any]]]:
+    return {"chats": [{"id": str(9000 + i), "title": f"Room {i}", "member_count": 10} for i in range(STATE["rooms"])],
+            "friends": [{"uuid": f"u{i}", "profile_nickname": f"User {i}"} for i in range(STATE["friends"])]}
+
+
+def _authorized(request: Request) -> bool:
+    return STATE["token"] is None or request.headers.get("authorization") == STATE["token"]
+
+
+async def _form(request: Request) -> Dict[str, str]:
+    # Parsed by hand so the mock does not need python-multipart
+    return {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+
+
+@app.post("/picker/link")
+async def picker_link(request: Request):
+    STATE["link_calls"] += 1
+    form = await _form(request)
+    if not _authorized(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+    short_key = f"sk{next(_seq)}"
+    STATE["keys"][short_key] = json.loads(form.get("validation_params") or "{}")
+    data = dict(_receivers(), shortKey=short_key, checksum=f"cs-{short_key}", csrfToken="csrf")
+    encoded = base64.urlsafe_b64encode(json.dumps({"data": data}).encode()).decode().rstrip("=")
+    return HTMLResponse(f'<script>window.serverData = "{encoded}";</script>')
+
+
+@app.post("/picker/send")
+async def picker_send(request: Request):
+    STATE["send_calls"] += 1
+    form = await _form(request)
+    if STATE["latency_ms"]:
+        await asyncio.sleep(STATE["latency_ms"] / 1000)
+    if not _authorized(request):
+        return JSONResponse({"error": "unauthorized"}, status_code=401)
+    short_key = form.get("short_key")
+    if short_key not in STATE["keys"] or form.get("checksum") != f"cs-{short_key}":
+        return JSONResponse({"error": "invalid short_key"}, status_code=400)
+    target = json.loads(base64.urlsafe_b64decode(form.get("receiver", "") + "==="))
+    STATE["sent"].append({"short_key": short_key, "receiver": target.get("title") or target.get("profile_nickname")})
+    return {"status": "ok"}
+
+
+@app.get("/_bench/stats")
+async def bench_stats():
+    return {"link_calls": STATE["link_calls"], "send_calls": STATE["send_calls"], "sent": len(STATE["sent"])}
+
+
+@app.post("/_bench/token")
+async def bench_token(body: Dict[str, Any]):
+    """Require this Authorization value from now on (null disables the check)."""
+    STATE["token"] = body.get("token")
+    return {"token": STATE["token"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake sharer.kakao.com for link benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3100)
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--friends", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every picker/send")
+    args = parser.parse_args()
+    STATE.update(rooms=args.rooms, friends=args.friends, latency_ms=args.latency_ms)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Stend benchmark harness.
+
+Starts the fake Iris stand-in and a real API node (external-Iris mode, bench
+skills only), drives synthetic messages through the bridge -> skill -> reply
+pipeline and exercises the proxy routes. Results are written as JSON so runs
+can be compared between commits.
+
+    python -m stend.bench.run_bench run --messages 5000 --rate 1000
+    python -m stend.bench.run_bench compare bench_results/a.json bench_results/b.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import platform
+import tempfile
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_SKILLS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills")
+
+PROXY_ROUTES = [
+    ("GET", "/api/status", None),
+    ("GET", "/api/stend/rooms", None),
+    ("GET", "/api/stend/rooms/1000/members", None),
+    ("GET", "/api/stend/rooms/1000/history?limit=50", None),
+    ("GET", "/api/stend/rooms/1000/stats", None),
+    ("GET", "/api/stend/users/5001", None),
+    ("GET", "/api/stend/friends", None),
+    ("POST", "/api/stend/query", {"query": "SELECT * FROM chat_logs ORDER BY _id DESC LIMIT 20"}),
+    ("GET", "/api/store/keys", None),
+]
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(int(q * len(ordered)), len(ordered) - 1)], 3)
+
+    return {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 3),
+            "p50": pick(0.50), "p90": pick(0.90), "p99": pick(0.99), "max": round(ordered[-1], 3)}
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def rss_kb(pid: int) -> Optional[int]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def git_rev() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def wait_until(check, timeout: float, interval=0.1) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if check():
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(interval)
+    return False
+
+
+class BenchCluster:
+    """Fake Iris + API node as subprocesses in a scratch directory."""
+
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, skills_dir=BENCH_SKILLS_DIR):
+        self.iris_port = free_port()
+        self.api_port = free_port()
+        self.iris_url = f"http://127.0.0.1:{self.iris_port}"
+        self.api_url = f"http://127.0.0.1:{self.api_port}"
+        self.workdir = tempfile.mkdtemp(prefix="stend-bench-")
+        self.fault_args = ["--latency-ms", str(latency_ms), "--jitter-ms", str(jitter_ms), "--error-rate", str(error_rate)]
+        self.skills_dir = skills_dir
+        self.procs: List[subprocess.Popen] = []
+
+    def __enter__(self):
+        env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+        self.iris = subprocess.Popen([sys.executable, "-m", "stend.bench.fake_iris", "--port", str(self.iris_port)] + self.fault_args,
+                                     cwd=self.workdir, env=env)
+        self.procs.append(self.iris)
+        if not wait_until(lambda: requests.get(f"{self.iris_url}/_bench/stats", timeout=1).ok, 15):
+            raise RuntimeError("fake Iris did not start")
+
+        env.update(STEND_IRIS_URL=self.iris_url, STEND_EXTERNAL_IRIS="1", STEND_SKILLS_DIR=self.skills_dir)
+        self.api = subprocess.Popen([sys.executable, "-m", "uvicorn", "stend.core.api_server:app",
+                                     "--port", str(self.api_port), "--log-level", "warning"],
+                                    cwd=self.workdir, env=env, stdout=subprocess.DEVNULL)
+        self.procs.append(self.api)
+        if not wait_until(lambda: requests.get(f"{self.iris_url}/_bench/stats", timeout=1).json()["clients"] > 0, 30):
+            raise RuntimeError("API node bridge did not connect to fake Iris")
+        return self
+
+    def __exit__(self, *exc):
+        for p in reversed(self.procs):
+            p.terminate()
+        for p in self.procs:
+            try:
+                p.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                p.kill()
+
+
+def bench_pipeline(cluster: BenchCluster, count: int, rate: float, duplicate_rate=0.0, timeout=120.0) -> Dict[str, Any]:
+    requests.post(f"{cluster.iris_url}/_bench/reset")
+    started = time.perf_counter()
+    requests.post(f"{cluster.iris_url}/_bench/inject", json={"count": count, "rate": rate, "duplicate_rate": duplicate_rate})
+    stats = {}
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        stats = requests.get(f"{cluster.iris_url}/_bench/stats").json()
+        if not stats["injecting"] and stats["pending"] == 0:
+            break
+        time.sleep(0.05)
+    elapsed = time.perf_counter() - started
+    matched = len(stats.get("latencies_ms", []))
+    return {
+        "messages": count,
+        "target_rate": rate,
+        "replies": stats.get("replies", 0),
+        "lost": stats.get("pending", count),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_msgs_s": round(matched / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": percentiles(stats.get("latencies_ms", [])),
+    }
+
+
+def bench_proxy(cluster: BenchCluster, per_route: int, concurrency: int) -> Dict[str, Any]:
+    results = {}
+    for method, path, body in PROXY_ROUTES:
+        session = requests.Session()
+        url = cluster.api_url + path
+
+        def one(_):
+            t0 = time.perf_counter()
+            try:
+                r = session.request(method, url, json=body, timeout=30)
+                ok = r.status_code < 400 and not (isinstance(r.json(), dict) and "error" in r.json())
+            except requests.RequestException:
+                ok = False
+            return (time.perf_counter() - t0) * 1000, ok
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            samples = list(pool.map(one, range(per_route)))
+        elapsed = time.perf_counter() - t0
+        results[f"{method} {path}"] = {
+            "requests": per_route,
+            "errors": sum(1 for _, ok in samples if not ok),
+            "rps": round(per_route / elapsed, 1),
+            "latency_ms": percentiles([ms for ms, _ in samples]),
+        }
+    return results
+
+
+def run(args) -> Dict[str, Any]:
+    result: Dict[str, Any] = {
+        "meta": {"commit": git_rev(), "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "platform": platform.platform(), "args": vars(args)},
+    }
+    with BenchCluster(args.latency_ms, args.jitter_ms, args.error_rate) as cluster:
+        memory = {"start_kb": rss_kb(cluster.api.pid)}
+        # Warm up imports, connections and caches before measuring
+        bench_pipeline(cluster, min(200, args.messages), 0)
+        memory["warm_kb"] = rss_kb(cluster.api.pid)
+
+        result["pipeline"] = bench_pipeline(cluster, args.messages, args.rate, args.duplicate_rate)
+        memory["after_pipeline_kb"] = rss_kb(cluster.api.pid)
+        if args.proxy_requests:
+            result["proxy"] = bench_proxy(cluster, args.proxy_requests, args.concurrency)
+        memory["after_proxy_kb"] = rss_kb(cluster.api.pid)
+        if memory["warm_kb"] and memory["after_pipeline_kb"]:
+            memory["growth_kb"] = memory["after_pipeline_kb"] - memory["warm_kb"]
+            memory["growth_bytes_per_msg"] = round(memory["growth_kb"] * 1024 / max(args.messages, 1), 1)
+        result["memory"] = memory
+        try:
+            result["server_metrics"] = requests.get(f"{cluster.api_url}/api/metrics", timeout=5).json()
+        except requests.RequestException:
+            pass
+    return result
+
+
+def flatten(result: Dict[str, Any]) -> Dict[str, float]:
+    """Headline numbers used by `compare`."""
+    flat = {}
+    pipe = result.get("pipeline", {})
+    for k in ("p50", "p90", "p99"):
+        if k in pipe.get("latency_ms", {}):
+            flat[f"pipeline.latency_{k}_ms"] = pipe["latency_ms"][k]
+    if "throughput_msgs_s" in pipe:
+        flat["pipeline.throughput_msgs_s"] = pipe["throughput_msgs_s"]
+    if "growth_bytes_per_msg" in result.get("memory", {}):
+        flat["memory.growth_bytes_per_msg"] = result["memory"]["growth_bytes_per_msg"]
+    for route, r in result.get("proxy", {}).items():
+        flat[f"proxy.{route}.p50_ms"] = r["latency_ms"].get("p50", 0.0)
+        flat[f"proxy.{route}.rps"] = r["rps"]
+    return flat
+
+
+def compare(base_path: str, new_path: str):
+    with open(base_path) as f:
+        base = flatten(json.load(f))
+    with open(new_path) as f:
+        new = flatten(json.load(f))
+    print(f"{'metric':60} {'base':>12} {'new':>12} {'delta':>9}")
+    for key in sorted(set(base) | set(new)):
+        a, b = base.get(key), new.get(key)
+        delta = f"{(b - a) / a * 100:+.1f}%" if a and b is not None else "n/a"
+        print(f"{key:60} {a if a is not None else '-':>12} {b if b is not None else '-':>12} {delta:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stend load test and benchmark suite")
+    sub = parser.add_subparsers(dest="command")
+
+    p_run = sub.add_parser("run", help="Run the benchmark and save results as JSON")
+    p_run.add_argument("--messages", type=int, default=2000)
+    p_run.add_argument("--rate", type=float, default=0, help="Messages/sec (0 = as fast as possible)")
+    p_run.add_argument("--duplicate-rate", type=float, default=0.0, help="Fraction of frames delivered twice")
+    p_run.add_argument("--proxy-requests", type=int, default=200, help="Requests per proxy route (0 to skip)")
+    p_run.add_argument("--concurrency", type=int, default=8)
+    p_run.add_argument("--latency-ms", type=float, default=0.0, help="Injected Iris latency")
+    p_run.add_argument("--jitter-ms", type=float, default=0.0)
+    p_run.add_argument("--error-rate", type=float, default=0.0, help="Injected Iris error rate (0-1)")
+    p_run.add_argument("--out", default=os.path.join(REPO_ROOT, "bench_results"))
+    p_run.add_argument("--compare", help="Previous result JSON to compare against")
+
+    p_cmp = sub.add_parser("compare", help="Compare two result files")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("new")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        compare(args.base, args.new)
+        return
+    if args.command != "run":
+        parser.print_help()
+        return
+
+    result = run(args)
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"{time.strftime('%Y%m%d-%H%M%S')}-{result['meta']['commit']}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    pipe = result["pipeline"]
+    print(f"Pipeline: {pipe['throughput_msgs_s']} msgs/s, latency {pipe['latency_ms']}, lost {pipe['lost']}")
+    for route, r in result.get("proxy", {}).items():
+        print(f"  {route:55} {r['rps']:>8} rps  p50 {r['latency_ms'].get('p50')}ms  errors {r['errors']}")
+    print(f"Memory: {result['memory']}")
+    print(f"Saved: {path}")
+    if args.compare:
+        compare(args.compare, path)
+
+
+if __name__ == "__main__":
+    main()
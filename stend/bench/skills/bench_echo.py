@@ -0,0 +1,3 @@
+def on_message(chat, reply):
+    # Echo the sequence tag back so the fake Iris can match reply to event
+    reply(f"ack {chat['msg']}")
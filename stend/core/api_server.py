@@ -1,47 +1,99 @@
 import os
+import time
 import threading
 import asyncio
 import json
+import shlex
+import codecs
+import weakref
 import requests
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, Response
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse, JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
 
 # Stend Managers
-from stend.core.managers.adb import AdbManager
 from stend.core.managers.bridge import IrisBridge
 from stend.core.managers.skill_manager import SkillManager
 from stend.core.managers.link_manager import KakaoLinkManager
 from stend.core.managers.store_manager import StendStore
 from stend.core.managers.extra_managers import WebhookManager, SharedStateManager
+from stend.core.managers.query_cache import QueryCache
+from stend.core.managers.jobs import PruneJob
+from stend.core.managers.metrics import registry as metrics, route_label, AGE_BUCKETS
+from stend.core.managers.tracing import tracer, TRACE_HEADER
+from stend.core.managers.fleet import DeviceFleet, Device
+from stend.core.managers.cluster import WorkerCluster, is_leader_route
+from stend.core.managers.directory import directory
+from stend.core.managers.room_stats import RoomStats
+from stend.core.managers.breaker import CircuitOpenError
+from stend.core.managers.admission import AdmissionControl, Overloaded
+from stend.core.managers.scheduler import Scheduler
+from stend.core.managers.skill_state import StateManager
+from stend.core.managers.sdk_channel import SdkHub, ActionError, decode as sdk_decode, msgpack
+from stend.core.pipeline import Pipeline
+from stend.core.lifecycle import Lifecycle
+from stend.core.message import Payload, Message
 
 app = FastAPI(title="Stend API Platform")
 
 # --- Constants & Paths ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-SKILLS_DIR = os.path.join(BASE_DIR, "skills")
+SKILLS_DIR = os.environ.get("STEND_SKILLS_DIR", os.path.join(BASE_DIR, "skills"))
 DASHBOARD_DIR = os.path.join(BASE_DIR, "dashboard")
+IRIS_URL = os.environ.get("STEND_IRIS_URL", "http://localhost:3000")
+# Set when Iris is reachable without adb (remote device, benchmark stand-in)
+EXTERNAL_IRIS = os.environ.get("STEND_EXTERNAL_IRIS") == "1"
+# stend_cli starts the API before the device is ready and attaches it later via /api/control/start
+AUTOSTART = os.environ.get("STEND_AUTOSTART", "1") == "1"
+APK_PATH = os.environ.get("STEND_APK_PATH", os.path.join(BASE_DIR, "android_project", "output", "Iris-debug.apk"))
+# Set by `run.py --workers N`: state shared between workers moves into StendStore
+MULTI_WORKER = int(os.environ.get("STEND_WORKERS", "1")) > 1
+# Device shell limits: one-shot output/time caps and concurrent /ws/shell sessions
+SHELL_MAX_OUTPUT = 256 * 1024
+SHELL_MAX_TIMEOUT = 60.0
+SHELL_MAX_SESSIONS = int(os.environ.get("STEND_SHELL_SESSIONS", "4"))
+# Ceiling for KakaoLink bulk sends per second, whatever the caller asks for
+LINK_BULK_MAX_RATE = float(os.environ.get("STEND_LINK_MAX_RATE", "10"))
+SHELL_CHUNK = 16 * 1024
+shell_sessions = 0
 
 # --- Models ---
 class SystemStatus(BaseModel):
     android: str
     iris_bridge: str
     skills_active: int
+    devices: List[dict] = []
+    lifecycle: dict = {}
+    upstream: dict = {}
+    admission: dict = {}
 
 class CommandResponse(BaseModel):
     status: str
     message: str
 
 # --- Global State ---
-adb = AdbManager(target="127.0.0.1:5555")
-skills = SkillManager(SKILLS_DIR)
-links = KakaoLinkManager(iris_url="http://localhost:3000")
-store = StendStore()
-webhooks = WebhookManager()
-shared_state = SharedStateManager()
-bridge = None
+# One entry per Android instance; STEND_FLEET configures several (see DeviceFleet)
+fleet = DeviceFleet.from_env("127.0.0.1:5555", IRIS_URL, external=EXTERNAL_IRIS)
+PRIMARY_IRIS_URL = fleet.devices[0].iris_url
+store = StendStore(wal=MULTI_WORKER)
+# Jobs are stored by skill and function name and run on the skill pool
+scheduler = Scheduler(store, runner=lambda job: skills.run_job(job))
+# Per-skill `state`: in memory, written behind to the store; kept across skill reloads
+skill_states = StateManager(store, flush_interval=float(os.environ.get("STEND_SKILL_STATE_FLUSH", "1.0")))
+skills = SkillManager(SKILLS_DIR, reply_factory=lambda data: make_reply(data), context={"directory": directory},
+                      skill_context={"scheduler": scheduler.for_skill, "state": skill_states.for_skill})
+links = KakaoLinkManager(iris_url=PRIMARY_IRIS_URL)
+webhooks = WebhookManager(store if MULTI_WORKER else None)
+shared_state = SharedStateManager(store if MULTI_WORKER else None)
+cluster = WorkerCluster.from_env(store, app)
+query_cache = QueryCache()
+prune_job = PruneJob(PRIMARY_IRIS_URL, store, on_progress=lambda job: query_cache.invalidate_tables(["chat_logs"]))
+admission = AdmissionControl.from_env()
+room_stats = RoomStats(store, checkpoint_interval=float(os.environ.get("STEND_ROOM_STATS_CHECKPOINT", "60")))
+sdk = SdkHub(queue_size=int(os.environ.get("STEND_SDK_QUEUE", "1000")))
 main_loop = None
 
 SYSTEM_STATUS = {
@@ -50,6 +102,173 @@ SYSTEM_STATUS = {
     "skills_active": 0
 }
 
+# --- Metrics ---
+HTTP_LATENCY = metrics.histogram("stend_http_request_duration_seconds", "API request latency", ["route", "method"])
+HTTP_REQUESTS = metrics.counter("stend_http_requests_total", "API requests", ["route", "method", "status"])
+IRIS_LATENCY = metrics.histogram("stend_iris_request_duration_seconds", "Upstream Iris request latency", ["path", "method"])
+IRIS_ERRORS = metrics.counter("stend_iris_errors_total", "Upstream Iris failures", ["path", "kind"])
+BRIDGE_EVENTS = metrics.meter("stend_bridge_events_total", "Events received from the Iris bridge", ["type"])
+BRIDGE_EVENT_AGE = metrics.histogram("stend_bridge_event_age_seconds", "Device timestamp to dispatch delay", buckets=AGE_BUCKETS)
+
+def iris_request(method: str, path: str, timeout=5, device: Optional[Device] = None, **kwargs) -> requests.Response:
+    """Single entry point for upstream Iris calls, so latency and failures are recorded."""
+    device = device or fleet.primary()
+    label = route_label(path)
+    try:
+        device.breaker.before()
+    except CircuitOpenError:
+        IRIS_ERRORS.labels(label, "circuit_open").inc()
+        raise
+    start = time.perf_counter()
+    try:
+        with tracer.span(f"iris:{label}"):
+            r = requests.request(method, f"{device.iris_url}{path}", timeout=timeout, **kwargs)
+    except requests.Timeout as e:
+        IRIS_ERRORS.labels(label, "timeout").inc()
+        device.breaker.failure(e)
+        raise
+    except Exception as e:
+        IRIS_ERRORS.labels(label, "connection").inc()
+        device.mark(False)
+        device.breaker.failure(e)
+        raise
+    finally:
+        IRIS_LATENCY.labels(label, method).observe(time.perf_counter() - start)
+    device.breaker.success()
+    if r.status_code >= 400:
+        IRIS_ERRORS.labels(label, f"http_{r.status_code}").inc()
+    return r
+
+def iris_proxy(method: str, path: str, timeout=5, **kwargs):
+    try:
+        return iris_request(method, path, timeout=timeout, **kwargs).json()
+    except CircuitOpenError:
+        raise
+    except Exception as e:
+        return {"error": str(e)}
+
+def _is_error(result) -> bool:
+    return isinstance(result, dict) and "error" in result
+
+def iris_first(method: str, path: str, **kwargs):
+    """First useful answer across the fleet, for lookups keyed by something other than a room."""
+    if not fleet.multi:
+        return iris_proxy(method, path, **kwargs)
+    fallback, unavailable = {}, None
+    for _, result in fleet.fan_out(lambda d: iris_proxy(method, path, device=d, **kwargs)):
+        if isinstance(result, CircuitOpenError):
+            unavailable = result
+            continue
+        if result and not _is_error(result):
+            return result
+        fallback = fallback or result
+    if not fallback and unavailable is not None:
+        raise unavailable
+    return fallback
+
+def device_param(name: Optional[str]) -> Device:
+    try:
+        return fleet.get(name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+def make_reply(data: Message):
+    """Reply callable bound to the room an event came from (for on_message(chat, reply) skills)."""
+    room = data.chat_id
+    # Answer from the device that saw the message
+    device = fleet.by_name.get(data.get("device")) or fleet.for_room(room)
+    def reply(text, type="text", thread_id=None):
+        payload = {"type": type, "room": room, "data": text}
+        if thread_id:
+            payload["threadId"] = thread_id
+        return iris_request("POST", "/reply", json=payload, timeout=10, device=device).json()
+    return reply
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse({"detail": str(exc), "upstream": exc.name}, status_code=503,
+                        headers={"Retry-After": str(max(1, round(exc.retry_after)))})
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Per-route-group concurrency limits; requests that queue too long are shed with 503."""
+    limiter = admission.limiter_for(request.url.path)
+    if limiter is None:
+        return await call_next(request)
+    try:
+        await limiter.acquire()
+    except Overloaded as e:
+        return JSONResponse({"detail": str(e)}, status_code=503, headers={"Retry-After": "1"})
+    try:
+        response = await call_next(request)
+    except BaseException:
+        limiter.release()
+        raise
+    body = getattr(response, "body_iterator", None)
+    if body is None:
+        limiter.release()
+        return response
+
+    slot = [True]
+
+    def release_once():
+        # list.pop is atomic, so the stream end and the finalizer can't both release
+        try:
+            slot.pop()
+        except IndexError:
+            return
+        limiter.release()
+
+    async def hold_slot():
+        # Streamed bodies (exports, proxied downloads) keep working after call_next returns
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            release_once()
+    response.body_iterator = hold_slot()
+    # A body that is never iterated (client gone before the first chunk) frees the slot with the response
+    weakref.finalize(response, release_once)
+    return response
+
+_leader_session = requests.Session()
+_HOP_HEADERS = {"host", "content-length", "connection", "transfer-encoding", "content-encoding", "keep-alive"}
+
+@app.middleware("http")
+async def forward_to_leader(request: Request, call_next):
+    """In multi-worker mode, routes backed by leader-only state are served by the leader worker."""
+    if cluster is None or cluster.is_leader or not is_leader_route(request.url.path):
+        return await call_next(request)
+    leader = cluster.current_leader()
+    if not leader:
+        return JSONResponse({"detail": "No leader worker elected yet"}, status_code=503)
+    url = leader + request.url.path + (f"?{request.url.query}" if request.url.query else "")
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+    body = await request.body()
+    try:
+        r = await asyncio.to_thread(_leader_session.request, request.method, url, data=body, headers=headers, timeout=60)
+    except requests.RequestException as e:
+        return JSONResponse({"detail": f"Leader worker unreachable: {e}"}, status_code=503)
+    return Response(content=r.content, status_code=r.status_code,
+                    headers={k: v for k, v in r.headers.items() if k.lower() not in _HOP_HEADERS})
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    # Calls made by skills on behalf of a bridge event join that event's trace
+    trace = tracer.lookup(request.headers.get(TRACE_HEADER, ""))
+    try:
+        with tracer.activate(trace):
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        label = getattr(route, "path", None) or "static"
+        HTTP_LATENCY.labels(label, request.method).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(label, request.method, status).inc()
+
 # --- WebSocket Log Broadcasting ---
 class LogManager:
     def __init__(self):
@@ -80,83 +299,161 @@ def stend_log(msg: str):
         except:
             pass
 
-# --- Core Lifecycle ---
-def lifecycle_start():
-    global bridge
+# --- Event Dispatch ---
+# New chat activity makes cached reads of these tables stale
+MESSAGE_TABLES = ("chat_logs", "chat_rooms")
+EVENT_TABLES = ("chat_logs", "open_chat_member", "friends")
+
+def dispatch_event(raw_data, device: Optional[Device] = None):
     try:
-        stend_log("System Lifecycle Starting...")
-        SYSTEM_STATUS["android"] = "connecting"
-        
-        # 1. Device Check
-        if not adb.wait_for_device(timeout=15):
-             stend_log("ERROR: Android Device not found via ADB.")
-             SYSTEM_STATUS["android"] = "error"
-             return
-
-        # 2. Deploy & Start Android Subsystem
-        # Path to recently built APK
-        apk_path = os.path.join(BASE_DIR, "android_project", "output", "Iris-debug.apk")
-        if os.path.exists(apk_path):
-            stend_log("Subsystem APK found, deploying...")
-            if adb.start_iris_process(apk_path):
-                SYSTEM_STATUS["android"] = "running"
-            else:
-                SYSTEM_STATUS["android"] = "error"
-        else:
-            stend_log("WARNING: Subsystem APK not found. Please build the project.")
-            SYSTEM_STATUS["android"] = "error"
-
-        # 3. Port Forwarding for Iris
-        stend_log("Setting up port forwarding (3000 -> 3000)...")
-        adb.setup_port_forward(3000, 3000)
-
-        # 4. Load Skills
-        active = skills.load_skills()
-        SYSTEM_STATUS["skills_active"] = len(active)
-        stend_log(f"Skills Loaded: {', '.join(active)}")
-
-        # 4. Start Bridge
-        def dispatch(raw_data):
+        # IrisBridge already decodes frames; accept raw text as well
+        data = json.loads(raw_data) if isinstance(raw_data, (str, bytes)) else raw_data
+        if device is not None:
+            data["device"] = device.name
+        event = Payload.wrap(data)
+        if device is not None:
+            fleet.note_event(device, event.chat_id)
+        directory.observe(event)
+        BRIDGE_EVENTS.labels("message" if event.kind == "message" else data.get("type", "unknown")).inc()
+        created_at = event.created_at
+        if created_at:
             try:
-                data = json.loads(raw_data)
-                # Handle standard messages
-                if "msg" in data:
-                    skills.dispatch("message", data)
-                    stend_log(f"Message from {data.get('sender', 'Unknown')}")
-                
-                # [NEW] Handle high-level events (Nickname, Delete, Hide)
-                elif data.get("type") == "stend_event":
-                    event_name = data.get("event")
-                    stend_log(f"Event Detected: {event_name}")
-                    skills.dispatch("stend_event", data)
-                    # Trigger webhooks
-                    webhooks.trigger(event_name, data)
-                
-                # Trigger webhooks for all messages too if desired
-                if "msg" in data:
-                    webhooks.trigger("message", data)
-                
-            except Exception as e:
-                stend_log(f"Dispatch Error: {e}")
-
-        bridge = IrisBridge(on_message=dispatch)
-        bridge.start()
-        SYSTEM_STATUS["iris_bridge"] = "connected"
-        stend_log("Stend Platform Ready")
-        
+                BRIDGE_EVENT_AGE.observe(max(time.time() - float(created_at), 0.0))
+            except (TypeError, ValueError):
+                pass
+
+        # Handle standard messages
+        if event.kind == "message":
+            query_cache.invalidate_tables(MESSAGE_TABLES)
+            room_stats.observe(event)
+            skills.dispatch("message", event)
+            stend_log(f"Message from {event.sender.name or 'Unknown'}")
+            webhooks.trigger("message", event)
+            sdk.publish("message", event)
+
+        # [NEW] Handle high-level events (Nickname, Delete, Hide)
+        elif event.kind == "stend_event":
+            query_cache.invalidate_tables(EVENT_TABLES)
+            stend_log(f"Event Detected: {event.event}")
+            skills.dispatch("stend_event", event)
+            # Trigger webhooks
+            webhooks.trigger(event.event, event)
+            sdk.publish(event.event, event)
+
     except Exception as e:
-        stend_log(f"Fatal Lifecycle Error: {e}")
-        SYSTEM_STATUS["android"] = "error"
+        stend_log(f"Dispatch Error: {e}")
+
+# --- Core Lifecycle ---
+def _prepare_device(device: Device) -> bool:
+    if device.adb is None:
+        # Iris is managed elsewhere (e.g. the benchmark stand-in); skip adb entirely
+        stend_log(f"[{device.name}] External Iris: using {device.iris_url}")
+        device.state = "external"
+        return True
+    device.state = "connecting"
+
+    # 1. Device Check
+    if not device.adb.wait_for_device(timeout=15):
+         stend_log(f"[{device.name}] ERROR: Android Device not found via ADB.")
+         device.state = "error"
+         return False
+
+    # 2. Port Forwarding for Iris (each device gets its own local port); the deploy probes readiness through it
+    stend_log(f"[{device.name}] Setting up port forwarding ({device.local_port} -> 3000)...")
+    device.adb.setup_port_forward(device.local_port, 3000)
+
+    # 3. Deploy & Start Android Subsystem (skipped when the device already runs this APK)
+    # Path to recently built APK
+    apk_path = APK_PATH
+    if os.path.exists(apk_path):
+        stend_log(f"[{device.name}] Subsystem APK found, deploying...")
+        report = device.adb.deploy_iris(apk_path, iris_url=device.iris_url)
+        device.state = "running" if report["ready"] else "error"
+        stend_log(f"[{device.name}] Deploy {'ready' if report['ready'] else 'failed'} in {report['total']}s {report['phases']}"
+                  + (f": {report['error']}" if report.get("error") else ""))
+        # A failed step is what /api/control/start retries
+        return report["ready"]
+    stend_log("WARNING: Subsystem APK not found. Please build the project.")
+    device.state = "error"
+    return False
+
+def _summarize_devices():
+    states = [d.state for d in fleet.devices]
+    for state in ("running", "external", "connecting"):
+        if state in states:
+            SYSTEM_STATUS["android"] = state
+            break
+    else:
+        SYSTEM_STATUS["android"] = states[0]
+    bridges = [d for d in fleet.devices if d.bridge and d.bridge.connected]
+    SYSTEM_STATUS["iris_bridge"] = "connected" if bridges else "disconnected"
+
+def _load_skills():
+    active = skills.load_skills()
+    SYSTEM_STATUS["skills_active"] = len(active)
+    stend_log(f"Skills Loaded: {', '.join(active)}")
+
+def _start_bridge(device: Device):
+    if device.bridge is None:
+        device.bridge = IrisBridge(url=device.ws_url, iris_url=device.iris_url, on_message=lambda data, d=device: dispatch_event(data, d))
+        device.bridge.start()
+
+def _load_directory(device: Device) -> bool:
+    def fetch(path):
+        return iris_request("GET", path, timeout=10, device=device).json()
+    try:
+        directory.load(fetch, device=device.name if fleet.multi else None)
+    except Exception as e:
+        # Not fatal: the directory still fills in from live events
+        stend_log(f"[{device.name}] Directory load failed: {e}")
+    return True
+
+def _build_lifecycle() -> Lifecycle:
+    """
+    Per device: prepare (adb wait, forward, deploy) -> bridge, with the
+    directory bulk load alongside the bridge; skills load in parallel with
+    the devices and gate every bridge, so no event arrives before its
+    handlers exist.
+    """
+    pipeline = Pipeline("lifecycle")
+    pipeline.add("skills", _load_skills)
+    for device in fleet.devices:
+        pipeline.add(f"device:{device.name}", lambda d=device: _prepare_device(d))
+        pipeline.add(f"directory:{device.name}", lambda d=device: _load_directory(d), deps=[f"device:{device.name}"])
+        pipeline.add(f"bridge:{device.name}", lambda d=device: _start_bridge(d),
+                     deps=[f"device:{device.name}", "skills"],
+                     check=lambda d=device: d.bridge.connected, check_timeout=15)
+    return Lifecycle(pipeline,
+                     is_serving=lambda: any(d.bridge and d.bridge.connected for d in fleet.devices),
+                     on_finished=_lifecycle_finished)
+
+def _lifecycle_finished(lc: Lifecycle):
+    _summarize_devices()
+    fleet.start_health_checks()
+    ready = sum(1 for d in fleet.devices if d.bridge and d.bridge.connected)
+    stend_log(f"Stend Platform {lc.state} ({ready}/{len(fleet.devices)} devices)")
+
+lifecycle = _build_lifecycle()
+
+def lifecycle_start() -> str:
+    """Idempotent: ignored while starting or ready; after a failure only failed steps run again."""
+    action = lifecycle.start()
+    if action in ("starting", "restarting"):
+        stend_log(f"System Lifecycle {action.capitalize()}...")
+        SYSTEM_STATUS["android"] = "connecting"
+    return action
 
 # --- Endpoints ---
 @app.get("/api/status", response_model=SystemStatus)
 async def get_status():
-    return SYSTEM_STATUS
+    _summarize_devices()
+    return dict(SYSTEM_STATUS, devices=fleet.status(), lifecycle=lifecycle.to_dict(),
+                upstream={d.name: d.breaker.state for d in fleet.devices}, admission=admission.to_dict())
 
 @app.post("/api/control/start")
 async def start_system():
-    threading.Thread(target=lifecycle_start).start()
-    return CommandResponse(status="starting", message="Lifecycle initiated")
+    action = lifecycle_start()
+    return CommandResponse(status=action, message=f"Lifecycle {lifecycle.state}")
 
 @app.post("/api/control/reload")
 async def reload_skills():
@@ -164,10 +461,161 @@ async def reload_skills():
     SYSTEM_STATUS["skills_active"] = len(active)
     return active
 
+def _adb_device(device: Optional[str]) -> Device:
+    target = device_param(device)
+    if target.adb is None:
+        raise HTTPException(status_code=400, detail=f"Device '{target.name}' is not managed over adb")
+    return target
+
 @app.post("/api/action/shell")
-async def api_shell(command: str):
-    res = adb.run(["shell"] + command.split())
-    return {"output": res}
+async def api_shell(command: str, device: Optional[str] = None, timeout: float = 10.0):
+    # One-shot: bounded in time and size so logcat/tail -f return a snapshot; use /ws/shell to follow output
+    target = _adb_device(device)
+    try:
+        shlex.split(command)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid command: {e}")
+    result = await target.adb.shell_async(command, timeout=min(max(timeout, 0.1), SHELL_MAX_TIMEOUT),
+                                          max_bytes=SHELL_MAX_OUTPUT)
+    return dict(result, output=result["output"].strip())
+
+@app.websocket("/ws/shell")
+async def websocket_shell(websocket: WebSocket, device: Optional[str] = None):
+    """
+    Interactive device shell. Text frames from the client are written to the
+    shell's stdin (a newline is added if missing); output is streamed back as
+    text frames. Output is read only after the previous frame was sent, so a
+    slow client throttles the device side instead of growing a buffer here.
+    """
+    global shell_sessions
+    await websocket.accept()
+    try:
+        target = _adb_device(device)
+    except HTTPException as e:
+        await websocket.close(code=4404 if e.status_code == 404 else 4400, reason=e.detail)
+        return
+    if shell_sessions >= SHELL_MAX_SESSIONS:
+        await websocket.close(code=4429, reason="Too many shell sessions")
+        return
+    shell_sessions += 1
+    try:
+        reader, writer, close = await target.adb.open_stream()
+    except Exception as e:
+        shell_sessions -= 1
+        await websocket.close(code=1011, reason=f"adb: {e}"[:120])
+        return
+
+    async def pump_out():
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        while True:
+            chunk = await reader.read(SHELL_CHUNK)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            if text:
+                await websocket.send_text(text)
+
+    async def pump_in():
+        while True:
+            line = await websocket.receive_text()
+            writer.write((line if line.endswith("\n") else line + "\n").encode("utf-8"))
+            await writer.drain()
+
+    tasks = [asyncio.ensure_future(pump_out()), asyncio.ensure_future(pump_in())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        close()
+        shell_sessions -= 1
+    try:
+        await websocket.close()
+    except Exception:
+        pass
+
+# --- SDK Channel ---
+def _sdk_action(fn):
+    """Adapts an HTTP handler body to an SDK action: HTTP-style failures become ActionError."""
+    def action(args):
+        try:
+            return fn(args)
+        except HTTPException as e:
+            raise ActionError(str(e.detail), e.status_code)
+        except CircuitOpenError as e:
+            raise ActionError(str(e), 503)
+        except (KeyError, TypeError, ValueError) as e:
+            raise ActionError(f"Bad arguments: {e}")
+    return action
+
+def _sdk_reply(args):
+    payload = {"type": args.get("type", "text"), "room": args["room"], "data": args["data"]}
+    if args.get("threadId"):
+        payload["threadId"] = args["threadId"]
+    return api_reply(payload)
+
+sdk.register("reply", _sdk_action(_sdk_reply))
+sdk.register("query", _sdk_action(lambda args: api_query({k: v for k, v in args.items() if k != "device"}, args.get("device"))),
+             limiter=admission.limiter_for("/api/stend/query"))
+sdk.register("store.get", _sdk_action(lambda args: {"key": args["key"], "value": store.get(args["key"])}))
+sdk.register("store.put", _sdk_action(lambda args: {"success": store.put(args["key"], args.get("value"))}))
+sdk.register("store.delete", _sdk_action(lambda args: {"success": store.delete(args["key"])}))
+sdk.register("directory.user", _sdk_action(lambda args: {"user": directory.user(args["id"]),
+                                                          "name": directory.user_name(args["id"], args.get("room"))}))
+sdk.register("directory.room", _sdk_action(lambda args: {"room": directory.room(args["id"]),
+                                                          "members": directory.room_members(args["id"])}))
+
+@app.websocket("/ws/sdk")
+async def websocket_sdk(websocket: WebSocket, format: str = "json", name: Optional[str] = None):
+    """
+    Bot channel: one connection for filtered events and correlated actions.
+
+    Client frames: {op: "subscribe", id, events?, rooms?, prefix?},
+    {op: "unsubscribe", id, subscription}, {op: "call", id, action, args},
+    {op: "ping", id}. The server answers each with {op: "result"|"error", id, ...}
+    and pushes {op: "event", event, data} for matching bridge events.
+    ?format=msgpack switches both directions to binary msgpack frames.
+    """
+    await websocket.accept()
+    if cluster is not None and not cluster.is_leader:
+        # Events are dispatched on the leader only
+        await websocket.close(code=4503, reason=f"Not the leader; connect to {cluster.current_leader() or 'the leader'}"[:120])
+        return
+    if format not in ("json", "msgpack"):
+        await websocket.close(code=4400, reason=f"Unknown format '{format}'")
+        return
+    if format == "msgpack" and msgpack is None:
+        await websocket.close(code=4415, reason="msgpack is not installed on the server")
+        return
+    session = sdk.open(websocket, format, name)
+    await session.reply({"op": "hello", "session": session.id, "format": format,
+                         "version": 1, "actions": sorted(sdk.actions)})
+    writer = asyncio.ensure_future(session.writer())
+
+    async def pump_in():
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            data = message.get("bytes") if message.get("bytes") is not None else message.get("text")
+            try:
+                frame = sdk_decode(data)
+            except ValueError as e:
+                await session.reply({"op": "error", "id": None, "status": 400, "error": f"Bad frame: {e}"})
+                continue
+            await session.handle(frame)
+
+    reader = asyncio.ensure_future(pump_in())
+    try:
+        await asyncio.wait([reader, writer], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        reader.cancel()
+        writer.cancel()
+        sdk.close(session)
+
+@app.get("/api/stend/sdk")
+async def sdk_status():
+    return sdk.to_dict()
 
 @app.websocket("/ws/logs")
 async def websocket_logs(websocket: WebSocket):
@@ -178,149 +626,257 @@ async def websocket_logs(websocket: WebSocket):
     except WebSocketDisconnect:
         log_manager.disconnect(websocket)
 
-# --- Mounting & Startup ---
-if os.path.exists(DASHBOARD_DIR):
-    app.mount("/", StaticFiles(directory=DASHBOARD_DIR, html=True), name="static")
-
+# --- Startup ---
 @app.on_event("startup")
 async def startup_event():
     global main_loop
     main_loop = asyncio.get_running_loop()
     stend_log("Stend API Node Started")
-    threading.Thread(target=lifecycle_start).start()
+    if cluster is not None:
+        # Only the elected worker owns the bridge, skills and background jobs
+        cluster.start(on_elected=_on_elected)
+    else:
+        _start_room_stats()
+        scheduler.start()
+        skill_states.start()
+        if AUTOSTART:
+            lifecycle_start()
+
+def _on_elected():
+    prune_job.load()
+    _start_room_stats()
+    scheduler.start()
+    skill_states.start()
+    if AUTOSTART:
+        lifecycle_start()
+
+def _start_room_stats():
+    room_stats.load()
+    room_stats.start_checkpoints()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    room_stats.checkpoint()
+    scheduler.flush()
+    skill_states.flush()
 
 # --- Grand API Proxy ---
+# Room-scoped calls go to the device in that room; account-wide views are
+# merged across the fleet; device-local calls take an optional ?device=.
 @app.get("/api/stend/rooms")
-async def get_rooms():
-    try:
-        r = requests.get("http://localhost:3000/api/v1/rooms", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_rooms():
+    if not fleet.multi:
+        return iris_proxy("GET", "/api/v1/rooms")
+    return fleet.merge_rooms(fleet.fan_out(lambda d: iris_proxy("GET", "/api/v1/rooms", device=d)))
 
 @app.get("/api/stend/rooms/{room_id}/members")
-async def get_room_members(room_id: int):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/rooms/{room_id}/members", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_room_members(room_id: int):
+    return iris_proxy("GET", f"/api/v1/rooms/{room_id}/members", device=fleet.for_room(room_id))
 
 @app.get("/api/stend/rooms/{room_id}/history")
-async def get_room_history(room_id: int, limit: int = 100):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/rooms/{room_id}/history?limit={limit}", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_room_history(room_id: int, limit: int = 100):
+    return iris_proxy("GET", f"/api/v1/rooms/{room_id}/history", params={"limit": limit}, device=fleet.for_room(room_id))
 
 @app.get("/api/stend/chats/{chat_id}/context")
-async def get_chat_context(chat_id: int, limit: int = 10, dir: str = "prev"):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/chats/{chat_id}/context?limit={limit}&dir={dir}", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_chat_context(chat_id: int, limit: int = 10, dir: str = "prev"):
+    return iris_first("GET", f"/api/v1/chats/{chat_id}/context", params={"limit": limit, "dir": dir})
 
 @app.get("/api/stend/rooms/{room_id}/stats")
-async def get_room_stats(room_id: int):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/rooms/{room_id}/stats", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_room_stats(room_id: int, source: str = "memory", top: int = 10):
+    # Rolling counters kept from bridge events; source=iris runs the full chat_logs scan on the device
+    if source == "iris":
+        return iris_proxy("GET", f"/api/v1/rooms/{room_id}/stats", device=fleet.for_room(room_id))
+    return room_stats.get(room_id, top=min(max(top, 1), 100))
 
 @app.post("/api/stend/rooms/{room_id}/read")
-async def mark_room_read(room_id: int):
-    try:
-        r = requests.post(f"http://localhost:3000/api/v1/rooms/{room_id}/read", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def mark_room_read(room_id: int):
+    return iris_proxy("POST", f"/api/v1/rooms/{room_id}/read", device=fleet.for_room(room_id))
 
 @app.get("/api/stend/users/{user_id}")
-async def get_user_info(user_id: int):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/users/{user_id}", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_user_info(user_id: int):
+    return iris_first("GET", f"/api/v1/users/{user_id}")
 
 @app.get("/api/stend/friends")
-async def get_friends():
-    try:
-        r = requests.get("http://localhost:3000/api/v1/friends", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_friends():
+    if not fleet.multi:
+        return iris_proxy("GET", "/api/v1/friends")
+    return fleet.merge_by_id(fleet.fan_out(lambda d: iris_proxy("GET", "/api/v1/friends", device=d)))
+
+# --- Directory (in-memory names, no Iris round trip) ---
+def _directory_response(request: Request, body_fn):
+    """Version-stamped body; clients sending the current ETag get 304 without the body being built."""
+    etag = f'W/"{directory.version}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(dict(body_fn(), version=directory.version), headers={"ETag": etag})
+
+@app.get("/api/stend/directory")
+def get_directory(request: Request):
+    return _directory_response(request, directory.to_dict)
+
+@app.get("/api/stend/directory/users/{user_id}")
+def get_directory_user(user_id: int, request: Request, room: Optional[int] = None):
+    user = directory.user(user_id)
+    nickname = directory.user_name(user_id, room) if room is not None else None
+    if user is None and nickname is None:
+        raise HTTPException(status_code=404, detail=f"Unknown user {user_id}")
+    return _directory_response(request, lambda: {"user": user, "nickname": nickname})
+
+@app.get("/api/stend/directory/rooms/{room_id}")
+def get_directory_room(room_id: int, request: Request):
+    room = directory.room(room_id)
+    if room is None:
+        raise HTTPException(status_code=404, detail=f"Unknown room {room_id}")
+    return _directory_response(request, lambda: {"room": room, "members": directory.room_members(room_id)})
+
+@app.post("/api/stend/directory/reload")
+def reload_directory():
+    list(fleet.fan_out(_load_directory))
+    return directory.to_dict()
 
 @app.get("/api/stend/aot")
-async def get_aot():
-    try:
-        r = requests.get("http://localhost:3000/aot", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_aot(device: Optional[str] = None):
+    return iris_proxy("GET", "/aot", device=device_param(device))
 
 @app.post("/api/stend/query")
-async def api_query(req: dict):
+def api_query(req: dict, device: Optional[str] = None):
+    return iris_proxy("POST", "/query", json=req, timeout=10, device=device_param(device))
+
+@app.get("/api/stend/fleet")
+async def fleet_status():
+    return {"devices": fleet.status(), "rooms": len(fleet.room_map)}
+
+@app.post("/api/stend/fleet/discover")
+def fleet_discover():
+    fleet.discover_rooms()
+    return {"devices": fleet.status(), "rooms": len(fleet.room_map)}
+
+# --- Prepared Queries (cached) ---
+
+def _save_prepared():
+    store.put("stend:prepared_queries", query_cache.list_prepared())
+
+def _load_prepared():
+    for pq in store.get("stend:prepared_queries") or []:
+        try:
+            query_cache.register(pq["name"], pq["query"], pq.get("params"), pq.get("ttl"))
+        except Exception as e:
+            print(f"[QueryCache] Skipping prepared query {pq.get('name')}: {e}")
+
+_load_prepared()
+
+@app.get("/api/stend/queries")
+async def list_prepared_queries():
+    return {"queries": query_cache.list_prepared(), "cache": query_cache.stats()}
+
+@app.post("/api/stend/queries")
+async def register_prepared_query(req: dict):
+    # { "name": "...", "query": "SELECT ... WHERE chat_id = ?", "params": ["room_id"], "ttl": 60 }
     try:
-        r = requests.post("http://localhost:3000/query", json=req, timeout=10)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+        pq = query_cache.register(req["name"], req["query"], req.get("params"), req.get("ttl"))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _save_prepared()
+    return pq.to_dict()
 
-@app.post("/api/stend/reply")
-async def api_reply(req: dict):
+@app.delete("/api/stend/queries/{name}")
+async def unregister_prepared_query(name: str):
+    if not query_cache.unregister(name):
+        raise HTTPException(status_code=404, detail=f"Unknown query '{name}'")
+    _save_prepared()
+    return {"success": True}
+
+def _run_prepared(name: str, params: dict, request: Request):
+    pq = query_cache.prepared.get(name)
+    if not pq:
+        raise HTTPException(status_code=404, detail=f"Unknown query '{name}'")
     try:
-        r = requests.post("http://localhost:3000/reply", json=req, timeout=10)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+        bind = pq.bind(params)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    key = query_cache.make_key(pq.query, bind)
+    entry = query_cache.get(key)
+    cache_state = "hit"
+    if entry is None:
+        cache_state = "miss"
+        generation = query_cache.generation(pq.tables)
+        # CircuitOpenError propagates to its 503 handler; other upstream failures are 502s
+        try:
+            r = iris_request("POST", "/query", json={"query": pq.query, "bind": bind}, timeout=10)
+        except requests.RequestException as e:
+            return JSONResponse({"error": str(e)}, status_code=502, headers={"Cache-Control": "no-store"})
+        try:
+            result = r.json()
+        except ValueError:
+            result = {"error": f"Iris returned a non-JSON response (HTTP {r.status_code})"}
+        # Never cache upstream failures
+        if r.status_code != 200 or not isinstance(result, dict) or "data" not in result:
+            detail = result if isinstance(result, dict) else {"error": result}
+            return JSONResponse(dict(detail, upstream_status=r.status_code), status_code=502,
+                                headers={"Cache-Control": "no-store"})
+        entry = query_cache.put(key, result, pq.tables, pq.ttl, generation)
+
+    headers = {"ETag": entry["etag"], "X-Stend-Cache": cache_state}
+    if request.headers.get("if-none-match") == entry["etag"]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry["body"], media_type="application/json", headers=headers)
+
+@app.get("/api/stend/queries/{name}/run")
+def run_prepared_query_get(name: str, request: Request):
+    return _run_prepared(name, dict(request.query_params), request)
+
+@app.post("/api/stend/queries/{name}/run")
+def run_prepared_query(name: str, request: Request, req: Optional[dict] = None):
+    # { "params": { "room_id": 123 } }
+    return _run_prepared(name, (req or {}).get("params", {}), request)
+
+@app.post("/api/stend/reply")
+def api_reply(req: dict):
+    return iris_proxy("POST", "/reply", json=req, timeout=10, device=fleet.for_room(req.get("room")))
 
 @app.get("/api/stend/rooms/{room_id}/link")
-async def get_room_link(room_id: int):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/rooms/{room_id}/link", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_room_link(room_id: int):
+    return iris_proxy("GET", f"/api/v1/rooms/{room_id}/link", device=fleet.for_room(room_id))
 
 @app.get("/api/stend/db/tables")
-async def get_db_tables():
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/db/tables", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_db_tables(device: Optional[str] = None):
+    return iris_proxy("GET", "/api/v1/db/tables", device=device_param(device))
 
 @app.get("/api/stend/db/columns")
-async def get_db_columns(table: str):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/db/columns?table={table}", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_db_columns(table: str, device: Optional[str] = None):
+    return iris_proxy("GET", "/api/v1/db/columns", params={"table": table}, device=device_param(device))
 
 @app.post("/api/stend/db/clean")
-async def clean_db(days: float = 30.0):
+async def clean_db(days: float = 30.0, chunk_size: Optional[int] = None, pause: Optional[float] = None):
     """
-    Cleans chat logs older than X days. 
+    Cleans chat logs older than X days in the background, in bounded chunks.
     Equivalent to legacy KakaoDB.clean_chat_logs
     """
     try:
-        import time
-        now = time.time()
-        limit_ts = int(now - (days * 24 * 60 * 60))
-        # Delete via proxy query
-        payload = {
-            "query": "DELETE FROM chat_logs WHERE created_at < ?",
-            "bind": [{"content": str(limit_ts)}]
-        }
-        r = requests.post("http://localhost:3000/api/v1/query", json=payload, timeout=10)
-        return {"success": True, "message": f"Deleted logs older than {days} days"}
-    except Exception as e:
-        return {"error": str(e)}
+        PruneJob.validate(days, chunk_size, pause)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if prune_job.is_running():
+        return {"success": False, "message": "A pruning job is already running", "job": prune_job.get_status()}
+    job = prune_job.start(days, chunk_size, pause)
+    stend_log(f"DB clean job {job['id']} started (older than {days} days)")
+    return {"success": True, "message": f"Pruning logs older than {days} days", "job": job}
+
+@app.get("/api/stend/db/clean/status")
+async def clean_db_status():
+    return prune_job.get_status()
+
+@app.post("/api/stend/db/clean/cancel")
+def clean_db_cancel():
+    return prune_job.cancel()
+
+@app.post("/api/stend/db/clean/resume")
+async def clean_db_resume():
+    try:
+        return prune_job.resume()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 # --- Store APIs (PyKV Compatible) ---
 
@@ -344,23 +900,16 @@ async def store_list_keys():
     return {"keys": store.list_keys()}
 
 @app.get("/api/stend/rooms/{room_id}/search")
-async def search_room(room_id: int, q: str = "", limit: int = 100):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/rooms/{room_id}/search?q={q}&limit={limit}", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def search_room(room_id: int, q: str = "", limit: int = 100):
+    return iris_proxy("GET", f"/api/v1/rooms/{room_id}/search", params={"q": q, "limit": limit}, device=fleet.for_room(room_id))
 
 @app.get("/api/stend/chats/{chat_id}/media_info")
-async def get_media_info(chat_id: int):
-    try:
-        r = requests.get(f"http://localhost:3000/api/v1/chats/{chat_id}/media_info", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def get_media_info(chat_id: int):
+    return iris_first("GET", f"/api/v1/chats/{chat_id}/media_info")
 
 @app.post("/api/stend/link/send")
-async def send_kakaolink(req: dict):
+def send_kakaolink(req: dict):
+    # Plain def: links.send blocks on several round trips, so it runs in the threadpool
     # Expected: { "receiver": "name", "template_id": 123, "template_args": {...}, "app_key": "...", "origin": "..." }
     try:
         res = links.send(
@@ -374,31 +923,158 @@ async def send_kakaolink(req: dict):
     except Exception as e:
         return {"error": str(e)}
 
+@app.post("/api/stend/link/send_bulk")
+def send_kakaolink_bulk(req: dict):
+    # Expected: { "receivers": ["name", ...], "template_id", "template_args", "app_key", "origin",
+    #             "concurrency": 4, "rate": 5, "stream": true }
+    receivers = req.get("receivers") or []
+    if not isinstance(receivers, list) or not receivers:
+        raise HTTPException(status_code=400, detail="receivers must be a non-empty list")
+    concurrency, rate = req.get("concurrency", 4), req.get("rate", 5.0)
+    if type(concurrency) is not int or concurrency < 1:
+        raise HTTPException(status_code=400, detail="concurrency must be a positive integer")
+    if type(rate) not in (int, float) or not rate > 0:
+        # rate <= 0 would switch the limiter off
+        raise HTTPException(status_code=400, detail="rate must be a positive number")
+    rate = min(rate, LINK_BULK_MAX_RATE)
+    results = links.send_bulk(
+        [str(r) for r in receivers],
+        req.get("template_id"),
+        req.get("template_args", {}),
+        req.get("app_key"),
+        req.get("origin"),
+        concurrency=concurrency,
+        rate=rate
+    )
+
+    def summarize(sent, failed, started):
+        return {"done": True, "total": sent + failed, "sent": sent, "failed": failed,
+                "seconds": round(time.perf_counter() - started, 3)}
+
+    if not req.get("stream", True):
+        started = time.perf_counter()
+        items = list(results)
+        sent = sum(1 for r in items if r.get("success"))
+        return dict(summarize(sent, len(items) - sent, started), results=items)
+
+    def progress():
+        # NDJSON: one line per receiver as it completes, then a summary line
+        started = time.perf_counter()
+        sent = failed = 0
+        for r in results:
+            if r.get("success"):
+                sent += 1
+            else:
+                failed += 1
+            yield json.dumps(r, ensure_ascii=False) + "\n"
+        yield json.dumps(summarize(sent, failed, started)) + "\n"
+
+    return StreamingResponse(progress(), media_type="application/x-ndjson")
+
 # --- Power Feature Proxies ---
 
 @app.post("/api/stend/chats/{chat_id}/send_direct")
-async def send_chat_direct(chat_id: int, msg: str):
-    try:
-        r = requests.post(f"http://localhost:3000/api/v1/chats/{chat_id}/send_direct", data=msg, timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def send_chat_direct(chat_id: int, msg: str):
+    return iris_proxy("POST", f"/api/v1/chats/{chat_id}/send_direct", data=msg.encode("utf-8"), device=fleet.for_room(chat_id))
 
 @app.post("/api/stend/rooms/{room_id}/read_direct")
-async def mark_read_direct(room_id: int):
-    try:
-        r = requests.post(f"http://localhost:3000/api/v1/rooms/{room_id}/read_direct", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+def mark_read_direct(room_id: int):
+    return iris_proxy("POST", f"/api/v1/rooms/{room_id}/read_direct", device=fleet.for_room(room_id))
 
 @app.get("/api/stend/auth/info")
-async def get_auth_info():
+def get_auth_info(device: Optional[str] = None):
+    return iris_proxy("GET", "/api/v1/auth/info", device=device_param(device))
+
+# --- Metrics ---
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_prometheus():
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/metrics")
+async def metrics_json():
+    return metrics.snapshot()
+
+# --- Tracing ---
+
+@app.get("/api/traces/slow")
+async def traces_slow(limit: int = 20, window: Optional[float] = None):
+    """Slowest recent traces (optionally within the last `window` seconds), broken down by stage."""
+    return {"traces": tracer.slowest(limit, window)}
+
+@app.get("/api/traces/{trace_id}")
+async def trace_detail(trace_id: str):
+    trace = tracer.get(trace_id)
+    if not trace:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace
+
+# --- Skill Profiling ---
+
+@app.get("/api/profile")
+async def profile_status():
+    return {"sessions": skills.profiler.status(), "slow_threshold_ms": skills.profiler.slow_threshold * 1000}
+
+@app.post("/api/profile/start")
+async def profile_start(req: dict):
+    # { "skill": "example" (omit for all skills), "seconds": 30, "invocations": 100, "mode": "cprofile" | "sampling" }
     try:
-        r = requests.get("http://localhost:3000/api/v1/auth/info", timeout=5)
-        return r.json()
-    except Exception as e:
-        return {"error": str(e)}
+        session = skills.profiler.start(req.get("skill"), req.get("seconds"), req.get("invocations"), req.get("mode", "cprofile"))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stend_log(f"Profiling {session.target} ({session.mode})")
+    return session.to_dict()
+
+@app.post("/api/profile/stop")
+async def profile_stop(skill: Optional[str] = None):
+    return {"sessions": skills.profiler.stop(skill)}
+
+@app.get("/api/profile/slow")
+async def profile_slow(limit: int = 50):
+    return {"threshold_ms": skills.profiler.slow_threshold * 1000, "slow": list(skills.profiler.slow_log)[-limit:][::-1]}
+
+@app.post("/api/profile/slow")
+async def profile_slow_threshold(threshold_ms: float):
+    skills.profiler.slow_threshold = threshold_ms / 1000.0
+    return {"threshold_ms": threshold_ms}
+
+@app.get("/api/profile/{skill}/download")
+async def profile_download(skill: str, format: str = "pstats"):
+    """Profile output: pstats (cprofile), text (cprofile summary) or collapsed (sampling, flamegraph input)."""
+    try:
+        body = skills.profiler.export(skill, format)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No profile for '{skill}'")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    ext = {"pstats": "prof", "collapsed": "folded", "text": "txt"}[format]
+    media = "application/octet-stream" if format == "pstats" else "text/plain; charset=utf-8"
+    return Response(content=body, media_type=media,
+                    headers={"Content-Disposition": f'attachment; filename="{skill}.{ext}"'})
+
+# --- Scheduled Skill Jobs ---
+
+@app.get("/api/stend/scheduler")
+async def scheduler_status(skill: Optional[str] = None):
+    return dict(scheduler.to_dict(), items=[j.to_dict() for j in scheduler.list(skill)])
+
+@app.delete("/api/stend/scheduler/jobs/{job_id}")
+async def scheduler_cancel(job_id: str):
+    if not scheduler.cancel(job_id):
+        raise HTTPException(status_code=404, detail=f"No job '{job_id}'")
+    return {"status": "cancelled", "id": job_id}
+
+# --- Skill State ---
+
+@app.get("/api/stend/state")
+async def skill_state_status():
+    return skill_states.to_dict()
+
+@app.get("/api/stend/state/{skill}")
+async def skill_state_get(skill: str):
+    if skill not in skill_states.states and skill not in skills.by_name:
+        raise HTTPException(status_code=404, detail=f"No skill '{skill}'")
+    return {"skill": skill, "values": dict(skill_states.for_skill(skill).items())}
 
 # --- Webhook Management ---
 
@@ -428,5 +1104,10 @@ async def shared_get(key: str):
 async def shared_all():
     return shared_state.get_all()
 
+# --- Mounting ---
+# Mounted last: a "/" mount matches every path and would shadow routes declared after it
+if os.path.exists(DASHBOARD_DIR):
+    app.mount("/", StaticFiles(directory=DASHBOARD_DIR, html=True), name="static")
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=5001)
@@ -1,25 +1,92 @@
 import os
+import time
+import hashlib
 import subprocess
 import shutil
 
+# Build inputs hashed into the fingerprint (relative to the project root)
+FINGERPRINT_FILES = ("build.gradle", "build.gradle.kts", "settings.gradle", "settings.gradle.kts",
+                     "gradle.properties", "local.properties",
+                     "app/build.gradle", "app/build.gradle.kts", "app/proguard-rules.pro",
+                     # This tree keeps copies of the root scripts under app/ as well
+                     "app/settings.gradle", "app/settings.gradle.kts", "app/root_build.gradle.kts")
+FINGERPRINT_DIRS = ("app/src", "gradle")
+SKIP_DIRS = {"build", ".gradle", ".idea", ".cxx"}
+
 class AndroidBuilder:
     def __init__(self, project_root):
-        self.project_root = project_root
-        self.gradlew = os.path.join(project_root, "gradlew.bat" if os.name == 'nt' else "./gradlew")
+        # Absolute, so gradlew is not resolved a second time against cwd=project_root
+        self.project_root = os.path.abspath(project_root)
+        self.gradlew = os.path.join(self.project_root, "gradlew.bat" if os.name == 'nt' else "gradlew")
+        self.last_build = None
+
+    def _inputs(self):
+        for rel in FINGERPRINT_FILES:
+            if os.path.isfile(os.path.join(self.project_root, rel)):
+                yield rel
+        for rel_dir in FINGERPRINT_DIRS:
+            for root, dirs, files in os.walk(os.path.join(self.project_root, rel_dir)):
+                dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+                for name in sorted(files):
+                    yield os.path.relpath(os.path.join(root, name), self.project_root).replace(os.sep, "/")
+
+    def fingerprint(self):
+        """Content hash of the sources, Gradle files and properties (paths included, so renames count)."""
+        h = hashlib.sha256()
+        for rel in self._inputs():
+            h.update(rel.encode("utf-8") + b"\0")
+            with open(os.path.join(self.project_root, rel), "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(chunk)
+            h.update(b"\0")
+        return h.hexdigest()
+
+    @staticmethod
+    def _fingerprint_file(apk_path):
+        # Stored next to the APK so cleaning the build output also drops the cache
+        return apk_path + ".fingerprint"
+
+    def cached_apk(self, fingerprint, variant="debug"):
+        apk = self.find_apk(variant)
+        if not apk:
+            return None
+        try:
+            with open(self._fingerprint_file(apk)) as f:
+                return apk if f.read().strip() == fingerprint else None
+        except OSError:
+            return None
+
+    def build_debug(self, use_cache=True):
+        start = time.perf_counter()
+        fingerprint = self.fingerprint()
+        if use_cache:
+            apk = self.cached_apk(fingerprint)
+            if apk:
+                elapsed = time.perf_counter() - start
+                self.last_build = {"cache": "hit", "seconds": round(elapsed, 3), "fingerprint": fingerprint, "apk": apk}
+                print(f"[Builder] Cache hit ({fingerprint[:12]}), reusing {apk} ({elapsed:.2f}s)")
+                return apk
 
-    def build_debug(self):
         print("[Builder] Building Android App (Debug)...")
-        # Ensure executable
-        if os.name != 'nt':
-            os.chmod(self.gradlew, 0o755)
-            
         try:
+            # Ensure executable
+            if os.name != 'nt':
+                os.chmod(self.gradlew, 0o755)
             subprocess.check_call([self.gradlew, "assembleDebug"], cwd=self.project_root)
-            print("[Builder] Build Successful.")
-            return self.find_apk("debug")
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, OSError) as e:
+            # OSError: gradlew missing or not executable
             print(f"[Builder] Build Failed: {e}")
+            self.last_build = {"cache": "miss", "seconds": round(time.perf_counter() - start, 3),
+                               "fingerprint": fingerprint, "apk": None, "error": str(e)}
             return None
+        apk = self.find_apk("debug")
+        elapsed = time.perf_counter() - start
+        if apk:
+            with open(self._fingerprint_file(apk), "w") as f:
+                f.write(fingerprint)
+        self.last_build = {"cache": "miss", "seconds": round(elapsed, 3), "fingerprint": fingerprint, "apk": apk}
+        print(f"[Builder] Build Successful. Cache miss ({fingerprint[:12]}), built in {elapsed:.2f}s")
+        return apk
 
     def find_apk(self, variant="debug"):
         # Locates the produced APK
@@ -0,0 +1,77 @@
+import time
+import threading
+from typing import Callable, Optional
+
+from stend.core.pipeline import Pipeline
+
+IDLE = "idle"
+STARTING = "starting"
+READY = "ready"
+DEGRADED = "degraded"
+FAILED = "failed"
+
+
+class Lifecycle:
+    """
+    Start-up state machine for the API node, built on a Pipeline.
+
+    idle -> starting -> ready | degraded | failed
+
+    start() is idempotent: while a run is in flight or the node is ready it
+    does nothing; after a partial failure it re-runs only the failed (and
+    skipped) steps. `is_serving` decides between degraded (something is still
+    usable) and failed.
+    """
+    def __init__(self, pipeline: Pipeline, is_serving: Optional[Callable[[], bool]] = None,
+                 on_finished: Optional[Callable[["Lifecycle"], None]] = None):
+        self.pipeline = pipeline
+        self.is_serving = is_serving
+        self.on_finished = on_finished
+        self.state = IDLE
+        self.runs = 0
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, background=True) -> str:
+        """Returns what happened: starting, restarting, already_starting or already_ready."""
+        with self._lock:
+            if self.state == STARTING:
+                return "already_starting"
+            if self.state == READY:
+                return "already_ready"
+            only = self.pipeline.failed() if self.state in (DEGRADED, FAILED) else None
+            action = "restarting" if only else "starting"
+            self.state = STARTING
+            self.runs += 1
+            self._thread = threading.Thread(target=self._run, args=(only,), daemon=True, name="lifecycle")
+        if background:
+            self._thread.start()
+        else:
+            self._thread.run()
+        return action
+
+    def _run(self, only):
+        started = time.perf_counter()
+        try:
+            ok = self.pipeline.run(only=only)
+        except Exception as e:
+            print(f"[Lifecycle] Pipeline error: {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                self.state = READY
+                self.ready_at = time.time()
+            elif self.is_serving and self.is_serving():
+                self.state = DEGRADED
+            else:
+                self.state = FAILED
+        print(f"[Lifecycle] {self.state} after {time.perf_counter() - started:.2f}s")
+        print(self.pipeline.summary())
+        if self.on_finished:
+            self.on_finished(self)
+
+    def to_dict(self) -> dict:
+        info = self.pipeline.to_dict()
+        return {"state": self.state, "runs": self.runs, "ready_at": self.ready_at,
+                "duration": info["duration"], "steps": info["steps"]}
@@ -1,13 +1,87 @@
 import subprocess
 import os
 import time
+import asyncio
+import hashlib
+import concurrent.futures
+
+import requests
+
+from stend.core.managers.adb_protocol import AdbClient, AdbError, get_runner
+
+# Server unreachable or stream broken (IncompleteReadError is an EOFError)
+_TRANSPORT_ERRORS = (OSError, EOFError, asyncio.TimeoutError, concurrent.futures.TimeoutError)
+
+
+REMOTE_APK = "/data/local/tmp/Stend.apk"
+IRIS_MAIN = "party.qwer.iris.Main"
+
+
+class _Unsupported(Exception):
+    pass
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def wait_for_iris(iris_url, timeout=30.0, initial=0.1, max_interval=2.0):
+    """Polls Iris /dashboard/status with exponential backoff until it answers."""
+    deadline = time.perf_counter() + timeout
+    interval = initial
+    while True:
+        try:
+            if requests.get(f"{iris_url}/dashboard/status", timeout=2).ok:
+                return True
+        except requests.RequestException:
+            pass
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
 
 class AdbManager:
-    def __init__(self, adb_path="adb", target="127.0.0.1:5555"):
+    """
+    adb access for the API node.
+    backend="auto" talks to the adb server over its socket (port 5037) and
+    keeps one persistent device shell; anything the socket path does not
+    cover, or any call made while the server is unreachable, falls back to
+    the `adb` CLI. backend="cli" restores the one-process-per-command path.
+    """
+    def __init__(self, adb_path="adb", target="127.0.0.1:5555", backend="auto", adb_port=5037):
         self.adb_path = adb_path
         self.target = target
+        self.backend = backend
+        self.client = AdbClient(port=adb_port) if backend in ("auto", "socket") else None
+        self._shell = None
 
     def run(self, args):
+        if self.client is not None:
+            try:
+                return self._run_socket(args)
+            except _Unsupported:
+                pass
+            except AdbError as e:
+                # The server answered; the CLI would fail the same way
+                err_msg = str(e)
+                if "offline" not in err_msg and "not found" not in err_msg:
+                    print(f"[ADB Error] {err_msg}")
+                return None
+            except _TRANSPORT_ERRORS as e:
+                if self.backend == "socket":
+                    print(f"[ADB Error] adb server unreachable: {e}")
+                    return None
+                # Server down or stream broken: the CLI starts the server if needed
+                self._shell = None
+        return self._run_cli(args)
+
+    def _run_cli(self, args):
         # Always target the specific device to avoid "more than one device" error
         cmd = [self.adb_path, "-s", self.target] + args
         try:
@@ -18,21 +92,107 @@ class AdbManager:
             if "device offline" not in err_msg and "not found" not in err_msg:
                 print(f"[ADB Error] {err_msg}")
             return None
+        except FileNotFoundError:
+            print(f"[ADB Error] adb executable not found: {self.adb_path}")
+            return None
+
+    def _run_socket(self, args):
+        runner = get_runner()
+        cmd = args[0] if args else ""
+        if cmd == "get-state" and len(args) == 1:
+            return runner.run(self.client.get_state(self.target), 5).strip()
+        if cmd == "shell" and len(args) > 1:
+            output, code = runner.run(self._shell_run(" ".join(args[1:])), 60)
+            output = output.strip()
+            if code != 0:
+                if output:
+                    print(f"[ADB Error] {output}")
+                return None
+            return output
+        if cmd == "forward" and len(args) == 3:
+            runner.run(self.client.forward(self.target, args[1], args[2]), 10)
+            return ""
+        if cmd == "push" and len(args) == 3:
+            runner.run(self.client.push(self.target, args[1], args[2]), 300)
+            return f"{args[1]}: 1 file pushed"
+        raise _Unsupported(cmd)
+
+    async def _shell_run(self, command, timeout=55):
+        if self._shell is None:
+            self._shell = await self.client.open_shell(self.target)
+        return await self._shell.run(command, timeout)
+
+    async def shell_async(self, command, timeout=10.0, max_bytes=256 * 1024):
+        """
+        One-shot shell on its own socket (or adb process), so callers on the
+        event loop can run several concurrently. Output is capped at
+        `max_bytes` and collection stops after `timeout` seconds.
+        Returns {"output", "truncated", "timed_out"}.
+        """
+        if self.client is not None:
+            try:
+                return await self.client.shell_bounded(self.target, command, timeout, max_bytes)
+            except _TRANSPORT_ERRORS:
+                if self.backend == "socket":
+                    raise
+        proc = await asyncio.create_subprocess_exec(
+            self.adb_path, "-s", self.target, "shell", command,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+        timed_out = False
+        try:
+            data = await asyncio.wait_for(proc.stdout.read(max_bytes + 1), timeout)
+        except asyncio.TimeoutError:
+            data, timed_out = b"", True
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+        return {"output": data[:max_bytes].decode("utf-8", "replace"),
+                "truncated": len(data) > max_bytes, "timed_out": timed_out}
+
+    async def open_stream(self):
+        """
+        Interactive shell for streaming: returns (reader, writer, close) where
+        reader yields merged stdout/stderr and writer feeds stdin.
+        """
+        if self.client is not None:
+            try:
+                reader, writer = await self.client.open_interactive(self.target)
+                return reader, writer, lambda: AdbClient._close(writer)
+            except _TRANSPORT_ERRORS:
+                if self.backend == "socket":
+                    raise
+        proc = await asyncio.create_subprocess_exec(
+            self.adb_path, "-s", self.target, "shell",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+
+        def close():
+            if proc.returncode is None:
+                proc.kill()
+        return proc.stdout, proc.stdin, close
 
     def fast_connect(self):
+        if self.client is not None:
+            try:
+                get_runner().run(self.client.connect_device(self.target), 10)
+                return
+            except _TRANSPORT_ERRORS + (AdbError,):
+                pass
         # Explicit bypass of run() for 'connect' as it doesn't take -s
         subprocess.run([self.adb_path, "connect", self.target], capture_output=True)
-    
+
     def wait_for_device(self, timeout=10):
         print(f"Waiting for device (timeout {timeout}s)...")
         # In windows, wait-for-device can block. Let's use a simpler check.
+        # Socket polls are cheap, so poll faster than the CLI path
+        interval = 0.25 if self.client is not None else 1
         start = time.time()
         while time.time() - start < timeout:
             res = self.run(["get-state"])
             if res == "device":
                 print("Device connected.")
                 return True
-            time.sleep(1)
+            time.sleep(interval)
         print("Device connection timed out.")
         return False
 
@@ -48,26 +208,74 @@ class AdbManager:
     def push(self, local, remote):
         return self.run(["push", local, remote])
 
-    def start_iris_process(self, apk_path):
+    def remote_sha256(self, remote):
+        out = self.run(["shell", f"sha256sum {remote} 2>/dev/null"])
+        return out.split()[0] if out else None
+
+    def deploy_iris(self, apk_path, iris_url="http://localhost:3000", remote=REMOTE_APK,
+                    log_path="/data/local/tmp/stend_log.txt", restart=None, timeout=30.0):
+        """
+        Content-addressed deploy: the APK is pushed only when its sha256 differs
+        from the copy on the device, and Iris is restarted only when the APK
+        changed or it is not answering (restart=True/False overrides). Readiness
+        is confirmed over HTTP, so Iris must already be reachable at iris_url
+        (i.e. the port forward is in place).
+        Returns a report with per-phase timings in seconds; a failed push stops
+        the deploy with ready=False and the reason under "error".
+        """
+        report = {"pushed": False, "restarted": False, "ready": False, "phases": {}}
+        phases = report["phases"]
+        started = time.perf_counter()
+
+        t = time.perf_counter()
+        local_hash = file_sha256(apk_path)
+        unchanged = self.remote_sha256(remote) == local_hash
+        phases["hash"] = round(time.perf_counter() - t, 3)
+        report["sha256"] = local_hash
+
+        if not unchanged:
+            t = time.perf_counter()
+            print(f"Deploying Stend Subsystem: {apk_path} ...")
+            out = self.push(apk_path, remote)
+            phases["push"] = round(time.perf_counter() - t, 3)
+            if not out or "1 file pushed" not in out:
+                # Restarting now would relaunch a stale or partial APK
+                report["error"] = f"push failed: {out or 'no output from adb'}"
+                report["total"] = round(time.perf_counter() - started, 3)
+                print(f"[Deploy] Aborted, Iris not restarted ({report['error']})")
+                return report
+            report["pushed"] = True
+
+        if restart is None:
+            # Same APK and Iris already up: nothing to do
+            restart = report["pushed"] or not wait_for_iris(iris_url, timeout=0)
+        if restart:
+            t = time.perf_counter()
+            print("Initializing Android Orchestrator...")
+            # Kill existing if any
+            self.run(["shell", f"pkill -f {IRIS_MAIN}"])
+            # Start via app_process
+            self.run(["shell", f"export CLASSPATH={remote}; app_process /system/bin {IRIS_MAIN} > {log_path} 2>&1 &"])
+            report["restarted"] = True
+            phases["launch"] = round(time.perf_counter() - t, 3)
+
+        t = time.perf_counter()
+        report["ready"] = wait_for_iris(iris_url, timeout=timeout)
+        phases["ready"] = round(time.perf_counter() - t, 3)
+        report["total"] = round(time.perf_counter() - started, 3)
+
+        summary = ", ".join(f"{k} {v:.2f}s" for k, v in phases.items())
+        state = "ready" if report["ready"] else "NOT ready"
+        print(f"[Deploy] {state} in {report['total']:.2f}s ({summary}; push {'done' if report['pushed'] else 'skipped'}, "
+              f"restart {'done' if report['restarted'] else 'skipped'})")
+        return report
+
+    def start_iris_process(self, apk_path, local_port=3000):
         """Ultra-fast startup using app_process (Core Stend technology)"""
-        print(f"Deploying Stend Subsystem: {apk_path} ...")
-        self.push(apk_path, "/data/local/tmp/Stend.apk")
-        
-        print("Initializing Android Orchestrator...")
-        # Kil existing if any
-        self.run(["shell", "pkill -f party.qwer.iris.Main"])
-        
-        # Start via app_process
-        cmd = "export CLASSPATH=/data/local/tmp/Stend.apk; app_process /system/bin party.qwer.iris.Main > /data/local/tmp/stend_log.txt 2>&1 &"
-        self.run(["shell", cmd])
-        
-        time.sleep(2)
-        pid = self.run(["shell", "pidof", "party.qwer.iris"])
-        if pid:
-            print(f"Subsystem ready (PID: {pid})")
-            return True
-        return False
+        self.setup_port_forward(local_port, 3000)
+        return self.deploy_iris(apk_path, iris_url=f"http://localhost:{local_port}")["ready"]
 
     def setup_port_forward(self, local=3000, remote=3000):
         print(f"Forwarding tcp:{local} -> tcp:{remote}")
         self.run(["forward", f"tcp:{local}", f"tcp:{remote}"])
+
@@ -0,0 +1,265 @@
+import os
+import socket
+import struct
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+ADB_HOST = "127.0.0.1"
+ADB_PORT = 5037
+SYNC_DATA_MAX = 64 * 1024
+STREAM_LIMIT = 1024 * 1024
+READ_CHUNK = 16 * 1024
+
+
+class AdbError(Exception):
+    pass
+
+
+class AdbClient:
+    """
+    Async client for the adb server's smart-socket protocol (port 5037).
+    Every service request is "<4 hex length><payload>" answered by OKAY or
+    FAIL; device services are reached by first switching the socket to the
+    device transport with host:transport:<serial>.
+    """
+    def __init__(self, host=ADB_HOST, port=ADB_PORT, connect_timeout=2.0):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+
+    async def _open(self) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        return await asyncio.wait_for(asyncio.open_connection(self.host, self.port, limit=STREAM_LIMIT), self.connect_timeout)
+
+    @staticmethod
+    async def _request(reader, writer, payload: str):
+        data = payload.encode("utf-8")
+        writer.write(b"%04x" % len(data) + data)
+        await writer.drain()
+        status = await reader.readexactly(4)
+        if status == b"OKAY":
+            return
+        if status == b"FAIL":
+            raise AdbError(await AdbClient._read_prefixed(reader))
+        raise AdbError(f"Unexpected adb response: {status!r}")
+
+    @staticmethod
+    async def _read_prefixed(reader) -> str:
+        length = int(await reader.readexactly(4), 16)
+        return (await reader.readexactly(length)).decode("utf-8", "replace")
+
+    @staticmethod
+    def _close(writer):
+        try:
+            writer.close()
+        except Exception:
+            pass
+
+    async def host_command(self, cmd: str, reply=True) -> str:
+        reader, writer = await self._open()
+        try:
+            await self._request(reader, writer, cmd)
+            return await self._read_prefixed(reader) if reply else ""
+        finally:
+            self._close(writer)
+
+    async def open_service(self, serial: str, service: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Opens a raw stream to a device service (shell:..., exec:..., sync:)."""
+        reader, writer = await self._open()
+        try:
+            await self._request(reader, writer, f"host:transport:{serial}")
+            await self._request(reader, writer, service)
+        except Exception:
+            self._close(writer)
+            raise
+        return reader, writer
+
+    # --- Host services ---
+    async def version(self) -> int:
+        return int(await self.host_command("host:version"), 16)
+
+    async def connect_device(self, target: str) -> str:
+        return await self.host_command(f"host:connect:{target}")
+
+    async def get_state(self, serial: str) -> str:
+        return await self.host_command(f"host-serial:{serial}:get-state")
+
+    async def forward(self, serial: str, local: str, remote: str):
+        reader, writer = await self._open()
+        try:
+            # forward answers OKAY twice: once for the host, once for the rule itself
+            await self._request(reader, writer, f"host-serial:{serial}:forward:{local};{remote}")
+            status = await reader.readexactly(4)
+            if status == b"FAIL":
+                raise AdbError(await self._read_prefixed(reader))
+        finally:
+            self._close(writer)
+
+    # --- Device services ---
+    async def shell(self, serial: str, command: str, timeout: Optional[float] = None) -> str:
+        reader, writer = await self.open_service(serial, f"shell:{command}")
+        try:
+            data = await asyncio.wait_for(reader.read(), timeout)
+            return data.decode("utf-8", "replace")
+        finally:
+            self._close(writer)
+
+    async def shell_bounded(self, serial: str, command: str, timeout: float, max_bytes: int) -> Dict[str, Any]:
+        """
+        Runs a command and collects at most `max_bytes` of output for at most
+        `timeout` seconds; whatever arrived by then is returned, so commands
+        that never end (logcat, tail -f) give a snapshot instead of hanging.
+        """
+        reader, writer = await self.open_service(serial, f"shell:{command}")
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        chunks, size = [], 0
+        truncated = timed_out = False
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                try:
+                    chunk = await asyncio.wait_for(reader.read(READ_CHUNK), remaining)
+                except asyncio.TimeoutError:
+                    timed_out = True
+                    break
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= max_bytes:
+                    truncated = True
+                    break
+        finally:
+            # Closing the stream hangs up the remote command if it is still running
+            self._close(writer)
+        output = b"".join(chunks)[:max_bytes].decode("utf-8", "replace")
+        return {"output": output, "truncated": truncated, "timed_out": timed_out}
+
+    async def open_interactive(self, serial: str) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Raw `sh` on the device with stderr folded into stdout, for streaming front ends."""
+        reader, writer = await self.open_service(serial, "exec:sh")
+        writer.write(b"exec 2>&1\n")
+        await writer.drain()
+        return reader, writer
+
+    async def push(self, serial: str, local: str, remote: str, mode=0o644):
+        reader, writer = await self.open_service(serial, "sync:")
+        try:
+            spec = f"{remote},{mode}".encode("utf-8")
+            writer.write(b"SEND" + struct.pack("<I", len(spec)) + spec)
+            with open(local, "rb") as f:
+                while True:
+                    chunk = f.read(SYNC_DATA_MAX)
+                    if not chunk:
+                        break
+                    writer.write(b"DATA" + struct.pack("<I", len(chunk)) + chunk)
+                    await writer.drain()
+            writer.write(b"DONE" + struct.pack("<I", int(os.path.getmtime(local))))
+            await writer.drain()
+            status = await reader.readexactly(4)
+            length = struct.unpack("<I", await reader.readexactly(4))[0]
+            if status != b"OKAY":
+                msg = (await reader.readexactly(length)).decode("utf-8", "replace")
+                raise AdbError(f"push failed: {msg}")
+            writer.write(b"QUIT" + struct.pack("<I", 0))
+            await writer.drain()
+        finally:
+            self._close(writer)
+
+    async def open_shell(self, serial: str) -> "AdbShellSession":
+        session = AdbShellSession(self, serial)
+        await session.start()
+        return session
+
+
+class AdbShellSession:
+    """
+    One long-lived `sh` on the device (exec:sh, raw stdio) reused for
+    sequential commands. Each command is followed by a unique marker line
+    carrying its exit code, which delimits the output.
+    """
+    def __init__(self, client: AdbClient, serial: str):
+        self.client = client
+        self.serial = serial
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+        self._seq = 0
+
+    async def start(self):
+        self.reader, self.writer = await self.client.open_service(self.serial, "exec:sh")
+
+    @property
+    def closed(self) -> bool:
+        return self.writer is None or self.writer.is_closing() or self.reader.at_eof()
+
+    async def run(self, command: str, timeout: Optional[float] = 30.0) -> Tuple[str, int]:
+        async with self._lock:
+            if self.closed:
+                await self.start()
+            self._seq += 1
+            marker = f"__STEND_{os.getpid()}_{self._seq}__"
+            # Subshell keeps each command's environment isolated, like separate `adb shell` calls
+            self.writer.write(f"( {command}\n) 2>&1 </dev/null; echo \"{marker}$?\"\n".encode("utf-8"))
+            await self.writer.drain()
+            try:
+                return await asyncio.wait_for(self._read_until(marker), timeout)
+            except asyncio.TimeoutError:
+                # The stream is now out of sync with our markers; start fresh next time
+                self.close()
+                raise
+
+    async def _read_until(self, marker: str) -> Tuple[str, int]:
+        lines = []
+        while True:
+            raw = await self.reader.readline()
+            if not raw:
+                raise AdbError("shell session closed")
+            line = raw.decode("utf-8", "replace")
+            idx = line.find(marker)
+            if idx != -1:
+                if idx:
+                    lines.append(line[:idx])
+                code = line[idx + len(marker):].strip()
+                return "".join(lines), int(code) if code.lstrip("-").isdigit() else -1
+            lines.append(line)
+
+    def close(self):
+        if self.writer:
+            AdbClient._close(self.writer)
+        self.writer = None
+
+
+class AsyncRunner:
+    """Background event loop so synchronous managers can drive AdbClient coroutines."""
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True, name="adb-protocol")
+        self.thread.start()
+
+    def run(self, coro, timeout: Optional[float] = None):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+
+_runner: Optional[AsyncRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_runner() -> AsyncRunner:
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncRunner()
+        return _runner
+
+
+def server_available(host=ADB_HOST, port=ADB_PORT, timeout=0.5) -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=timeout):
+            return True
+    except OSError:
+        return False
@@ -0,0 +1,157 @@
+import os
+import time
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from stend.core.managers.metrics import registry
+
+ADMISSION_WAIT = registry.histogram("stend_admission_wait_seconds", "Time requests spent queued for a route slot", ["group"])
+ADMISSION_SHED = registry.counter("stend_admission_shed_total", "Requests rejected by admission control", ["group", "reason"])
+
+# (path prefix, max concurrent requests); first match wins
+DEFAULT_LIMITS = [
+    ("/api/stend/query", 8),
+    ("/api/stend/db/", 4),
+    ("/api/stend/link/", 8),
+    ("/api/action/", 8),
+    ("/api/stend/", 32),
+]
+
+
+class Overloaded(Exception):
+    def __init__(self, group: str, reason: str, waited: float):
+        super().__init__(f"Route group '{group}' overloaded ({reason}, waited {waited * 1000:.0f}ms)")
+        self.group = group
+        self.reason = reason
+        self.waited = waited
+
+
+class RouteLimiter:
+    """
+    Concurrency limit for one route group. Requests beyond the limit queue;
+    one that has waited `max_wait` seconds is shed instead of served late,
+    and once `max_queue` are waiting new arrivals are shed at once.
+
+    The count is shared by every event loop that serves the app (the leader
+    also runs one on its leader-http thread): slots are counted under a
+    thread lock and a released slot is handed to the oldest waiter on
+    whichever loop it is queued.
+    """
+    def __init__(self, group: str, limit: int, max_wait: float, max_queue: Optional[int] = None):
+        self.group = group
+        self.limit = limit
+        self.max_wait = max_wait
+        self.max_queue = max_queue if max_queue is not None else limit * 4
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed = 0
+        self.last_wait = 0.0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._lock = threading.Lock()
+
+    async def acquire(self) -> float:
+        start = time.perf_counter()
+        with self._lock:
+            if self.in_flight < self.limit:
+                # A free slot is taken without suspending, so it never counts as queued
+                self.in_flight += 1
+                waiter = None
+            elif self.queued >= self.max_queue:
+                waiter = False
+            else:
+                loop = asyncio.get_running_loop()
+                waiter = (loop, loop.create_future())
+                self._waiters.append(waiter)
+                self.queued += 1
+        if waiter is False:
+            self._shed("queue_full")
+            raise Overloaded(self.group, "queue full", 0.0)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter[1], self.max_wait)
+            except asyncio.TimeoutError:
+                # A slot granted after the timeout cancelled the future is passed on by _grant
+                if not self._granted(waiter):
+                    waited = time.perf_counter() - start
+                    self._shed("queue_time")
+                    raise Overloaded(self.group, "queue time", waited)
+            except asyncio.CancelledError:
+                if self._granted(waiter):
+                    self.release()
+                raise
+        waited = time.perf_counter() - start
+        self.last_wait = waited
+        self.admitted += 1
+        ADMISSION_WAIT.labels(self.group).observe(waited)
+        return waited
+
+    def _granted(self, waiter) -> bool:
+        """Drops a waiter that stopped waiting; True if it holds a slot regardless."""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+                self.queued -= 1
+                return False
+        fut = waiter[1]
+        return fut.done() and not fut.cancelled()
+
+    def release(self):
+        """Frees a slot; safe to call from any thread or loop."""
+        with self._lock:
+            if not self._waiters:
+                self.in_flight -= 1
+                return
+            # The slot moves straight to the next waiter, so in_flight is unchanged
+            loop, fut = self._waiters.popleft()
+            self.queued -= 1
+        try:
+            loop.call_soon_threadsafe(self._grant, fut)
+        except RuntimeError:
+            # The waiter's loop has closed
+            self.release()
+
+    def _grant(self, fut: asyncio.Future):
+        if fut.done():
+            # The waiter gave up (timeout or cancellation) before the slot arrived
+            self.release()
+        else:
+            fut.set_result(None)
+
+    def _shed(self, reason: str):
+        self.shed += 1
+        ADMISSION_SHED.labels(self.group, reason).inc()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"limit": self.limit, "in_flight": self.in_flight, "queued": self.queued,
+                "admitted": self.admitted, "shed": self.shed, "last_wait_ms": round(self.last_wait * 1000, 1)}
+
+
+class AdmissionControl:
+    """Maps request paths to their RouteLimiter by prefix."""
+    def __init__(self, limits: List[Tuple[str, int]], max_wait=2.0):
+        self.limiters = [(prefix, RouteLimiter(prefix, limit, max_wait)) for prefix, limit in limits]
+
+    @classmethod
+    def from_env(cls) -> "AdmissionControl":
+        """STEND_ROUTE_LIMITS="/api/stend/query=4,/api/stend/=16" overrides the defaults; STEND_ADMISSION_MAX_WAIT in seconds."""
+        spec = os.environ.get("STEND_ROUTE_LIMITS")
+        limits = DEFAULT_LIMITS
+        if spec:
+            limits = []
+            for entry in spec.split(","):
+                prefix, _, limit = entry.strip().rpartition("=")
+                if prefix and limit.isdigit():
+                    limits.append((prefix, int(limit)))
+        return cls(limits, max_wait=float(os.environ.get("STEND_ADMISSION_MAX_WAIT", "2.0")))
+
+    def limiter_for(self, path: str) -> Optional[RouteLimiter]:
+        for prefix, limiter in self.limiters:
+            if path.startswith(prefix):
+                return limiter
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {prefix: limiter.to_dict() for prefix, limiter in self.limiters}
@@ -0,0 +1,117 @@
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from stend.core.managers.metrics import registry
+
+BREAKER_TRANSITIONS = registry.counter("stend_breaker_transitions_total", "Circuit breaker state changes", ["name", "state"])
+BREAKER_REJECTED = registry.counter("stend_breaker_rejected_total", "Calls failed fast by an open circuit", ["name"])
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Upstream '{name}' unavailable (circuit open, retry in {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast once an upstream stops answering.
+
+    closed -> open after `failure_threshold` consecutive transport failures.
+    While open every call raises CircuitOpenError. After `reset_timeout`
+    the breaker goes half-open: if a `probe` is given it runs once in the
+    background (calls keep failing fast meanwhile), otherwise a single call
+    is let through as the trial. Success closes the circuit; failure opens
+    it again with the timeout doubled (up to `max_reset_timeout`).
+    """
+    def __init__(self, name: str, failure_threshold=5, reset_timeout=5.0, max_reset_timeout=60.0,
+                 probe: Optional[Callable[[], bool]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.probe = probe
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+        self._timeout = reset_timeout
+        self._retry_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Call before each upstream request; raises CircuitOpenError instead of letting it wait."""
+        if self.state == CLOSED:
+            return
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            now = time.monotonic()
+            if self.state == OPEN and now >= self._retry_at:
+                self._set(HALF_OPEN)
+                if self.probe is not None:
+                    threading.Thread(target=self._run_probe, daemon=True, name=f"probe-{self.name}").start()
+                else:
+                    self._trial = True
+                    return
+            self.rejected += 1
+            BREAKER_REJECTED.labels(self.name).inc()
+            raise CircuitOpenError(self.name, max(self._retry_at - now, 0.0))
+
+    def success(self):
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self._trial = False
+            if self.state != CLOSED:
+                self._timeout = self.reset_timeout
+                self._set(CLOSED)
+
+    def failure(self, error: Any = None):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) if error is not None else None
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self._trip()
+
+    def _trip(self):
+        # Back off further each time a trial fails in a row
+        if self.state == HALF_OPEN:
+            self._timeout = min(self._timeout * 2, self.max_reset_timeout)
+        self._trial = False
+        self.opened_at = time.time()
+        self._retry_at = time.monotonic() + self._timeout
+        self._set(OPEN)
+
+    def _run_probe(self):
+        try:
+            ok = bool(self.probe())
+        except Exception as e:
+            ok = False
+            self.last_error = str(e)
+        if ok:
+            self.success()
+        else:
+            with self._lock:
+                if self.state == HALF_OPEN:
+                    self._trip()
+
+    def _set(self, state: str):
+        if state != self.state:
+            print(f"[Breaker] {self.name}: {self.state} -> {state}")
+            self.state = state
+            BREAKER_TRANSITIONS.labels(self.name, state).inc()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "opened_at": self.opened_at,
+                "retry_in": round(max(self._retry_at - time.monotonic(), 0.0), 2) if self.state == OPEN else 0.0,
+                "rejected": self.rejected, "last_error": self.last_error}
@@ -1,15 +1,49 @@
 import websocket
 import threading
+import requests
+import random
 import json
 import time
+from typing import Any, Dict, List, Optional
+
+from stend.core.managers.metrics import registry
+from stend.core.managers.tracing import tracer
+from stend.core.managers.dedup import event_key, make_dedup
+
+BACKFILL_EVENTS = registry.counter("stend_bridge_backfill_events_total", "Messages recovered by reconnect backfill")
+BACKFILL_DURATION = registry.histogram("stend_bridge_backfill_seconds", "Time spent backfilling after a reconnect")
+RECONNECTS = registry.counter("stend_bridge_reconnects_total", "Bridge reconnect attempts")
 
 class IrisBridge:
-    def __init__(self, url="ws://localhost:3000/ws", on_message=None):
+    """
+    WebSocket client for the Iris event stream.
+    Tracks the chat_logs _id of the last message it delivered; after a
+    reconnect the missed range is read back through /query in bounded pages
+    and delivered, in order, before any live frame. Reconnects back off
+    exponentially with jitter. Frames already seen within the dedup window
+    (observer double-fires, reconnect/backfill overlap) are dropped.
+    """
+    def __init__(self, url="ws://localhost:3000/ws", on_message=None, iris_url=None,
+                 page_size=200, backfill_limit=5000, backoff_initial=0.5, backoff_max=30.0, dedup=None):
         self.url = url
         self.ws = None
         self.on_message_callback = on_message
         self.keep_running = False
+        self.connected = False
         self.thread = None
+        # http://host:port of the same Iris, for backfill queries
+        self.iris_url = (iris_url or url.replace("ws", "http", 1).rsplit("/ws", 1)[0]).rstrip("/")
+        self.page_size = page_size
+        self.backfill_limit = backfill_limit
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.last_log_id: Optional[int] = None
+        self.dedup = dedup if dedup is not None else make_dedup()
+        self._attempt = 0
+        # Live frames at or below this _id were already delivered by the backfill
+        self._backfilled_to = 0
+        self.stats: Dict[str, Any] = {"reconnects": 0, "backfills": 0, "backfilled": 0,
+                                      "last_gap": None, "last_backfill_ms": None, "truncated": 0}
 
     def start(self):
         self.keep_running = True
@@ -30,26 +64,195 @@ class IrisBridge:
                 self.ws.run_forever()
             except Exception as e:
                 print(f"[Bridge] Connection failed: {e}")
-            
+
             if self.keep_running:
-                print("[Bridge] Reconnecting in 3s...")
-                time.sleep(3)
+                delay = self._next_delay()
+                print(f"[Bridge] Reconnecting in {delay:.1f}s...")
+                time.sleep(delay)
+
+    def _next_delay(self) -> float:
+        # "Equal jitter": half fixed, half random, so a fleet of bridges does not reconnect in lockstep
+        cap = min(self.backoff_max, self.backoff_initial * (2 ** self._attempt))
+        self._attempt += 1
+        RECONNECTS.inc()
+        self.stats["reconnects"] += 1
+        return cap / 2 + random.uniform(0, cap / 2)
 
     def _on_open(self, ws):
+        self.connected = True
+        self._attempt = 0
         print("[Bridge] Connected to Iris Android Subsystem")
+        if self.last_log_id is not None:
+            # Runs on the socket thread, so live frames queue up behind the backfill
+            self._backfill()
 
     def _on_message(self, ws, message):
+        # The trace starts at receive time and follows the event through dispatch
+        trace = tracer.start(source="bridge")
         try:
-            data = json.loads(message)
-            if self.on_message_callback:
-                self.on_message_callback(data)
+            with tracer.activate(trace):
+                with trace.span("bridge.decode"):
+                    data = json.loads(message)
+                self._deliver(trace, data)
         except Exception as e:
             print(f"[Bridge] Message parse error: {e}")
+        finally:
+            trace.finish()
+
+    def _deliver(self, trace, data):
+        key = event_key(data) if self.dedup is not None else None
+        if key is not None and self.dedup.seen(key):
+            trace.attrs["dropped"] = "duplicate"
+            return
+        log_id = self._log_id(data)
+        if log_id is not None:
+            if log_id <= self._backfilled_to:
+                trace.attrs["dropped"] = "backfilled"
+                return
+            if self.last_log_id is None or log_id > self.last_log_id:
+                self.last_log_id = log_id
+        self._annotate(trace, data)
+        if self.on_message_callback:
+            self.on_message_callback(data)
+
+    @staticmethod
+    def _log_id(data) -> Optional[int]:
+        if not isinstance(data, dict) or "msg" not in data:
+            return None
+        try:
+            return int((data.get("json") or {}).get("_id"))
+        except (TypeError, ValueError):
+            return None
+
+    # --- Backfill ---
+    def _query(self, sql: str, *binds) -> List[Dict[str, Any]]:
+        r = requests.post(f"{self.iris_url}/query", timeout=10,
+                          json={"query": sql, "bind": [{"content": str(b)} for b in binds]})
+        body = r.json()
+        if r.status_code != 200 or "data" not in body:
+            raise RuntimeError(body.get("message") or f"HTTP {r.status_code}")
+        return body["data"]
+
+    def _names(self, rows) -> Dict[str, Dict[str, str]]:
+        """Best-effort room and sender names for backfilled rows (ids are used when lookup fails)."""
+        names: Dict[str, Dict[str, str]] = {"rooms": {}, "users": {}}
+        rooms = sorted({r.get("chat_id") for r in rows if r.get("chat_id")})
+        senders = sorted({(r.get("chat_id"), r.get("user_id")) for r in rows if r.get("chat_id") and r.get("user_id")})
+        try:
+            if rooms:
+                for r in self._query(f"SELECT id, private_meta FROM chat_rooms WHERE id IN ({','.join('?' * len(rooms))})", *rooms):
+                    try:
+                        names["rooms"][str(r["id"])] = json.loads(r.get("private_meta") or "{}").get("name")
+                    except ValueError:
+                        pass
+        except Exception:
+            pass
+        if senders:
+            names["users"] = self._user_names(senders)
+        return names
+
+    def _user_names(self, senders) -> Dict[str, str]:
+        """Sender names keyed by "chat_id:user_id", since an open chat nickname belongs to one room."""
+        # Same lookup as KakaoDB.getNameOfUserId: the open chat nickname wins over the
+        # friends name. `enc` must be selected or Iris returns the name still encrypted.
+        # open_chat_member rows carry the room's link_id, so the room is matched through chat_rooms.
+        values = ",".join(["(?, ?)"] * len(senders))
+        try:
+            found = self._query(
+                f"WITH info(chat_id, user_id) AS (VALUES {values}) "
+                "SELECT info.chat_id AS chat_id, info.user_id AS id, COALESCE(m.nickname, friends.name) AS name, "
+                "COALESCE(m.enc, friends.enc) AS enc FROM info "
+                "LEFT JOIN chat_rooms ON chat_rooms.id = info.chat_id "
+                "LEFT JOIN open_chat_member m ON m.user_id = info.user_id AND m.link_id = chat_rooms.link_id "
+                "LEFT JOIN friends ON friends.id = info.user_id", *[v for pair in senders for v in pair])
+        except Exception:
+            # Older KakaoTalk databases have no open_chat_member table
+            users = sorted({user for _, user in senders})
+            try:
+                friends = self._query(f"SELECT id, name, enc FROM friends WHERE id IN ({','.join('?' * len(users))})", *users)
+            except Exception:
+                return {}
+            by_id = {str(r["id"]): r for r in friends}
+            found = [dict(by_id[str(user)], chat_id=chat) for chat, user in senders if str(user) in by_id]
+        # A name without its enc could not be decrypted; the caller falls back to the id
+        return {f"{r['chat_id']}:{r['id']}": r["name"] for r in found if r.get("name") and r.get("enc") is not None}
+
+    def _backfill(self):
+        start = time.perf_counter()
+        cursor = self.last_log_id
+        delivered = skipped = 0
+        try:
+            while delivered < self.backfill_limit:
+                rows = self._query("SELECT * FROM chat_logs WHERE _id > ? ORDER BY _id ASC LIMIT ?",
+                                   cursor, min(self.page_size, self.backfill_limit - delivered))
+                if not rows:
+                    break
+                names = self._names(rows)
+                for row in rows:
+                    if self._is_sync(row):
+                        # Iris's observer ignores these too; the cursor still moves past them
+                        skipped += 1
+                        continue
+                    frame = {"msg": row.get("message"),
+                             "room": names["rooms"].get(str(row.get("chat_id"))) or str(row.get("chat_id")),
+                             "sender": names["users"].get(f"{row.get('chat_id')}:{row.get('user_id')}")
+                                       or str(row.get("user_id")),
+                             "json": row, "backfill": True}
+                    trace = tracer.start(source="backfill")
+                    try:
+                        with tracer.activate(trace):
+                            self._deliver(trace, frame)
+                    finally:
+                        trace.finish()
+                    delivered += 1
+                cursor = int(rows[-1]["_id"])
+                if len(rows) < self.page_size:
+                    break
+            else:
+                # Gap larger than the limit: the oldest part is recovered, the rest is skipped
+                self.stats["truncated"] += 1
+                print(f"[Bridge] Backfill limit ({self.backfill_limit}) reached; newer messages after _id {cursor} skipped")
+        except Exception as e:
+            print(f"[Bridge] Backfill failed after {delivered} messages: {e}")
+        self._backfilled_to = cursor or 0
+        elapsed = time.perf_counter() - start
+        BACKFILL_EVENTS.inc(delivered)
+        BACKFILL_DURATION.observe(elapsed)
+        self.stats.update(backfills=self.stats["backfills"] + 1, backfilled=self.stats["backfilled"] + delivered,
+                          last_gap=delivered, last_backfill_ms=round(elapsed * 1000, 1))
+        print(f"[Bridge] Backfilled {delivered} missed messages in {elapsed * 1000:.0f}ms"
+              + (f" ({skipped} sync rows skipped)" if skipped else ""))
+
+    @staticmethod
+    def _is_sync(row) -> bool:
+        """Rows written by a sync (SYNCMSG/MCHATLOGS origin) rather than a received message."""
+        try:
+            origin = json.loads(row.get("v") or "{}").get("origin")
+        except (TypeError, ValueError, AttributeError):
+            return False
+        return origin in ("SYNCMSG", "MCHATLOGS")
+
+    @staticmethod
+    def _annotate(trace, data):
+        if not isinstance(data, dict):
+            return
+        raw = data.get("json") or {}
+        trace.attrs["type"] = "message" if "msg" in data else data.get("event") or data.get("type")
+        trace.attrs["room"] = raw.get("chat_id") or data.get("chat_id")
+        trace.attrs["log_id"] = raw.get("id")
+        created_at = raw.get("created_at") or data.get("timestamp")
+        if created_at:
+            try:
+                trace.attrs["device_ms"] = round(max(trace.started_at - float(created_at), 0.0) * 1000, 3)
+            except (TypeError, ValueError):
+                pass
+        data["trace_id"] = trace.trace_id
 
     def _on_error(self, ws, error):
         print(f"[Bridge] Error: {error}")
 
     def _on_close(self, ws, close_status_code, close_msg):
+        self.connected = False
         print("[Bridge] Disconnected")
 
     def stop(self):
@@ -0,0 +1,105 @@
+import os
+import re
+import sys
+import time
+import socket
+import threading
+from typing import Callable, Optional
+
+import uvicorn
+
+# Routes whose state lives in the process that owns the bridge and skills
+LEADER_PREFIXES = (
+    "/api/status", "/api/control/", "/api/action/", "/api/profile", "/api/traces", "/api/metrics", "/metrics",
+    "/api/stend/queries", "/api/stend/db/clean", "/api/stend/fleet", "/api/stend/directory", "/api/stend/sdk",
+    "/api/stend/scheduler", "/api/stend/state",
+)
+
+
+# Served from leader-only in-memory state
+LEADER_PATTERNS = re.compile(r"^/api/stend/rooms/\d+/stats$")
+
+
+def is_leader_route(path: str) -> bool:
+    return path.startswith(LEADER_PREFIXES) or LEADER_PATTERNS.match(path) is not None
+
+
+class _FileLock:
+    """Exclusive, non-blocking lock on a file; released by the OS when the process dies."""
+    def __init__(self, path: str):
+        self.path = path
+        self._fh = None
+
+    def try_acquire(self) -> bool:
+        fh = open(self.path, "a+")
+        try:
+            if sys.platform == "win32":
+                import msvcrt
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        self._fh = fh
+        return True
+
+
+class WorkerCluster:
+    """
+    Leader election between the uvicorn workers of one API node (run.py --workers N).
+
+    Every worker serves HTTP; the worker holding the lock file is the leader
+    and runs the lifecycle (bridge, skills, device health). The leader also
+    serves the same app on a private loopback port, published in the store,
+    so followers can forward leader-only routes to it. When the leader dies
+    the OS drops its lock and the next worker to retry takes over.
+    """
+    STORE_KEY = "stend:cluster:leader"
+
+    def __init__(self, store, app, lock_path="stend_leader.lock", retry_interval=2.0):
+        self.store = store
+        self.app = app
+        self.lock = _FileLock(lock_path)
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self.leader_url: Optional[str] = None
+        self._internal: Optional[uvicorn.Server] = None
+
+    @classmethod
+    def from_env(cls, store, app) -> Optional["WorkerCluster"]:
+        if int(os.environ.get("STEND_WORKERS", "1")) <= 1:
+            return None
+        return cls(store, app, os.environ.get("STEND_LEADER_LOCK", "stend_leader.lock"))
+
+    def start(self, on_elected: Callable[[], None]):
+        def campaign():
+            while not self.lock.try_acquire():
+                time.sleep(self.retry_interval)
+            self._become_leader()
+            on_elected()
+        threading.Thread(target=campaign, daemon=True, name="leader-election").start()
+
+    def _become_leader(self):
+        port = self._free_port()
+        config = uvicorn.Config(self.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off")
+        self._internal = uvicorn.Server(config)
+        threading.Thread(target=self._internal.run, daemon=True, name="leader-http").start()
+        self.leader_url = f"http://127.0.0.1:{port}"
+        self.is_leader = True
+        self.store.put(self.STORE_KEY, {"pid": os.getpid(), "url": self.leader_url, "since": time.time()})
+        print(f"[Cluster] Worker {os.getpid()} elected leader (internal {self.leader_url})")
+
+    def current_leader(self) -> Optional[str]:
+        if self.is_leader:
+            return None
+        info = self.store.get(self.STORE_KEY) or {}
+        return info.get("url")
+
+    @staticmethod
+    def _free_port() -> int:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            return s.getsockname()[1]
@@ -0,0 +1,132 @@
+import os
+import math
+import time
+import hashlib
+from collections import deque
+from typing import Any, Dict, Optional
+
+from stend.core.managers.metrics import registry
+
+DEDUP_RESULTS = registry.counter("stend_bridge_dedup_total", "Bridge dedup lookups", ["result"])
+
+
+def event_key(data: Any) -> Optional[str]:
+    """Identity of a bridge frame: the Kakao log id for messages, the event tuple for stend_events."""
+    if not isinstance(data, dict):
+        return None
+    if "msg" in data:
+        raw = data.get("json") or {}
+        log_id = raw.get("id") or raw.get("_id")
+        return f"m:{log_id}" if log_id is not None else None
+    if data.get("type") == "stend_event":
+        return "e:{}:{}:{}:{}".format(data.get("event"), data.get("chat_id"), data.get("target_id"), data.get("timestamp"))
+    return None
+
+
+class DedupWindow:
+    """
+    Exact dedup over the last `max_items` keys seen within `max_age` seconds:
+    a deque of (time, key) in arrival order plus a set for O(1) membership.
+    Expired and overflowing keys fall off the left end.
+    """
+    def __init__(self, max_items=10000, max_age=300.0):
+        self.max_items = max_items
+        self.max_age = max_age
+        self._order = deque()
+        self._keys = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _evict(self, now):
+        order, keys = self._order, self._keys
+        while order and (len(order) >= self.max_items or now - order[0][0] > self.max_age):
+            keys.discard(order.popleft()[1])
+
+    def seen(self, key: str) -> bool:
+        """True if key is a duplicate; otherwise records it."""
+        now = time.monotonic()
+        if key in self._keys:
+            self.hits += 1
+            DEDUP_RESULTS.labels("hit").inc()
+            return True
+        self._evict(now)
+        self._order.append((now, key))
+        self._keys.add(key)
+        self.misses += 1
+        DEDUP_RESULTS.labels("miss").inc()
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "exact", "hits": self.hits, "misses": self.misses, "size": len(self._keys),
+                "max_items": self.max_items, "max_age": self.max_age}
+
+
+class BloomDedup:
+    """
+    Approximate dedup for very large windows: two generations of Bloom
+    filters sized for `capacity` keys each. The current generation rotates
+    out once it is full or older than `max_age`, so memory stays fixed and
+    a key is remembered for between one and two generations. False
+    positives (a new event treated as a duplicate) occur at ~`error_rate`.
+    """
+    def __init__(self, capacity=1000000, error_rate=1e-6, max_age=3600.0):
+        self.capacity = capacity
+        self.max_age = max_age
+        self.bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._current = bytearray((self.bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+        self._started = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.rotations = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _contains(bitset, positions):
+        return all(bitset[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def _rotate_if_needed(self):
+        if self._count >= self.capacity or time.monotonic() - self._started > self.max_age:
+            self._previous = self._current
+            self._current = bytearray(len(self._previous))
+            self._count = 0
+            self._started = time.monotonic()
+            self.rotations += 1
+
+    def seen(self, key: str) -> bool:
+        positions = self._positions(key)
+        if self._contains(self._current, positions) or self._contains(self._previous, positions):
+            self.hits += 1
+            DEDUP_RESULTS.labels("hit").inc()
+            return True
+        self._rotate_if_needed()
+        for p in positions:
+            self._current[p >> 3] |= 1 << (p & 7)
+        self._count += 1
+        self.misses += 1
+        DEDUP_RESULTS.labels("miss").inc()
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": "bloom", "hits": self.hits, "misses": self.misses, "size": self._count,
+                "capacity": self.capacity, "bytes": len(self._current) * 2, "hashes": self.hashes,
+                "rotations": self.rotations, "max_age": self.max_age}
+
+
+def make_dedup():
+    """Window from the environment: STEND_DEDUP_MODE (exact|bloom|off), STEND_DEDUP_WINDOW, STEND_DEDUP_TTL."""
+    mode = os.environ.get("STEND_DEDUP_MODE", "exact")
+    if mode == "off":
+        return None
+    if mode == "bloom":
+        return BloomDedup(capacity=int(os.environ.get("STEND_DEDUP_WINDOW", "1000000")),
+                          max_age=float(os.environ.get("STEND_DEDUP_TTL", "3600")))
+    return DedupWindow(max_items=int(os.environ.get("STEND_DEDUP_WINDOW", "10000")),
+                       max_age=float(os.environ.get("STEND_DEDUP_TTL", "300")))
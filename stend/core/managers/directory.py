@@ -0,0 +1,179 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from stend.core.managers.metrics import registry
+
+DIRECTORY_LOOKUPS = registry.counter("stend_directory_lookups_total", "Directory lookups", ["kind", "result"])
+DIRECTORY_UPDATES = registry.counter("stend_directory_updates_total", "Directory changes applied from events", ["source"])
+
+
+class Directory:
+    """
+    In-memory names for rooms and users, so skills need no Iris round trip
+    (and no on-device decryption) to turn an id into a name.
+
+    Bulk-loaded from /api/v1/rooms, /friends and /rooms/{id}/members, then
+    kept current from live bridge messages (room and sender names as seen)
+    and NICKNAME_CHANGE events. `version` increases with every change.
+    Ids are stored as strings; lookups accept ints or strings.
+    """
+    def __init__(self):
+        self.users: Dict[str, Dict[str, Any]] = {}
+        self.rooms: Dict[str, Dict[str, Any]] = {}
+        # room id -> user id -> nickname in that room (open chat nicknames differ per room)
+        self.members: Dict[str, Dict[str, str]] = {}
+        self.version = 0
+        self.loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    # --- Lookups (plain dict reads; safe without the lock) ---
+    def user(self, user_id) -> Optional[Dict[str, Any]]:
+        u = self.users.get(str(user_id))
+        DIRECTORY_LOOKUPS.labels("user", "hit" if u else "miss").inc()
+        return u
+
+    def room(self, room_id) -> Optional[Dict[str, Any]]:
+        r = self.rooms.get(str(room_id))
+        DIRECTORY_LOOKUPS.labels("room", "hit" if r else "miss").inc()
+        return r
+
+    def user_name(self, user_id, room_id=None) -> Optional[str]:
+        """Nickname in `room_id` if known, else the friend/profile name."""
+        if room_id is not None:
+            name = self.members.get(str(room_id), {}).get(str(user_id))
+            if name:
+                DIRECTORY_LOOKUPS.labels("user", "hit").inc()
+                return name
+        u = self.user(user_id)
+        return u.get("name") if u else None
+
+    def room_name(self, room_id) -> Optional[str]:
+        r = self.room(room_id)
+        return r.get("name") if r else None
+
+    def room_members(self, room_id) -> Dict[str, str]:
+        return dict(self.members.get(str(room_id), {}))
+
+    # --- Updates ---
+    def _bump(self, source: str):
+        self.version += 1
+        DIRECTORY_UPDATES.labels(source).inc()
+
+    @staticmethod
+    def _known(value, id) -> bool:
+        # A name equal to the bare id means the sender could not resolve it
+        return bool(value) and value != str(id)
+
+    def _set_user(self, user_id, name, **extra) -> bool:
+        if user_id is None or not name:
+            return False
+        key = str(user_id)
+        u = self.users.get(key)
+        if u is not None and u.get("name") == name and not extra:
+            return False
+        self.users[key] = dict(u or {"id": user_id}, name=name, **extra)
+        return True
+
+    def _set_room(self, room_id, **fields) -> bool:
+        if room_id is None:
+            return False
+        key = str(room_id)
+        r = self.rooms.get(key)
+        if r is not None and all(r.get(k) == v for k, v in fields.items()):
+            return False
+        self.rooms[key] = dict(r or {"id": room_id}, **fields)
+        return True
+
+    def _set_member(self, room_id, user_id, name) -> bool:
+        if room_id is None or user_id is None or not name:
+            return False
+        room = self.members.setdefault(str(room_id), {})
+        if room.get(str(user_id)) == name:
+            return False
+        room[str(user_id)] = name
+        return True
+
+    def observe(self, event) -> bool:
+        """Applies a bridge Message/Event (stend.core.message). Returns True if anything changed."""
+        changed = False
+        with self._lock:
+            if event.kind == "message":
+                # Only the live stream updates names: backfilled frames carry names
+                # read back from the database (or bare ids), which may be stale
+                if event.backfill:
+                    return False
+                room = event.room
+                if self._known(room.name, room.id):
+                    changed |= self._set_room(room.id, name=room.name)
+                sender = event.sender
+                if self._known(sender.name, sender.id):
+                    changed |= self._set_member(room.id, sender.id, sender.name)
+                    if str(sender.id) not in self.users:
+                        changed |= self._set_user(sender.id, sender.name)
+                if changed:
+                    self._bump("message")
+            elif event.kind == "stend_event" and event.event == "NICKNAME_CHANGE":
+                old, new = event.get("from"), event.get("to")
+                changed = self._set_user(event.target_id, new)
+                uid = str(event.target_id)
+                for room in self.members.values():
+                    if room.get(uid) == old:
+                        room[uid] = new
+                        changed = True
+                if changed:
+                    self._bump("nickname")
+        return changed
+
+    def load(self, fetch: Callable[[str], Any], device: Optional[str] = None, member_workers=4) -> Dict[str, int]:
+        """
+        Bulk load through `fetch(path) -> parsed JSON` against one Iris.
+        Member lists are fetched per room on a small pool.
+        """
+        started = time.perf_counter()
+        rooms = fetch("/api/v1/rooms")
+        friends = fetch("/api/v1/friends")
+        rooms = rooms if isinstance(rooms, list) else []
+        friends = friends if isinstance(friends, list) else []
+
+        def members_of(room):
+            try:
+                rows = fetch(f"/api/v1/rooms/{room['id']}/members")
+                return room["id"], rows if isinstance(rows, list) else []
+            except Exception as e:
+                print(f"[Directory] Members of room {room.get('id')} failed: {e}")
+                return room["id"], []
+
+        with ThreadPoolExecutor(max_workers=member_workers, thread_name_prefix="directory") as pool:
+            member_lists = list(pool.map(members_of, [r for r in rooms if r.get("id") is not None]))
+
+        with self._lock:
+            for f in friends:
+                self._set_user(f.get("id"), f.get("name"), profile_image_url=f.get("profile_image_url"))
+            for r in rooms:
+                fields = {"name": r.get("name"), "type": r.get("type"),
+                          "member_count": r.get("active_member_count")}
+                if device:
+                    fields["device"] = device
+                self._set_room(r.get("id"), **fields)
+            count = 0
+            for room_id, rows in member_lists:
+                for m in rows:
+                    if self._set_member(room_id, m.get("user_id"), m.get("nickname")):
+                        count += 1
+            self._bump("load")
+            self.loaded_at = time.time()
+        summary = {"rooms": len(rooms), "users": len(friends), "members": count,
+                   "ms": round((time.perf_counter() - started) * 1000, 1)}
+        print(f"[Directory] Loaded {summary['rooms']} rooms, {summary['users']} users, "
+              f"{summary['members']} memberships in {summary['ms']:.0f}ms" + (f" ({device})" if device else ""))
+        return summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "loaded_at": self.loaded_at, "rooms": len(self.rooms),
+                "users": len(self.users), "memberships": sum(len(m) for m in self.members.values())}
+
+
+# Process-wide directory; skills import it directly
+directory = Directory()
@@ -1,58 +1,124 @@
 import requests
 import threading
 import json
+import time
+from contextlib import nullcontext
 from typing import Dict, Any, List
 
+from stend.core.managers.metrics import registry
+from stend.core.managers.tracing import tracer
+
+WEBHOOK_LAG = registry.histogram("stend_webhook_delivery_lag_seconds", "Time from event trigger to webhook delivery", ["event"])
+WEBHOOK_ERRORS = registry.counter("stend_webhook_errors_total", "Failed webhook deliveries", ["event"])
+
 class WebhookManager:
-    def __init__(self):
+    """
+    Webhook subscriptions. With a store, subscriptions are kept there (one key
+    per URL) so every worker process sees the same set; the in-memory list is
+    refreshed from it at most every `refresh_interval` seconds.
+    """
+    STORE_PREFIX = "stend:webhook:"
+
+    def __init__(self, store=None, refresh_interval=2.0):
         self.webhooks: List[str] = []
         self._lock = threading.Lock()
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self._refreshed_at = 0.0
+
+    def _refresh(self, force=False):
+        if self.store is None or (not force and time.time() - self._refreshed_at < self.refresh_interval):
+            return
+        urls = [k[len(self.STORE_PREFIX):] for k in self.store.get_prefix(self.STORE_PREFIX)]
+        with self._lock:
+            self.webhooks = urls
+        self._refreshed_at = time.time()
 
     def add_webhook(self, url: str):
+        if self.store is not None:
+            self.store.put(self.STORE_PREFIX + url, {"added_at": time.time()})
+            self._refresh(force=True)
+            return
         with self._lock:
             if url not in self.webhooks:
                 self.webhooks.append(url)
 
     def remove_webhook(self, url: str):
+        if self.store is not None:
+            self.store.delete(self.STORE_PREFIX + url)
+            self._refresh(force=True)
+            return
         with self._lock:
             if url in self.webhooks:
                 self.webhooks.remove(url)
 
     def trigger(self, event_type: str, data: Any):
+        self._refresh()
+        with self._lock:
+            if not self.webhooks:
+                return
         payload = {
             "event": event_type,
-            "data": data
+            # Message/Event views serialize to the shared event schema
+            "data": data.to_dict() if hasattr(data, "to_dict") else data
         }
+        triggered = time.perf_counter()
+        # Keep the originating trace open until delivery finishes
+        trace = tracer.current()
+        if trace:
+            trace.hold()
         # Run in background to avoid blocking
         def _send():
             with self._lock:
                 current_webhooks = list(self.webhooks)
-            for url in current_webhooks:
-                try:
-                    requests.post(url, json=payload, timeout=2)
-                except Exception as e:
-                    print(f"Webhook error ({url}): {e}")
+            try:
+                for url in current_webhooks:
+                    try:
+                        with trace.span(f"webhook:{event_type}") if trace else nullcontext():
+                            requests.post(url, json=payload, timeout=2)
+                        WEBHOOK_LAG.labels(event_type).observe(time.perf_counter() - triggered)
+                    except Exception as e:
+                        WEBHOOK_ERRORS.labels(event_type).inc()
+                        print(f"Webhook error ({url}): {e}")
+            finally:
+                if trace:
+                    trace.release()
         
         threading.Thread(target=_send).start()
 
 class SharedStateManager:
-    def __init__(self):
+    """In-memory key/value state; backed by the store when several worker processes must share it."""
+    STORE_PREFIX = "stend:shared:"
+
+    def __init__(self, store=None):
         self.state: Dict[str, Any] = {}
         self._lock = threading.Lock()
+        self.store = store
 
     def set(self, key: str, value: Any):
+        if self.store is not None:
+            self.store.put(self.STORE_PREFIX + key, json.dumps(value))
+            return
         with self._lock:
             self.state[key] = value
 
     def get(self, key: str) -> Any:
+        if self.store is not None:
+            # Values are stored JSON-encoded, so the store's decode returns them unchanged (strings stay strings)
+            return self.store.get(self.STORE_PREFIX + key)
         with self._lock:
             return self.state.get(key)
 
     def delete(self, key: str):
+        if self.store is not None:
+            self.store.delete(self.STORE_PREFIX + key)
+            return
         with self._lock:
             if key in self.state:
                 del self.state[key]
 
     def get_all(self) -> Dict[str, Any]:
+        if self.store is not None:
+            return {k[len(self.STORE_PREFIX):]: v for k, v in self.store.get_prefix(self.STORE_PREFIX).items()}
         with self._lock:
             return dict(self.state)
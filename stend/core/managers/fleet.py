@@ -0,0 +1,249 @@
+import os
+import time
+import contextvars
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from stend.core.managers.adb import AdbManager
+from stend.core.managers.bridge import IrisBridge
+from stend.core.managers.breaker import CircuitBreaker
+from stend.core.managers.metrics import registry
+
+DEVICE_HEALTHY = registry.counter("stend_fleet_health_checks_total", "Device health checks", ["device", "result"])
+DEVICE_EVENTS = registry.meter("stend_fleet_events_total", "Bridge events per device", ["device"])
+
+IRIS_REMOTE_PORT = 3000
+
+
+class Device:
+    """One redroid/Android instance: its adb target, forwarded Iris port, bridge and health."""
+    def __init__(self, name: str, serial: Optional[str], local_port: int = IRIS_REMOTE_PORT, iris_url: Optional[str] = None):
+        self.name = name
+        self.serial = serial
+        self.local_port = local_port
+        self.iris_url = (iris_url or f"http://localhost:{local_port}").rstrip("/")
+        self.ws_url = self.iris_url.replace("http", "ws", 1) + "/ws"
+        # External devices (plain URL in the fleet spec) are not managed over adb
+        self.adb = AdbManager(target=serial) if serial else None
+        self.bridge: Optional[IrisBridge] = None
+        self.state = "unknown"
+        self.healthy = False
+        self.failures = 0
+        self.last_check = 0.0
+        self.last_event = 0.0
+        self.rooms = 0
+        # Upstream HTTP calls fail fast while this device's Iris is not answering
+        self.breaker = CircuitBreaker(f"iris:{name}", probe=self._probe)
+
+    def _probe(self) -> bool:
+        return requests.get(f"{self.iris_url}/dashboard/status", timeout=2).ok
+
+    def mark(self, ok: bool):
+        self.last_check = time.time()
+        if ok:
+            self.healthy = True
+            self.failures = 0
+        else:
+            self.failures += 1
+            # A single blip should not take a device out of rotation
+            if self.failures >= DeviceFleet.UNHEALTHY_AFTER:
+                self.healthy = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "serial": self.serial,
+            "iris_url": self.iris_url,
+            "state": self.state,
+            "healthy": self.healthy,
+            "bridge": "connected" if self.bridge and self.bridge.connected else "disconnected",
+            "bridge_stats": dict(self.bridge.stats, last_log_id=self.bridge.last_log_id,
+                                 dedup=self.bridge.dedup.stats() if self.bridge.dedup else None) if self.bridge else None,
+            "failures": self.failures,
+            "breaker": self.breaker.to_dict(),
+            "last_check": self.last_check,
+            "last_event": self.last_event,
+            "rooms": self.rooms,
+        }
+
+
+class DeviceFleet:
+    """
+    The set of devices an API node drives. Rooms belong to the account logged
+    in on one device, so room-scoped calls are routed by a room -> device map
+    learned from bridge events and room listings; account-wide views are
+    fanned out to every device and merged.
+
+    Spec (STEND_FLEET), comma separated:
+        <serial>=<local_port>    adb-managed, Iris forwarded to localhost:<local_port>
+        <serial>=<iris_url>      adb-managed, Iris reachable at <iris_url>
+        <iris_url>               external, no adb
+    Each entry may be prefixed with "<name>@" to override the device name.
+    """
+    UNHEALTHY_AFTER = 3
+    DISCOVERY_INTERVAL = 30
+
+    def __init__(self, devices: List[Device], health_interval: float = 10.0):
+        if not devices:
+            raise ValueError("A fleet needs at least one device")
+        self.devices = devices
+        self.by_name = {d.name: d for d in devices}
+        self.health_interval = health_interval
+        self.room_map: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._last_discovery = 0.0
+        self._pool = ThreadPoolExecutor(max_workers=max(len(devices), 2), thread_name_prefix="fleet")
+        self._health_thread = None
+
+    @classmethod
+    def from_spec(cls, spec: str, **kwargs) -> "DeviceFleet":
+        devices = []
+        for i, entry in enumerate(e.strip() for e in spec.split(",") if e.strip()):
+            name = None
+            if "@" in entry.split("=", 1)[0]:
+                name, entry = entry.split("@", 1)
+            if "=" in entry:
+                serial, target = entry.split("=", 1)
+                if target.isdigit():
+                    devices.append(Device(name or serial, serial, int(target)))
+                else:
+                    devices.append(Device(name or serial, serial, iris_url=target))
+            else:
+                devices.append(Device(name or f"device{i}", None, iris_url=entry))
+        return cls(devices, **kwargs)
+
+    @classmethod
+    def from_env(cls, default_serial: str, default_iris_url: str, external=False) -> "DeviceFleet":
+        interval = float(os.environ.get("STEND_FLEET_HEALTH_INTERVAL", "10"))
+        spec = os.environ.get("STEND_FLEET")
+        if spec:
+            return cls.from_spec(spec, health_interval=interval)
+        # Single device: the historical 127.0.0.1:5555 + localhost:3000 setup
+        return cls([Device("default", None if external else default_serial, iris_url=default_iris_url)],
+                   health_interval=interval)
+
+    @property
+    def multi(self) -> bool:
+        return len(self.devices) > 1
+
+    # --- Routing ---
+    def get(self, name: Optional[str]) -> Device:
+        if name is None:
+            return self.primary()
+        try:
+            return self.by_name[name]
+        except KeyError:
+            raise KeyError(f"Unknown device '{name}'")
+
+    def primary(self) -> Device:
+        for d in self.devices:
+            if d.healthy:
+                return d
+        return self.devices[0]
+
+    def healthy_devices(self) -> List[Device]:
+        return [d for d in self.devices if d.healthy] or list(self.devices)
+
+    def learn(self, room, device: Device):
+        if room is None:
+            return
+        room = str(room)
+        if self.room_map.get(room) == device.name:
+            return
+        with self._lock:
+            self.room_map[room] = device.name
+
+    def for_room(self, room) -> Device:
+        """Device whose account is in `room`. Unknown rooms trigger a (rate limited) discovery pass."""
+        if not self.multi:
+            return self.devices[0]
+        name = self.room_map.get(str(room))
+        if name is None and time.time() - self._last_discovery > self.DISCOVERY_INTERVAL:
+            self.discover_rooms()
+            name = self.room_map.get(str(room))
+        # The room stays on its device even while that device is unhealthy:
+        # no other account can act in it.
+        return self.by_name[name] if name else self.primary()
+
+    def discover_rooms(self):
+        self._last_discovery = time.time()
+        for device, rooms in self.fan_out(lambda d: requests.get(f"{d.iris_url}/api/v1/rooms", timeout=5).json()):
+            if isinstance(rooms, list):
+                self._learn_rooms(device, rooms)
+
+    def _learn_rooms(self, device: Device, rooms: List[dict]):
+        with self._lock:
+            for room in rooms:
+                if isinstance(room, dict) and room.get("id") is not None:
+                    self.room_map[str(room["id"])] = device.name
+        device.rooms = len(rooms)
+
+    def fan_out(self, fn: Callable[[Device], Any], devices: Optional[List[Device]] = None):
+        """Runs fn on each device concurrently; yields (device, result or exception)."""
+        devices = devices if devices is not None else self.healthy_devices()
+        # Each call gets its own context copy so the caller's trace follows it into the pool
+        futures = [(d, self._pool.submit(contextvars.copy_context().run, fn, d)) for d in devices]
+        for device, fut in futures:
+            try:
+                yield device, fut.result()
+            except Exception as e:
+                yield device, e
+
+    # --- Aggregate views ---
+    def merge_rooms(self, results) -> List[dict]:
+        merged = []
+        for device, rooms in results:
+            if isinstance(rooms, list):
+                self._learn_rooms(device, rooms)
+                merged.extend(dict(r, device=device.name) if isinstance(r, dict) else r for r in rooms)
+        return merged
+
+    @staticmethod
+    def merge_by_id(results, key="id") -> List[dict]:
+        """Union of per-device lists; the same id seen on several accounts lists all of them."""
+        merged: Dict[Any, dict] = {}
+        loose = []
+        for device, rows in results:
+            if not isinstance(rows, list):
+                continue
+            for row in rows:
+                if not isinstance(row, dict) or row.get(key) is None:
+                    loose.append(row)
+                    continue
+                entry = merged.setdefault(row[key], dict(row, devices=[]))
+                entry["devices"].append(device.name)
+        return list(merged.values()) + loose
+
+    # --- Health ---
+    def check_health(self):
+        def probe(d: Device):
+            return requests.get(f"{d.iris_url}/dashboard/status", timeout=3).ok
+        for device, ok in self.fan_out(probe, self.devices):
+            ok = ok is True
+            device.mark(ok)
+            DEVICE_HEALTHY.labels(device.name, "ok" if ok else "fail").inc()
+
+    def start_health_checks(self):
+        if self._health_thread or self.health_interval <= 0:
+            return
+        def loop():
+            while True:
+                try:
+                    self.check_health()
+                except Exception as e:
+                    print(f"[Fleet] Health check error: {e}")
+                time.sleep(self.health_interval)
+        self._health_thread = threading.Thread(target=loop, daemon=True, name="fleet-health")
+        self._health_thread.start()
+
+    def note_event(self, device: Device, room=None):
+        device.last_event = time.time()
+        # A live event stream is the best health signal there is
+        device.mark(True)
+        DEVICE_EVENTS.labels(device.name).inc()
+        self.learn(room, device)
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [d.to_dict() for d in self.devices]
@@ -0,0 +1,164 @@
+import time
+import uuid
+import threading
+import requests
+from typing import Any, Callable, Dict, Optional
+
+
+class PruneJob:
+    """
+    Background chat_logs pruning in bounded _id ranges.
+    Each chunk is a short DELETE so the device write lock is released between
+    chunks; progress is persisted to StendStore so a cancelled or interrupted
+    job can resume from its cursor.
+    """
+    STORE_KEY = "stend:jobs:db_clean"
+
+    def __init__(self, iris_url: str, store, chunk_size=2000, pause=0.25,
+                 on_progress: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.iris_url = iris_url
+        self.store = store
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._cancel = threading.Event()
+        self._thread = None
+        self.load()
+
+    def load(self):
+        """(Re)reads the persisted job, e.g. when this process takes over as cluster leader."""
+        if self.is_running():
+            return
+        self.status: Dict[str, Any] = self.store.get(self.STORE_KEY) or {"state": "idle"}
+        # A job that was running when the process died can only be resumed
+        if self.status.get("state") == "running":
+            self.status["state"] = "interrupted"
+
+    def _query(self, sql, *binds):
+        r = requests.post(f"{self.iris_url}/api/v1/query",
+                          json={"query": sql, "bind": [{"content": str(b)} for b in binds]},
+                          timeout=30)
+        body = r.json()
+        if r.status_code != 200 or "data" not in body:
+            raise RuntimeError(body.get("message") or body.get("error") or f"HTTP {r.status_code}")
+        return body["data"]
+
+    def _count(self, lo, hi, cutoff) -> int:
+        rows = self._query("SELECT COUNT(*) AS n FROM chat_logs WHERE _id >= ? AND _id < ? AND created_at < ?", lo, hi, cutoff)
+        return int(rows[0].get("n") or 0) if rows else 0
+
+    def _save(self):
+        self.status["updated_at"] = time.time()
+        self.store.put(self.STORE_KEY, self.status)
+        if self.on_progress:
+            self.on_progress(dict(self.status))
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_status(self) -> Dict[str, Any]:
+        status = dict(self.status)
+        lo, hi, cur = status.get("min_id"), status.get("max_id"), status.get("cursor")
+        if lo is not None and hi is not None and cur is not None:
+            span = max(hi - lo + 1, 1)
+            status["progress"] = round(min((cur - lo) / span, 1.0), 4)
+        return status
+
+    @staticmethod
+    def validate(days: float, chunk_size: Optional[int] = None, pause: Optional[float] = None):
+        """Raises ValueError for arguments that would delete everything or never finish."""
+        if days is None or days < 0:
+            raise ValueError("days must be >= 0")
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("chunk_size must be >= 1")
+        if pause is not None and pause < 0:
+            raise ValueError("pause must be >= 0")
+
+    def start(self, days: float, chunk_size: Optional[int] = None, pause: Optional[float] = None) -> Dict[str, Any]:
+        self.validate(days, chunk_size, pause)
+        with self._lock:
+            if self.is_running():
+                return self.get_status()
+            self.status = {
+                "id": uuid.uuid4().hex[:12],
+                "state": "running",
+                "days": days,
+                "cutoff_ts": int(time.time() - days * 24 * 60 * 60),
+                "chunk_size": self.chunk_size if chunk_size is None else chunk_size,
+                "pause": self.pause if pause is None else pause,
+                "min_id": None,
+                "max_id": None,
+                "cursor": None,
+                "deleted": 0,
+                "chunks": 0,
+                "started_at": time.time(),
+                "error": None,
+            }
+            self._launch()
+            return self.get_status()
+
+    def resume(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.is_running():
+                return self.get_status()
+            if self.status.get("state") not in ("cancelled", "failed", "interrupted"):
+                raise ValueError(f"Nothing to resume (state: {self.status.get('state')})")
+            self.status["state"] = "running"
+            self.status["error"] = None
+            self._launch()
+            return self.get_status()
+
+    def cancel(self) -> Dict[str, Any]:
+        self._cancel.set()
+        if self._thread:
+            self._thread.join(timeout=35)
+        return self.get_status()
+
+    def _launch(self):
+        # Caller holds the lock
+        self._cancel.clear()
+        self._save()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        st = self.status
+        try:
+            cutoff = st["cutoff_ts"]
+            if st["min_id"] is None:
+                rows = self._query("SELECT MIN(_id) AS lo, MAX(_id) AS hi FROM chat_logs WHERE created_at < ?", cutoff)
+                lo = rows[0].get("lo") if rows else None
+                if lo is None:
+                    st["state"] = "completed"
+                    self._save()
+                    return
+                st["min_id"], st["max_id"] = int(lo), int(rows[0]["hi"])
+                st["cursor"] = st["min_id"]
+                self._save()
+
+            while st["cursor"] <= st["max_id"]:
+                if self._cancel.is_set():
+                    st["state"] = "cancelled"
+                    self._save()
+                    return
+                lo, hi = st["cursor"], st["cursor"] + st["chunk_size"]
+                pending = self._count(lo, hi, cutoff)
+                if pending:
+                    self._query("DELETE FROM chat_logs WHERE _id >= ? AND _id < ? AND created_at < ?", lo, hi, cutoff)
+                    # /query reports no affected-row count; what is gone from the chunk is what the DELETE removed
+                    st["deleted"] += pending - self._count(lo, hi, cutoff)
+                st["cursor"] = hi
+                st["chunks"] += 1
+                self._save()
+                if pending and st["pause"]:
+                    self._cancel.wait(st["pause"])
+
+            st["state"] = "completed"
+            st["finished_at"] = time.time()
+            self._save()
+        except Exception as e:
+            st["state"] = "failed"
+            st["error"] = str(e)
+            self._save()
+            print(f"[PruneJob] Failed at cursor {st.get('cursor')}: {e}")
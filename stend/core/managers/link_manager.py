@@ -1,40 +1,228 @@
 import requests
 import json
 import base64
+import os
+import re
 import time
-import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from urllib.parse import quote
 
+from stend.core.managers.metrics import registry
+
+LINK_CACHE = registry.counter("stend_link_cache_total", "KakaoLink cache lookups", ["cache", "result"])
+LINK_SENDS = registry.counter("stend_link_sends_total", "KakaoLink picker/send results", ["result"])
+SERVER_DATA_RE = re.compile(r'window\.serverData = "([^"]+)"')
+
+
+class _ServerData:
+    """Decoded picker/link response with a receiver index built once."""
+    __slots__ = ("data", "expires_at", "exact", "names")
+
+    def __init__(self, data: Dict[str, Any], ttl: float):
+        self.data = data
+        self.expires_at = time.time() + ttl
+        self.exact: Dict[str, Dict[str, Any]] = {}
+        self.names: List[Tuple[str, Dict[str, Any]]] = []
+        for r in data.get("chats", []) + data.get("friends", []):
+            name = r.get("title") or r.get("profile_nickname") or ""
+            # First occurrence wins, matching the old scan order (chats before friends)
+            self.exact.setdefault(name, r)
+            self.names.append((name, r))
+
+    def find(self, receiver_name: str) -> Optional[Dict[str, Any]]:
+        target = self.exact.get(receiver_name)
+        if target is not None:
+            return target
+        for name, r in self.names:
+            if receiver_name in name:
+                return r
+        return None
+
+
+class _RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads (rate <= 0 disables)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate and rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
 class KakaoLinkManager:
     """
     Port of IrisLink.ts (Legacy KakaoLink v2 implementation)
     Allows sending template-based KakaoLink messages via sharer.kakao.com
+
+    The Iris AOT token is cached until it expires (or a 401 comes back), and
+    each picker/link validation result is cached per app_key/template/args
+    for `server_data_ttl` seconds, so repeated sends only cost picker/send.
     """
     KAKAOTALK_VERSION = '25.2.1'
     ANDROID_SDK_VER = 33
     ANDROID_WEBVIEW_UA = 'Mozilla/5.0 (Linux; Android 13; SM-G998B Build/TP1A.220624.014; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/114.0.5735.60 Mobile Safari/537.36'
+    DEFAULT_TOKEN_TTL = 600
+    TOKEN_MARGIN = 60
+    BULK_MAX_CONCURRENCY = 16
+    # (connect, read) seconds for sharer calls, so a stuck one cannot hold a bulk worker
+    SHARER_TIMEOUT = (5, 15)
 
-    def __init__(self, iris_url="http://localhost:3000"):
+    def __init__(self, iris_url="http://localhost:3000", sharer_url=None, server_data_ttl=60.0):
         self.iris_url = iris_url
+        # Overridable so the sharer flow can run against a local mock
+        self.sharer_url = (sharer_url or os.environ.get("STEND_KAKAO_SHARER_URL", "https://sharer.kakao.com")).rstrip("/")
+        self.server_data_ttl = server_data_ttl
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': f"{self.ANDROID_WEBVIEW_UA} KAKAOTALK/{self.KAKAOTALK_VERSION} (INAPP)",
             'X-Requested-With': 'com.kakao.talk'
         })
+        # Bulk sends share this session; size the pool so workers do not queue for connections
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.BULK_MAX_CONCURRENCY)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._auth: Optional[str] = None
+        self._auth_expires = 0.0
+        self._auth_fetch_lock = threading.Lock()
+        self._server_data: Dict[str, _ServerData] = {}
 
     def _get_ka(self, origin):
         return f"sdk/1.43.5 os/javascript sdk_type/javascript lang/ko-KR device/Linux armv7l origin/{quote(origin)}"
 
+    def _cached_auth(self):
+        with self._lock:
+            if self._auth and time.time() < self._auth_expires:
+                return self._auth
+        return None
+
     def _get_authorization(self):
+        auth = self._cached_auth()
+        if auth:
+            LINK_CACHE.labels("auth", "hit").inc()
+            return auth
+        # One fetch at a time: bulk workers that all saw a 401 share the new token
+        with self._auth_fetch_lock:
+            auth = self._cached_auth()
+            if auth:
+                LINK_CACHE.labels("auth", "hit").inc()
+                return auth
+            LINK_CACHE.labels("auth", "miss").inc()
+            return self._fetch_authorization()
+
+    def _fetch_authorization(self):
         try:
-            r = requests.get(f"{self.iris_url}/aot", timeout=5)
-            aot = r.json().get("aot", {})
-            return f"{aot.get('access_token')}-{aot.get('d_id')}"
+            r = self.session.get(f"{self.iris_url}/aot", timeout=5)
+            aot = r.json().get("aot") or {}
+            token, d_id = aot.get("access_token"), aot.get("d_id")
+            ttl = float(aot.get("expires_in") or self.DEFAULT_TOKEN_TTL)
         except Exception as e:
             print(f"[LinkManager] Failed to get Auth: {e}")
             return None
+        if not token or not d_id:
+            # Not logged in yet (or a partial answer): nothing worth caching
+            print("[LinkManager] Failed to get Auth: /aot returned no access_token/d_id")
+            return None
+        auth = f"{token}-{d_id}"
+        with self._lock:
+            self._auth = auth
+            self._auth_expires = time.time() + max(ttl - self.TOKEN_MARGIN, 0)
+        return auth
+
+    def invalidate(self, auth=True, server_data=True, stale_auth=None, stale_entry=None):
+        """
+        Drops the cached token and validations. With stale_auth/stale_entry
+        only those values are dropped, so a concurrent sender that already
+        replaced them does not lose the fresh ones.
+        """
+        with self._lock:
+            if auth and (stale_auth is None or self._auth == stale_auth):
+                self._auth = None
+            if server_data:
+                if stale_entry is None:
+                    self._server_data.clear()
+                else:
+                    for k in [k for k, v in self._server_data.items() if v is stale_entry]:
+                        del self._server_data[k]
+
+    @staticmethod
+    def _cache_key(app_key, template_id, template_args, origin) -> str:
+        return json.dumps([app_key, template_id, template_args, origin], sort_keys=True, ensure_ascii=False)
+
+    def _validate(self, auth, template_id, template_args, app_key, origin) -> Tuple[Optional[_ServerData], Optional[str]]:
+        """picker/link (cached). Returns (server data, error)."""
+        key = self._cache_key(app_key, template_id, template_args, origin)
+        with self._lock:
+            entry = self._server_data.get(key)
+            if entry and time.time() < entry.expires_at:
+                LINK_CACHE.labels("server_data", "hit").inc()
+                return entry, None
+        LINK_CACHE.labels("server_data", "miss").inc()
 
-    def send(self, receiver_name, template_id, template_args, app_key, origin):
+        # 1. Validation (custom template)
+        res = self.session.post(
+            f'{self.sharer_url}/picker/link',
+            headers={'Authorization': auth},
+            data={
+                'app_key': app_key,
+                'ka': self._get_ka(origin),
+                'validation_action': 'custom',
+                'validation_params': json.dumps({
+                    'link_ver': '4.0',
+                    'template_id': template_id,
+                    'template_args': template_args
+                })
+            },
+            allow_redirects=True,
+            timeout=self.SHARER_TIMEOUT
+        )
+        if res.status_code == 401:
+            return None, "unauthorized"
+
+        # 2. Extract server data (Base64 URL encoded)
+        match = SERVER_DATA_RE.search(res.text)
+        if not match:
+            # Might need login logic here if session expired,
+            # but legacy usually passed if AOT was fresh.
+            return None, "Server data not found (Login required?)"
+
+        # Decode server data to find receivers
+        decoded = base64.urlsafe_b64decode(match.group(1) + "===").decode('utf-8')
+        entry = _ServerData(json.loads(decoded)["data"], self.server_data_ttl)
+        with self._lock:
+            # Drop expired entries so the cache stays bounded by live templates
+            now = time.time()
+            for k in [k for k, v in self._server_data.items() if v.expires_at <= now]:
+                del self._server_data[k]
+            self._server_data[key] = entry
+        return entry, None
+
+    def _send_to(self, auth, server_data: Dict[str, Any], target: Dict[str, Any], app_key) -> requests.Response:
+        return self.session.post(
+            f'{self.sharer_url}/picker/send',
+            headers={'Authorization': auth},
+            data={
+                'app_key': app_key,
+                'short_key': server_data['shortKey'],
+                'checksum': server_data['checksum'],
+                '_csrf': server_data['csrfToken'],
+                'receiver': base64.urlsafe_b64encode(json.dumps(target).encode()).decode().strip('=')
+            },
+            timeout=self.SHARER_TIMEOUT
+        )
+
+    def send(self, receiver_name, template_id, template_args, app_key, origin, _retry=True):
         """
         Sends a KakaoLink v2 message using the legacy sharer logic.
         """
@@ -42,65 +230,103 @@ class KakaoLinkManager:
         if not auth:
             return {"success": False, "error": "Authorization failed"}
 
-        ka = self._get_ka(origin)
-        
         try:
-            # 1. Validation (custom template)
-            res = self.session.post(
-                'https://sharer.kakao.com/picker/link',
-                data={
-                    'app_key': app_key,
-                    'ka': ka,
-                    'validation_action': 'custom',
-                    'validation_params': json.dumps({
-                        'link_ver': '4.0',
-                        'template_id': template_id,
-                        'template_args': template_args
-                    })
-                },
-                allow_redirects=True
-            )
-
-            # 2. Extract server data (Base64 URL encoded)
-            import re
-            match = re.search(r'window\.serverData = "([^"]+)"', res.text)
-            if not match:
-                # Might need login logic here if session expired, 
-                # but legacy usually passed if AOT was fresh.
-                return {"success": False, "error": "Server data not found (Login required?)"}
-
-            # Decode server data to find receivers
-            decoded = base64.urlsafe_b64decode(match.group(1) + "===").decode('utf-8')
-            server_data = json.loads(decoded)["data"]
-            
-            # 3. Find receiver
-            receivers = server_data.get("chats", []) + server_data.get("friends", [])
-            target = None
-            for r in receivers:
-                name = r.get("title") or r.get("profile_nickname") or ""
-                if receiver_name in name:
-                    target = r
-                    break
-            
+            entry, error = self._validate(auth, template_id, template_args, app_key, origin)
+            if error == "unauthorized" and _retry:
+                self.invalidate(stale_auth=auth)
+                return self.send(receiver_name, template_id, template_args, app_key, origin, _retry=False)
+            if error:
+                return {"success": False, "error": error}
+
+            # 3. Find receiver (exact name first, then substring)
+            target = entry.find(receiver_name)
             if not target:
                 return {"success": False, "error": f"Receiver '{receiver_name}' not found"}
 
             # 4. Send
-            send_res = self.session.post(
-                'https://sharer.kakao.com/picker/send',
-                data={
-                    'app_key': app_key,
-                    'short_key': server_data['shortKey'],
-                    'checksum': server_data['checksum'],
-                    '_csrf': server_data['csrfToken'],
-                    'receiver': base64.urlsafe_b64encode(json.dumps(target).encode()).decode().strip('=')
-                }
-            )
+            send_res = self._send_to(auth, entry.data, target, app_key)
 
             if send_res.status_code == 200:
+                LINK_SENDS.labels("ok").inc()
                 return {"success": True}
-            else:
-                return {"success": False, "error": f"Send failed: {send_res.status_code}"}
+            if _retry and send_res.status_code in (400, 401, 403):
+                # Stale token or validation (csrf/checksum): start over with fresh ones
+                self.invalidate(auth=send_res.status_code == 401, stale_auth=auth, stale_entry=entry)
+                return self.send(receiver_name, template_id, template_args, app_key, origin, _retry=False)
+            LINK_SENDS.labels("error").inc()
+            return {"success": False, "error": f"Send failed: {send_res.status_code}"}
 
         except Exception as e:
             return {"success": False, "error": str(e)}
+
+    def send_bulk(self, receivers: List[str], template_id, template_args, app_key, origin,
+                  concurrency=4, rate=5.0) -> Iterator[Dict[str, Any]]:
+        """
+        Sends one template to many receivers. All names are resolved from a
+        single validation response, then picker/send runs on `concurrency`
+        threads over the shared session, at most `rate` sends per second.
+        Yields one result per receiver as it completes; closing the iterator
+        early stops the sends that have not started yet.
+        """
+        auth = self._get_authorization()
+        if not auth:
+            for name in receivers:
+                yield {"receiver": name, "success": False, "error": "Authorization failed"}
+            return
+        try:
+            entry, error = self._validate(auth, template_id, template_args, app_key, origin)
+            if error == "unauthorized":
+                self.invalidate(stale_auth=auth)
+                auth = self._get_authorization()
+                entry, error = self._validate(auth, template_id, template_args, app_key, origin) if auth else (None, "Authorization failed")
+        except Exception as e:
+            entry, error = None, str(e)
+        if error:
+            for name in receivers:
+                yield {"receiver": name, "success": False, "error": error}
+            return
+
+        targets = []
+        for name in dict.fromkeys(receivers):
+            target = entry.find(name)
+            if target is None:
+                yield {"receiver": name, "success": False, "error": f"Receiver '{name}' not found"}
+            else:
+                targets.append((name, target))
+        if not targets:
+            return
+
+        limiter = _RateLimiter(rate)
+
+        stopped = threading.Event()
+
+        def one(name, target):
+            limiter.acquire()
+            if stopped.is_set():
+                return None
+            started = time.perf_counter()
+            try:
+                res = self._send_to(auth, entry.data, target, app_key)
+                if res.status_code == 200:
+                    LINK_SENDS.labels("ok").inc()
+                    result = {"success": True}
+                elif res.status_code in (400, 401, 403):
+                    # Validation went stale mid-batch: the single-send path revalidates (once, via the cache)
+                    self.invalidate(auth=res.status_code == 401, stale_auth=auth, stale_entry=entry)
+                    result = self.send(name, template_id, template_args, app_key, origin, _retry=False)
+                else:
+                    LINK_SENDS.labels("error").inc()
+                    result = {"success": False, "error": f"Send failed: {res.status_code}"}
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+            return dict(result, receiver=name, ms=round((time.perf_counter() - started) * 1000, 1))
+
+        workers = max(1, min(int(concurrency), self.BULK_MAX_CONCURRENCY, len(targets)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="link")
+        try:
+            for future in as_completed([pool.submit(one, name, target) for name, target in targets]):
+                yield future.result()
+        finally:
+            # Closed early (the streaming client went away): queued sends are dropped, not sent
+            stopped.set()
+            pool.shutdown(wait=False, cancel_futures=True)
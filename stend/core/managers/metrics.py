@@ -0,0 +1,228 @@
+import time
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+AGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+RATE_WINDOW = 60
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount=1.0):
+        self.value += amount
+
+
+class _MeterChild:
+    """Counter that also keeps per-second slots for the last RATE_WINDOW seconds."""
+    __slots__ = ("value", "_slots", "_stamps")
+
+    def __init__(self):
+        self.value = 0.0
+        self._slots = [0] * RATE_WINDOW
+        self._stamps = [0] * RATE_WINDOW
+
+    def inc(self, amount=1.0):
+        self.value += amount
+        sec = int(time.time())
+        i = sec % RATE_WINDOW
+        if self._stamps[i] != sec:
+            self._stamps[i] = sec
+            self._slots[i] = 0
+        self._slots[i] += amount
+
+    def rate(self, window=RATE_WINDOW) -> float:
+        now = int(time.time())
+        # Skip the current (partial) second
+        total = sum(v for v, s in zip(self._slots, self._stamps) if now - window <= s < now)
+        return total / float(window)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Linear interpolation inside the bucket holding the q-th observation."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for i, c in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if c and seen + c >= rank:
+                return lower + (upper - lower) * ((rank - seen) / c)
+            seen += c
+            lower = upper
+        return self.buckets[-1]
+
+
+class _Metric:
+    kind = "untyped"
+    child_class = _CounterChild
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        return self.child_class()
+
+    def labels(self, *values):
+        # Hot path is a plain dict hit (string labels need no conversion); the lock is only taken to create a child
+        child = self._children.get(values)
+        if child is not None:
+            return child
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        return list(self._children.items())
+
+    def _fmt_labels(self, values, extra=None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        body = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+        return "{" + body + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._fmt_labels(k)} {c.value}" for k, c in self.items()]
+
+    def snapshot(self):
+        return [{"labels": dict(zip(self.labelnames, k)), "value": c.value} for k, c in self.items()]
+
+
+class Meter(Counter):
+    child_class = _MeterChild
+
+    def snapshot(self):
+        return [{"labels": dict(zip(self.labelnames, k)), "value": c.value, "rate_1m": round(c.rate(), 3)}
+                for k, c in self.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for k, c in self.items():
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += c.counts[i]
+                lines.append(f"{self.name}_bucket{self._fmt_labels(k, ('le', bound))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._fmt_labels(k, ('le', '+Inf'))} {c.count}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(k)} {c.sum}")
+            lines.append(f"{self.name}_count{self._fmt_labels(k)} {c.count}")
+        return lines
+
+    def snapshot(self):
+        out = []
+        for k, c in self.items():
+            out.append({
+                "labels": dict(zip(self.labelnames, k)),
+                "count": c.count,
+                "sum": round(c.sum, 6),
+                "avg": round(c.sum / c.count, 6) if c.count else 0.0,
+                "p50": round(c.quantile(0.5), 6),
+                "p90": round(c.quantile(0.9), 6),
+                "p99": round(c.quantile(0.99), 6),
+            })
+        return out
+
+
+class MetricsRegistry:
+    """
+    Process-wide metric registry.
+    Instruments are get-or-create, so modules can declare what they record at
+    import time. Recording avoids locks: updates are plain attribute/list
+    increments on pre-bucketed children.
+    """
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def _get_or_create(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def meter(self, name, help, labelnames=()) -> Meter:
+        return self._get_or_create(Meter, name, help, labelnames)
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for m in list(self._metrics.values()):
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "metrics": {m.name: {"type": m.kind, "help": m.help, "series": m.snapshot()}
+                        for m in list(self._metrics.values())},
+        }
+
+
+registry = MetricsRegistry()
+
+
+def route_label(path: str) -> str:
+    """Collapses numeric path segments so per-id URLs share one series."""
+    parts = path.split("?", 1)[0].split("/")
+    return "/".join("{id}" if p.lstrip("-").isdigit() else p for p in parts)
+
@@ -0,0 +1,211 @@
+import io
+import sys
+import time
+import marshal
+import pstats
+import cProfile
+import threading
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+ALL_SKILLS = "*"
+
+
+class ProfileSession:
+    """Profiling window for one skill (or ALL_SKILLS), bounded by time and/or invocation count."""
+
+    def __init__(self, target: str, mode: str, seconds: Optional[float], invocations: Optional[int]):
+        self.target = target
+        self.mode = mode
+        self.started_at = time.time()
+        self.expires_at = self.started_at + seconds if seconds else None
+        self.remaining = invocations
+        self.invocations = 0
+        self.total_time = 0.0
+        self.stopped_at: Optional[float] = None
+        self.lock = threading.Lock()
+        self.stats: Optional[pstats.Stats] = None
+        self.samples: Counter = Counter()
+        self.threads: Dict[int, str] = {}
+
+    @property
+    def running(self) -> bool:
+        if self.stopped_at is not None:
+            return False
+        if self.expires_at and time.time() >= self.expires_at:
+            self.stopped_at = self.expires_at
+            return False
+        if self.remaining is not None and self.remaining <= 0:
+            self.stopped_at = time.time()
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "skill": self.target,
+            "mode": self.mode,
+            "running": self.running,
+            "started_at": self.started_at,
+            "expires_at": self.expires_at,
+            "remaining": self.remaining,
+            "invocations": self.invocations,
+            "total_ms": round(self.total_time * 1000, 3),
+            "samples": sum(self.samples.values()),
+        }
+
+
+class SkillProfiler:
+    """
+    On-demand profiling for skill handlers.
+    SkillManager only consults this when `active` is set, so skills outside a
+    profiling window pay a single attribute check.
+    """
+    MODES = ("cprofile", "sampling")
+
+    def __init__(self, slow_threshold=0.5, slow_keep=200, sample_interval=0.005):
+        self.sessions: Dict[str, ProfileSession] = {}
+        self.active = False
+        # Targets with a running session; replaced (never mutated) under the lock so dispatch can read it without one
+        self._targets: frozenset = frozenset()
+        self.slow_threshold = slow_threshold
+        self.slow_log: deque = deque(maxlen=slow_keep)
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        # cProfile cannot run two profilers at once, so profiled calls are serialized
+        self._cprofile_lock = threading.Lock()
+        self._sampler: Optional[threading.Thread] = None
+
+    # --- Control ---
+    def start(self, skill: Optional[str] = None, seconds: Optional[float] = None,
+              invocations: Optional[int] = None, mode: str = "cprofile") -> ProfileSession:
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown mode '{mode}' (expected one of {', '.join(self.MODES)})")
+        if not seconds and not invocations:
+            raise ValueError("Either seconds or invocations is required")
+        session = ProfileSession(skill or ALL_SKILLS, mode, seconds, invocations)
+        with self._lock:
+            self.sessions[session.target] = session
+            self._targets = self._targets | {session.target}
+            self.active = True
+            if mode == "sampling" and not (self._sampler and self._sampler.is_alive()):
+                self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+                self._sampler.start()
+        return session
+
+    def stop(self, skill: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            targets = [skill] if skill else list(self.sessions)
+            for t in targets:
+                s = self.sessions.get(t)
+                if s and s.stopped_at is None:
+                    s.stopped_at = time.time()
+            self._refresh()
+        return self.status()
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [s.to_dict() for s in list(self.sessions.values())]
+
+    def _refresh(self):
+        # Caller holds the lock
+        self._targets = frozenset(t for t, s in self.sessions.items() if s.running)
+        self.active = bool(self._targets)
+
+    # --- Dispatch hooks ---
+    def session_for(self, skill: str) -> Optional[ProfileSession]:
+        targets = self._targets
+        if skill not in targets and ALL_SKILLS not in targets:
+            # Another skill is being profiled; this one skips the lock entirely
+            return None
+        for key in (skill, ALL_SKILLS):
+            session = self.sessions.get(key)
+            if session is not None and session.running:
+                return session
+        with self._lock:
+            self._refresh()
+        return None
+
+    def run(self, session: ProfileSession, skill: str, fn: Callable, *args):
+        start = time.perf_counter()
+        try:
+            if session.mode == "cprofile":
+                with self._cprofile_lock:
+                    prof = cProfile.Profile()
+                    prof.enable()
+                    try:
+                        return fn(*args)
+                    finally:
+                        prof.disable()
+                        with session.lock:
+                            if session.stats is None:
+                                session.stats = pstats.Stats(prof)
+                            else:
+                                session.stats.add(prof)
+            ident = threading.get_ident()
+            session.threads[ident] = skill
+            try:
+                return fn(*args)
+            finally:
+                session.threads.pop(ident, None)
+        finally:
+            with session.lock:
+                session.invocations += 1
+                session.total_time += time.perf_counter() - start
+                if session.remaining is not None:
+                    session.remaining -= 1
+
+    def note_duration(self, skill: str, event: str, duration: float, trace_id: Optional[str] = None):
+        if duration >= self.slow_threshold:
+            entry = {"skill": skill, "event": event, "duration_ms": round(duration * 1000, 3),
+                     "at": time.time(), "trace_id": trace_id}
+            self.slow_log.append(entry)
+            print(f"[Profiler] Slow invocation: {skill}.{event} took {entry['duration_ms']}ms")
+
+    # --- Sampling ---
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                sampling = [s for s in self.sessions.values() if s.mode == "sampling" and s.running]
+                if not sampling:
+                    self._refresh()
+                    self._sampler = None
+                    return
+            frames = sys._current_frames()
+            for s in sampling:
+                for ident in list(s.threads):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        s.samples[self._collapse(frame)] += 1
+            time.sleep(self.sample_interval)
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    # --- Export ---
+    def export(self, skill: str, fmt: str) -> bytes:
+        session = self.sessions.get(skill)
+        if session is None:
+            raise KeyError(skill)
+        if fmt == "collapsed":
+            if session.mode != "sampling":
+                raise ValueError("collapsed stacks require a sampling session")
+            lines = [f"{stack} {count}" for stack, count in session.samples.most_common()]
+            return ("\n".join(lines) + "\n").encode("utf-8")
+        if session.mode != "cprofile":
+            raise ValueError(f"{fmt} output requires a cprofile session")
+        if session.stats is None:
+            raise ValueError("No invocations were profiled yet")
+        with session.lock:
+            if fmt == "pstats":
+                return marshal.dumps(session.stats.stats)
+            if fmt == "text":
+                buf = io.StringIO()
+                session.stats.stream = buf
+                session.stats.sort_stats("cumulative").print_stats(50)
+                return buf.getvalue().encode("utf-8")
+        raise ValueError(f"Unknown format '{fmt}'")
@@ -0,0 +1,232 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+_IDENT = r'[A-Za-z_][\w.]*'
+# Optional alias after a table name; clause keywords are not aliases
+_ALIAS = (r'(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|INNER|LEFT|RIGHT|CROSS|FULL|OUTER|NATURAL|ON|USING|GROUP|ORDER'
+          r'|LIMIT|UNION|EXCEPT|INTERSECT|HAVING|WINDOW)\b)[A-Za-z_]\w*)?')
+# FROM/JOIN followed by one table or a comma-separated list (`FROM a x, b y`)
+_TABLE_RE = re.compile(rf'\b(?:FROM|JOIN)\s+({_IDENT}{_ALIAS}(?:\s*,\s*{_IDENT}{_ALIAS})*)', re.IGNORECASE)
+# String literals, quoted identifiers and comments, which may contain any keyword or ';'
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\]|--[^\n]*|/\*.*?\*/", re.DOTALL)
+_TOKEN_RE = re.compile(r'\w+|[(),]')
+
+
+def strip_literals(sql: str) -> str:
+    """Replaces literals and quoted names with a placeholder word and drops comments."""
+    return _LITERAL_RE.sub(lambda m: " " if m.group(0)[0] in "-/" else " _ ", sql)
+
+
+def _top_level(sql: str) -> List[str]:
+    """Upper-cased tokens outside parentheses; each parenthesized group becomes '()'."""
+    tokens, depth = [], 0
+    for tok in _TOKEN_RE.findall(sql):
+        if tok == "(":
+            if depth == 0:
+                tokens.append("()")
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+            if depth < 0:
+                return []
+        elif depth == 0:
+            tokens.append(tok.upper())
+    return tokens if depth == 0 else []
+
+
+def _main_keyword(tokens: List[str]) -> Optional[str]:
+    """The statement keyword, looking past a WITH clause (`WITH x AS (...) DELETE ...` is a write)."""
+    if not tokens or tokens[0] != "WITH":
+        return tokens[0] if tokens else None
+    i = 2 if tokens[1:2] == ["RECURSIVE"] else 1
+    while True:
+        # name [(columns)] AS [NOT] [MATERIALIZED] (body)
+        i += 1
+        if tokens[i:i + 1] == ["()"]:
+            i += 1
+        if tokens[i:i + 1] != ["AS"]:
+            return None
+        i += 1
+        if tokens[i:i + 1] == ["NOT"]:
+            i += 1
+        if tokens[i:i + 1] == ["MATERIALIZED"]:
+            i += 1
+        if tokens[i:i + 1] != ["()"]:
+            return None
+        i += 1
+        if tokens[i:i + 1] != [","]:
+            return tokens[i] if i < len(tokens) else None
+        i += 1
+
+
+def extract_tables(sql: str) -> List[str]:
+    """Returns the table names referenced by FROM/JOIN clauses (schema prefix stripped)."""
+    tables = []
+    for group in _TABLE_RE.findall(strip_literals(sql)):
+        for item in group.split(","):
+            name = item.split()[0].split(".")[-1].lower()
+            if name not in tables:
+                tables.append(name)
+    return tables
+
+
+def is_read_only(sql: str) -> bool:
+    """
+    A single SELECT, or a WITH clause fronting a SELECT. SQLite allows
+    writes only as the statement itself (never in subqueries or CTE
+    bodies), so only the leading keyword past any WITH clause matters.
+    """
+    stripped = strip_literals(sql)
+    if "'" in stripped or '"' in stripped or ";" in stripped.strip().rstrip(";"):
+        # Unterminated literal, or more than one statement
+        return False
+    return _main_keyword(_top_level(stripped)) in ("SELECT", "VALUES")
+
+
+class PreparedQuery:
+    def __init__(self, name: str, query: str, params: List[str], ttl: float):
+        self.name = name
+        self.query = query
+        self.params = params
+        self.ttl = ttl
+        self.tables = extract_tables(query)
+
+    def bind(self, values: Dict[str, Any]) -> List[Dict[str, str]]:
+        # Iris expects positional binds as [{"content": "..."}]
+        missing = [p for p in self.params if p not in values]
+        if missing:
+            raise KeyError(f"Missing parameters: {', '.join(missing)}")
+        return [{"content": str(values[p])} for p in self.params]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "query": self.query, "params": self.params,
+                "ttl": self.ttl, "tables": self.tables}
+
+
+class QueryCache:
+    """
+    Prepared-query registry plus a result cache for read-only Iris queries.
+    Entries are keyed on (query, binds) and dropped per table when new chat
+    activity is reported by the bridge.
+    """
+    def __init__(self, max_entries=512, default_ttl=300.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.prepared: Dict[str, PreparedQuery] = {}
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._by_table: Dict[str, set] = {}
+        # Bumped on every invalidation, so a fetch that raced a write can tell
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # --- Registry ---
+    def register(self, name: str, query: str, params: Optional[List[str]] = None, ttl: Optional[float] = None) -> PreparedQuery:
+        if not is_read_only(query):
+            raise ValueError("Only single read-only (SELECT/WITH) statements can be prepared")
+        pq = PreparedQuery(name, query, list(params or []), ttl if ttl is not None else self.default_ttl)
+        with self._lock:
+            old = self.prepared.get(name)
+            self.prepared[name] = pq
+        if old:
+            self.invalidate_query(old.query)
+        return pq
+
+    def unregister(self, name: str) -> bool:
+        with self._lock:
+            pq = self.prepared.pop(name, None)
+        if pq:
+            self.invalidate_query(pq.query)
+        return pq is not None
+
+    def list_prepared(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [pq.to_dict() for pq in self.prepared.values()]
+
+    # --- Result cache ---
+    @staticmethod
+    def make_key(query: str, bind: List[Dict[str, str]]) -> Tuple:
+        return (query, tuple(b.get("content") for b in bind))
+
+    @staticmethod
+    def make_etag(body: bytes) -> str:
+        return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry["expires"] < time.time():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def generation(self, tables: List[str]) -> Tuple:
+        """Take before fetching a miss and pass to put(): the result is not cached if a table changed meanwhile."""
+        with self._lock:
+            return tuple(self._generations.get(t, 0) for t in tables)
+
+    def put(self, key: Tuple, result: Any, tables: List[str], ttl: float,
+            generation: Optional[Tuple] = None) -> Dict[str, Any]:
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = {"body": body, "etag": self.make_etag(body), "tables": tables,
+                 "expires": time.time() + ttl, "created": time.time()}
+        with self._lock:
+            if generation is not None and generation != tuple(self._generations.get(t, 0) for t in tables):
+                # Stale: a write landed while this result was being fetched
+                return entry
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            for t in tables:
+                self._by_table.setdefault(t, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+        return entry
+
+    def _drop(self, key: Tuple):
+        # Caller holds the lock
+        entry = self._entries.pop(key, None)
+        if entry:
+            for t in entry["tables"]:
+                keys = self._by_table.get(t)
+                if keys:
+                    keys.discard(key)
+
+    def invalidate_tables(self, tables: List[str]) -> int:
+        dropped = 0
+        with self._lock:
+            for t in tables:
+                t = t.lower()
+                self._generations[t] = self._generations.get(t, 0) + 1
+                for key in list(self._by_table.pop(t, ())):
+                    if key in self._entries:
+                        self._drop(key)
+                        dropped += 1
+        return dropped
+
+    def invalidate_query(self, query: str) -> int:
+        with self._lock:
+            keys = [k for k in self._entries if k[0] == query]
+            for k in keys:
+                self._drop(k)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "prepared": len(self.prepared),
+                    "hits": self.hits, "misses": self.misses}
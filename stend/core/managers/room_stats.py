@@ -0,0 +1,214 @@
+import time
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from stend.core.managers.metrics import registry
+
+CHECKPOINT_DURATION = registry.histogram("stend_room_stats_checkpoint_seconds", "Room stats checkpoint write time")
+
+
+class _Window:
+    """
+    Fixed number of time buckets of `span` seconds, newest last. Each bucket
+    is [start, count, senders or None]; buckets older than `size` spans fall
+    off the front as time moves on.
+    """
+    __slots__ = ("span", "size", "senders", "buckets")
+
+    def __init__(self, span: int, size: int, senders: bool):
+        self.span = span
+        self.size = size
+        self.senders = senders
+        self.buckets: List[list] = []
+
+    def add(self, ts: float, user_id: Optional[str]):
+        start = int(ts // self.span) * self.span
+        buckets = self.buckets
+        if buckets and start < buckets[-1][0] - (self.size - 1) * self.span:
+            return  # older than the window (e.g. an old backfilled message)
+        # Events arrive (nearly) in order: look from the newest bucket back
+        i = len(buckets)
+        while i and buckets[i - 1][0] > start:
+            i -= 1
+        if i and buckets[i - 1][0] == start:
+            bucket = buckets[i - 1]
+        else:
+            bucket = [start, 0, Counter() if self.senders else None]
+            buckets.insert(i, bucket)
+            self._trim(buckets[-1][0])
+        bucket[1] += 1
+        if bucket[2] is not None and user_id is not None:
+            bucket[2][user_id] += 1
+
+    def _trim(self, newest: int):
+        oldest = newest - (self.size - 1) * self.span
+        while self.buckets and self.buckets[0][0] < oldest:
+            self.buckets.pop(0)
+
+    def live(self, now: float) -> List[list]:
+        oldest = int(now // self.span) * self.span - (self.size - 1) * self.span
+        return [b for b in self.buckets if b[0] >= oldest]
+
+    def count(self, now: float) -> int:
+        return sum(b[1] for b in self.live(now))
+
+    def series(self, now: float) -> List[int]:
+        """Counts for every bucket in the window, oldest first (zeros included)."""
+        current = int(now // self.span) * self.span
+        by_start = {b[0]: b[1] for b in self.buckets}
+        return [by_start.get(current - k * self.span, 0) for k in range(self.size - 1, -1, -1)]
+
+    def senders_in(self, now: float) -> Counter:
+        total = Counter()
+        for b in self.live(now):
+            if b[2]:
+                total.update(b[2])
+        return total
+
+    def active_in(self, now: float) -> int:
+        """Distinct senders in the window (set union is much cheaper than merging counters)."""
+        return len(set().union(*(b[2].keys() for b in self.live(now) if b[2])))
+
+    def dump(self) -> List[list]:
+        return [[b[0], b[1], dict(b[2])] if b[2] is not None else [b[0], b[1]] for b in self.buckets]
+
+    def restore(self, rows: List[list]):
+        self.buckets = [[r[0], r[1], Counter(r[2]) if self.senders else None] for r in rows]
+
+
+class RoomCounter:
+    """Rolling message counters for one room: per minute (1h), per hour (24h), per day (7d)."""
+    __slots__ = ("total", "since", "last_at", "minutes", "hours", "days")
+
+    def __init__(self):
+        self.total = 0
+        self.since = time.time()
+        self.last_at: Optional[float] = None
+        self.minutes = _Window(60, 60, senders=True)
+        self.hours = _Window(3600, 24, senders=True)
+        self.days = _Window(86400, 7, senders=True)
+
+    def add(self, ts: float, user_id: Optional[str]):
+        self.total += 1
+        self.last_at = ts if self.last_at is None else max(self.last_at, ts)
+        self.minutes.add(ts, user_id)
+        self.hours.add(ts, user_id)
+        self.days.add(ts, user_id)
+
+    def snapshot(self, now: float, top: int = 10) -> Dict[str, Any]:
+        day_senders = self.hours.senders_in(now)
+        minutes = self.minutes.series(now)
+        return {
+            "total": self.total, "since": self.since, "last_message_at": self.last_at,
+            "messages": {"minute": minutes[-1], "hour": sum(minutes),
+                         "day": self.hours.count(now), "week": self.days.count(now)},
+            "per_minute": minutes,
+            "per_hour": self.hours.series(now),
+            "per_day": self.days.series(now),
+            "active_users": {"hour": self.minutes.active_in(now), "day": len(day_senders),
+                             "week": self.days.active_in(now)},
+            # Over the last 24 hours
+            "top_senders": [{"user_id": uid, "count": c} for uid, c in day_senders.most_common(top)],
+        }
+
+    def dump(self) -> Dict[str, Any]:
+        return {"t": self.total, "s": self.since, "l": self.last_at,
+                "m": self.minutes.dump(), "h": self.hours.dump(), "d": self.days.dump()}
+
+    @classmethod
+    def restore(cls, data: Dict[str, Any]) -> "RoomCounter":
+        rc = cls()
+        rc.total, rc.since, rc.last_at = data.get("t", 0), data.get("s", rc.since), data.get("l")
+        rc.minutes.restore(data.get("m", []))
+        rc.hours.restore(data.get("h", []))
+        rc.days.restore(data.get("d", []))
+        return rc
+
+
+class RoomStats:
+    """
+    Per-room rolling counters fed by bridge messages, so room statistics
+    are answered from memory instead of a chat_logs scan on the device.
+    A compact checkpoint of every room goes to StendStore every
+    `checkpoint_interval` seconds (and on demand) and is loaded at start-up.
+    """
+    STORE_KEY = "stend:room_stats"
+
+    def __init__(self, store=None, checkpoint_interval=60.0):
+        self.store = store
+        self.checkpoint_interval = checkpoint_interval
+        self.rooms: Dict[str, RoomCounter] = {}
+        self.dirty = False
+        self.last_checkpoint: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def observe(self, event) -> bool:
+        """Counts a bridge Message (stend.core.message); other events are ignored."""
+        if event.kind != "message" or event.chat_id is None:
+            return False
+        try:
+            ts = float(event.created_at or time.time())
+        except (TypeError, ValueError):
+            ts = time.time()
+        user_id = event.user_id
+        key = str(event.chat_id)
+        with self._lock:
+            room = self.rooms.get(key)
+            if room is None:
+                room = self.rooms[key] = RoomCounter()
+            room.add(ts, str(user_id) if user_id is not None else None)
+            self.dirty = True
+        return True
+
+    def get(self, room_id, top=10) -> Dict[str, Any]:
+        """Snapshot for one room; a room with no messages seen yet reads as all zeros."""
+        with self._lock:
+            room = self.rooms.get(str(room_id)) or RoomCounter()
+            return dict(room.snapshot(time.time(), top), room_id=str(room_id))
+
+    def summary(self) -> Dict[str, Any]:
+        return {"rooms": len(self.rooms), "last_checkpoint": self.last_checkpoint,
+                "messages": sum(r.total for r in self.rooms.values())}
+
+    # --- Persistence ---
+    def load(self):
+        if self.store is None:
+            return
+        data = self.store.get(self.STORE_KEY)
+        if not isinstance(data, dict):
+            return
+        with self._lock:
+            self.rooms = {k: RoomCounter.restore(v) for k, v in data.get("rooms", {}).items()}
+            self.last_checkpoint = data.get("at")
+        print(f"[RoomStats] Restored {len(self.rooms)} rooms from checkpoint")
+
+    def checkpoint(self) -> bool:
+        if self.store is None or not self.dirty:
+            return False
+        started = time.perf_counter()
+        with self._lock:
+            # Dump under the lock (cheap); the write happens outside it
+            data = {"at": time.time(), "rooms": {k: r.dump() for k, r in self.rooms.items()}}
+            self.dirty = False
+        try:
+            self.store.put(self.STORE_KEY, data)
+        except Exception as e:
+            self.dirty = True
+            print(f"[RoomStats] Checkpoint failed: {e}")
+            return False
+        self.last_checkpoint = data["at"]
+        CHECKPOINT_DURATION.observe(time.perf_counter() - started)
+        return True
+
+    def start_checkpoints(self):
+        if self._thread is not None or self.store is None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.checkpoint_interval)
+                self.checkpoint()
+        self._thread = threading.Thread(target=loop, daemon=True, name="room-stats")
+        self._thread.start()
@@ -0,0 +1,364 @@
+import time
+import heapq
+import uuid
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from stend.core.managers.metrics import registry
+
+SCHEDULER_RUNS = registry.counter("stend_scheduler_runs_total", "Scheduled skill job runs", ["result"])
+SCHEDULER_LAG = registry.histogram("stend_scheduler_lag_seconds", "Time from a job's due time to its start")
+
+
+class Cron:
+    """
+    Five-field cron expression (minute hour day-of-month month day-of-week),
+    evaluated in local time. Fields take *, lists, ranges and steps
+    ("*/15", "1-5", "0,30", "5/10"); day-of-week 0 and 7 are Sunday. As in cron,
+    when both day fields are restricted a day matching either one fires.
+    """
+    RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expr}'")
+        self.expr = expr
+        parsed = [self._field(f, lo, hi) for f, (lo, hi) in zip(fields, self.RANGES)]
+        self.minutes, self.hours, self.days, self.months, dows = parsed
+        self.dows = {d % 7 for d in dows}
+        self._any_day = fields[2] == "*"
+        self._any_dow = fields[4] == "*"
+
+    @staticmethod
+    def _field(field: str, lo: int, hi: int) -> set:
+        values = set()
+        for part in field.split(","):
+            body, _, step = part.partition("/")
+            if body == "*":
+                start, end = lo, hi
+            elif "-" in body:
+                start, end = (int(x) for x in body.split("-", 1))
+            else:
+                # "5/10" means 5, 15, 25, ... up to the field maximum
+                start = int(body)
+                end = hi if step else start
+            if start < lo or end > hi or start > end:
+                raise ValueError(f"Cron field '{field}' out of range {lo}-{hi}")
+            if step and int(step) < 1:
+                raise ValueError(f"Cron step must be positive: '{field}'")
+            values.update(range(start, end + 1, int(step) if step else 1))
+        return values
+
+    def _day_ok(self, dt: datetime) -> bool:
+        day = dt.day in self.days
+        dow = (dt.isoweekday() % 7) in self.dows
+        if self._any_day or self._any_dow:
+            return day and dow
+        return day or dow
+
+    def next_after(self, ts: float) -> float:
+        dt = datetime.fromtimestamp(ts).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt.year + 5
+        # Jump a month/day/hour at a time instead of testing every minute
+        while dt.year <= limit:
+            if dt.month not in self.months:
+                dt = (dt.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_ok(dt):
+                dt = dt.replace(hour=0, minute=0) + timedelta(days=1)
+            elif dt.hour not in self.hours:
+                dt = dt.replace(minute=0) + timedelta(hours=1)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt.timestamp()
+        raise ValueError(f"Cron expression never fires: '{self.expr}'")
+
+
+class Job:
+    """
+    One scheduled call of `skill.handler(job)`. Exactly one of `at`
+    (one-shot), `every` (seconds, anchored at `start`) or `cron` is set.
+    """
+    __slots__ = ("id", "skill", "handler", "args", "at", "every", "start", "cron", "created_at",
+                 "next_run", "runs", "last_run", "last_error", "running", "_cron")
+
+    def __init__(self, id: str, skill: str, handler: str, args=None, at: Optional[float] = None,
+                 every: Optional[float] = None, start: Optional[float] = None, cron: Optional[str] = None,
+                 created_at: Optional[float] = None, runs=0):
+        self.id = id
+        self.skill = skill
+        self.handler = handler
+        self.args = args if args is not None else {}
+        self.at = at
+        self.every = every
+        self.start = start
+        self.cron = cron
+        self.created_at = created_at or time.time()
+        self.runs = runs
+        self.last_run: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.running = False
+        self._cron = Cron(cron) if cron else None
+        self.next_run: Optional[float] = None
+
+    @property
+    def periodic(self) -> bool:
+        return self.at is None
+
+    def due_after(self, now: float) -> Optional[float]:
+        """Next fire time strictly after `now` for periodic jobs; missed periods are skipped."""
+        if self._cron is not None:
+            return self._cron.next_after(now)
+        if self.every:
+            k = int((now - self.start) // self.every) + 1
+            return self.start + max(k, 1) * self.every
+        return None
+
+    def to_record(self) -> Dict[str, Any]:
+        return {"id": self.id, "skill": self.skill, "handler": self.handler, "args": self.args,
+                "at": self.at, "every": self.every, "start": self.start, "cron": self.cron,
+                "created_at": self.created_at, "runs": self.runs}
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.to_record(), next_run=self.next_run, last_run=self.last_run,
+                    last_error=self.last_error, running=self.running)
+
+
+class Scheduler:
+    """
+    Delayed and periodic skill jobs on a single timer thread.
+
+    Pending fire times live in a heap (O(log n) add, cancel is lazy), so
+    thousands of timers cost one sleeping thread. Each job definition is a
+    StendStore key, written (or deleted) in batches by the timer thread and
+    loaded again at start-up: a one-shot that came due while the node was
+    down runs once on start, periodic jobs resume at their next period.
+    Due jobs are handed to `runner(job)`, which runs them on the skill
+    pool; a periodic job never overlaps its own previous run.
+    """
+    STORE_PREFIX = "stend:job:"
+    # One-shots whose skill is not loaded yet (start-up) are retried this often, this many times
+    RETRY_DELAY = 5.0
+    MAX_DEFERS = 12
+
+    def __init__(self, store=None, runner: Optional[Callable[["Job"], Any]] = None):
+        self.store = store
+        self.runner = runner
+        self.jobs: Dict[str, Job] = {}
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._defers: Dict[str, int] = {}
+        # job id -> record to write, or None to delete; flushed by the timer thread
+        self._dirty: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # --- Scheduling ---
+    def add(self, skill: str, handler: str, args=None, name: Optional[str] = None, at: Optional[float] = None,
+            every: Optional[float] = None, cron: Optional[str] = None) -> Job:
+        if sum(x is not None for x in (at, every, cron)) != 1:
+            raise ValueError("Give exactly one of at, every or cron")
+        if every is not None and every <= 0:
+            raise ValueError("every must be positive")
+        # A named job replaces the skill's previous job of that name (e.g. a cooldown being reset)
+        job_id = f"{skill}:{name}" if name else f"{skill}:{uuid.uuid4().hex[:12]}"
+        now = time.time()
+        job = Job(job_id, skill, handler, args, at=at, every=every, start=now if every else None, cron=cron)
+        with self._cond:
+            self._schedule(job, at if at is not None else job.due_after(now))
+            self._mark(job_id, job.to_record())
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        with self._cond:
+            job = self.jobs.pop(job_id, None)
+            if job is None:
+                return False
+            self._mark(job_id, None)
+        return True
+
+    def cancel_skill(self, skill: str) -> int:
+        ids = [j.id for j in list(self.jobs.values()) if j.skill == skill]
+        return sum(self.cancel(i) for i in ids)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, skill: Optional[str] = None) -> List[Job]:
+        jobs = [j for j in list(self.jobs.values()) if skill is None or j.skill == skill]
+        return sorted(jobs, key=lambda j: j.next_run or 0)
+
+    def for_skill(self, skill: str) -> "SkillScheduler":
+        return SkillScheduler(self, skill)
+
+    def _schedule(self, job: Job, when: float):
+        # Caller holds self._cond
+        job.next_run = when
+        self.jobs[job.id] = job
+        self._seq += 1
+        heapq.heappush(self._heap, (when, self._seq, job.id))
+        if self._heap[0][2] == job.id:
+            self._cond.notify()
+
+    def _mark(self, job_id: str, record: Optional[Dict[str, Any]]):
+        # Caller holds self._cond
+        if self.store is not None:
+            self._dirty[job_id] = record
+            self._cond.notify()
+
+    def flush(self):
+        with self._cond:
+            dirty, self._dirty = self._dirty, {}
+        self._write(dirty)
+
+    def _write(self, dirty: Dict[str, Optional[Dict[str, Any]]]):
+        if not dirty:
+            return
+        try:
+            self.store.put_many({self.STORE_PREFIX + k: r for k, r in dirty.items() if r is not None})
+            self.store.delete_many([self.STORE_PREFIX + k for k, r in dirty.items() if r is None])
+        except Exception as e:
+            print(f"[Scheduler] Persisting {len(dirty)} jobs failed: {e}")
+
+    # --- Timer thread ---
+    def load(self):
+        if self.store is None:
+            return
+        now = time.time()
+        loaded = 0
+        with self._cond:
+            for key, record in self.store.get_prefix(self.STORE_PREFIX).items():
+                if not isinstance(record, dict):
+                    continue
+                try:
+                    job = Job(**record)
+                    when = job.at if job.at is not None else job.due_after(now)
+                except (TypeError, ValueError) as e:
+                    print(f"[Scheduler] Dropping unreadable job {key}: {e}")
+                    self.store.delete(key)
+                    continue
+                self._schedule(job, when)
+                loaded += 1
+        if loaded:
+            print(f"[Scheduler] Restored {loaded} jobs")
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.load()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="scheduler")
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            job = when = None
+            with self._cond:
+                while job is None and not self._dirty:
+                    now = time.time()
+                    if self._heap and self._heap[0][0] <= now:
+                        when, _, job_id = heapq.heappop(self._heap)
+                        job = self.jobs.get(job_id)
+                        # Stale entry: cancelled or rescheduled since it was pushed
+                        if job is None or job.next_run != when:
+                            job = None
+                        continue
+                    self._cond.wait(self._heap[0][0] - now if self._heap else None)
+                if job is not None and job.periodic:
+                    self._schedule(job, job.due_after(max(now, when)))
+                dirty, self._dirty = self._dirty, {}
+            self._write(dirty)
+            if job is not None:
+                try:
+                    self._fire(job, when)
+                except Exception as e:
+                    # One bad job must not stop the timer thread for every other job
+                    print(f"[Scheduler] Job {job.id} could not be started: {e}")
+
+    def _fire(self, job: Job, when: float):
+        if job.running:
+            SCHEDULER_RUNS.labels("overlap_skipped").inc()
+            return
+        SCHEDULER_LAG.observe(max(time.time() - when, 0.0))
+        job.running = True
+        try:
+            future = self.runner(job)
+        except LookupError as e:
+            job.running = False
+            self._not_runnable(job, e)
+            return
+        except Exception as e:
+            # Counted as a failed run; periodic jobs try again at their next time
+            job.running = False
+            job.last_error = str(e)
+            SCHEDULER_RUNS.labels("error").inc()
+            print(f"[Scheduler] Job {job.id} failed to start: {e}")
+            if not job.periodic:
+                self.cancel(job.id)
+            return
+        future.add_done_callback(lambda f: self._finished(job, f))
+
+    def _not_runnable(self, job: Job, error: Exception):
+        if job.periodic:
+            SCHEDULER_RUNS.labels("missing_skill").inc()
+            return
+        defers = self._defers.get(job.id, 0)
+        if defers < self.MAX_DEFERS:
+            self._defers[job.id] = defers + 1
+            with self._cond:
+                self._schedule(job, time.time() + self.RETRY_DELAY)
+            return
+        print(f"[Scheduler] Dropping job {job.id}: {error}")
+        SCHEDULER_RUNS.labels("missing_skill").inc()
+        self._defers.pop(job.id, None)
+        self.cancel(job.id)
+
+    def _finished(self, job: Job, future):
+        job.running = False
+        job.runs += 1
+        job.last_run = time.time()
+        error = future.exception()
+        job.last_error = str(error) if error else None
+        SCHEDULER_RUNS.labels("error" if error else "ok").inc()
+        self._defers.pop(job.id, None)
+        if not job.periodic:
+            if self.jobs.get(job.id) is job:
+                self.cancel(job.id)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"jobs": len(self.jobs), "pending_timers": len(self._heap),
+                "next_run": min((j.next_run for j in list(self.jobs.values()) if j.next_run), default=None)}
+
+
+class SkillScheduler:
+    """
+    The `scheduler` global a skill sees: jobs are created for (and only
+    visible to) that skill. `handler` names a function in the skill module,
+    called as handler(job) with job.args; looked up at fire time, so it
+    survives skill reloads and restarts. `name` makes a job replaceable.
+    """
+    def __init__(self, scheduler: Scheduler, skill: str):
+        self._scheduler = scheduler
+        self.skill = skill
+
+    def after(self, seconds: float, handler: str, args=None, name: Optional[str] = None) -> str:
+        return self._scheduler.add(self.skill, handler, args, name, at=time.time() + seconds).id
+
+    def at(self, when, handler: str, args=None, name: Optional[str] = None) -> str:
+        ts = when.timestamp() if isinstance(when, datetime) else float(when)
+        return self._scheduler.add(self.skill, handler, args, name, at=ts).id
+
+    def every(self, seconds: float, handler: str, args=None, name: Optional[str] = None) -> str:
+        return self._scheduler.add(self.skill, handler, args, name, every=seconds).id
+
+    def cron(self, expr: str, handler: str, args=None, name: Optional[str] = None) -> str:
+        return self._scheduler.add(self.skill, handler, args, name, cron=expr).id
+
+    def cancel(self, job: str) -> bool:
+        """Cancels by id or by the name given when scheduling."""
+        job_id = job if job.startswith(self.skill + ":") else f"{self.skill}:{job}"
+        return self._scheduler.cancel(job_id)
+
+    def jobs(self) -> List[Dict[str, Any]]:
+        return [j.to_dict() for j in self._scheduler.list(self.skill)]
@@ -0,0 +1,280 @@
+import json
+import time
+import asyncio
+import itertools
+from typing import Any, Callable, Dict, List, Optional
+
+from stend.core.managers.metrics import registry
+from stend.core.managers.admission import Overloaded
+
+try:
+    import msgpack
+except ImportError:  # optional: sessions fall back to JSON frames
+    msgpack = None
+
+SDK_FRAMES = registry.counter("stend_sdk_frames_total", "Frames exchanged on /ws/sdk", ["direction", "op"])
+SDK_DROPPED = registry.counter("stend_sdk_events_dropped_total", "Events dropped for SDK sessions that fell behind")
+SDK_CALL_LATENCY = registry.histogram("stend_sdk_call_duration_seconds", "SDK action latency", ["action"])
+
+PROTOCOL_VERSION = 1
+OPS = ("ping", "subscribe", "unsubscribe", "call")
+
+
+def encode(frame: Dict[str, Any], fmt: str):
+    if fmt == "msgpack":
+        return msgpack.packb(frame, use_bin_type=True, default=str)
+    return json.dumps(frame, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def decode(data) -> Dict[str, Any]:
+    if isinstance(data, (bytes, bytearray)):
+        if msgpack is None:
+            raise ValueError("Binary frames need msgpack on the server")
+        frame = msgpack.unpackb(data, raw=False)
+    else:
+        frame = json.loads(data)
+    if not isinstance(frame, dict):
+        raise ValueError("A frame must be an object")
+    return frame
+
+
+class ActionError(Exception):
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class Subscription:
+    """Event filter: names ('message' or a stend_event name), room ids, message text prefix. None matches all."""
+    __slots__ = ("id", "events", "rooms", "prefix")
+
+    def __init__(self, id: int, events=None, rooms=None, prefix: Optional[str] = None):
+        self.id = id
+        self.events = set(events) if events else None
+        self.rooms = {str(r) for r in rooms} if rooms else None
+        self.prefix = prefix or None
+
+    @classmethod
+    def from_frame(cls, frame: Dict[str, Any], ids) -> "Subscription":
+        """Builds a subscription from a subscribe frame; a single value may stand for a one-item list."""
+        events, rooms, prefix = frame.get("events"), frame.get("rooms"), frame.get("prefix")
+        if isinstance(events, str):
+            events = [events]
+        if events is not None and not (isinstance(events, list) and all(isinstance(e, str) for e in events)):
+            raise ActionError("events must be a string or a list of strings")
+        if isinstance(rooms, (str, int)) and not isinstance(rooms, bool):
+            rooms = [rooms]
+        if rooms is not None and not (isinstance(rooms, list)
+                                      and all(isinstance(r, (str, int)) and not isinstance(r, bool) for r in rooms)):
+            raise ActionError("rooms must be a room id or a list of room ids")
+        if prefix is not None and not isinstance(prefix, str):
+            raise ActionError("prefix must be a string")
+        return cls(next(ids), events, rooms, prefix)
+
+    def matches(self, name: str, event) -> bool:
+        if self.events is not None and name not in self.events:
+            return False
+        if self.rooms is not None and str(event.chat_id) not in self.rooms:
+            return False
+        if self.prefix is not None and not (event.kind == "message" and (event.text or "").startswith(self.prefix)):
+            return False
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "events": sorted(self.events) if self.events else None,
+                "rooms": sorted(self.rooms) if self.rooms else None, "prefix": self.prefix}
+
+
+class SdkSession:
+    """
+    One bot connection. Outgoing frames go through a bounded queue drained by
+    a single writer task; when a slow bot lets it fill up, new events are
+    dropped (and counted) rather than buffered without limit. Call results
+    are never dropped.
+    """
+    def __init__(self, hub: "SdkHub", websocket, fmt: str, name: Optional[str], queue_size: int):
+        self.hub = hub
+        self.websocket = websocket
+        self.format = fmt
+        self.name = name
+        self.id = next(hub._ids)
+        self.subscriptions: Dict[int, Subscription] = {}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.connected_at = time.time()
+        self.sent = 0
+        self.dropped = 0
+        self.calls = 0
+        self._sub_ids = itertools.count(1)
+        self._call_slots = asyncio.Semaphore(hub.max_calls)
+        self._tasks = set()
+
+    def wants(self, name: str, event) -> bool:
+        # Called on the bridge thread while the loop may (un)subscribe: iterate a snapshot
+        for sub in list(self.subscriptions.values()):
+            if sub.matches(name, event):
+                return True
+        return False
+
+    def push(self, data, op="event"):
+        """Queues an already encoded frame (event loop thread only)."""
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            SDK_DROPPED.inc()
+            return
+        SDK_FRAMES.labels("out", op).inc()
+
+    async def reply(self, frame: Dict[str, Any]):
+        # Results wait for queue room instead of being dropped
+        await self.queue.put(encode(frame, self.format))
+        SDK_FRAMES.labels("out", frame["op"]).inc()
+
+    async def writer(self):
+        send = self.websocket.send_bytes if self.format == "msgpack" else self.websocket.send_text
+        while True:
+            data = await self.queue.get()
+            await send(data)
+            self.sent += 1
+
+    async def handle(self, frame: Dict[str, Any]):
+        op = frame.get("op")
+        SDK_FRAMES.labels("in", op if op in OPS else "unknown").inc()
+        call_id = frame.get("id")
+        try:
+            await self._handle(op, call_id, frame)
+        except ActionError as e:
+            # Bad input gets an error frame; the connection stays up
+            await self.reply({"op": "error", "id": call_id, "status": e.status, "error": str(e)})
+
+    async def _handle(self, op, call_id, frame: Dict[str, Any]):
+        if op == "ping":
+            await self.reply({"op": "pong", "id": call_id, "t": time.time()})
+        elif op == "subscribe":
+            sub = Subscription.from_frame(frame, self._sub_ids)
+            self.subscriptions[sub.id] = sub
+            await self.reply({"op": "result", "id": call_id, "ok": True, "data": sub.to_dict()})
+        elif op == "unsubscribe":
+            sub_id = frame.get("subscription")
+            if type(sub_id) is not int:
+                raise ActionError("subscription must be the id returned by subscribe")
+            removed = self.subscriptions.pop(sub_id, None)
+            await self.reply({"op": "result", "id": call_id, "ok": removed is not None})
+        elif op == "call":
+            action, args = frame.get("action"), frame.get("args") or {}
+            if not isinstance(action, str):
+                raise ActionError("action must be a string")
+            if not isinstance(args, dict):
+                raise ActionError("args must be an object")
+            # Calls run concurrently so one slow query does not hold up replies
+            await self._call_slots.acquire()
+            task = asyncio.create_task(self._call(call_id, action, args))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            raise ActionError(f"Unknown op '{op}'")
+
+    async def _call(self, call_id, action: str, args: Dict[str, Any]):
+        started = time.perf_counter()
+        self.calls += 1
+        try:
+            result = await self.hub.call(action, args)
+            frame = {"op": "result", "id": call_id, "ok": True, "data": result}
+        except ActionError as e:
+            frame = {"op": "error", "id": call_id, "status": e.status, "error": str(e)}
+        except Exception as e:
+            frame = {"op": "error", "id": call_id, "status": 500, "error": str(e)}
+        finally:
+            self._call_slots.release()
+        SDK_CALL_LATENCY.labels(str(action)).observe(time.perf_counter() - started)
+        try:
+            await self.reply(frame)
+        except Exception:
+            pass
+
+    def close(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name, "format": self.format, "connected_at": self.connected_at,
+                "subscriptions": [s.to_dict() for s in list(self.subscriptions.values())],
+                "queued": self.queue.qsize(), "sent": self.sent, "dropped": self.dropped, "calls": self.calls}
+
+
+class SdkHub:
+    """
+    Multiplexed bot channel behind /ws/sdk: filtered event push plus
+    correlated action calls on one connection.
+
+    Actions are registered by the API node (`register(name, fn)`) and run
+    in a worker thread; `fn(args)` returns a JSON-able result or raises
+    ActionError (anything else is reported as status 500). Each event is
+    serialized once per wire format, however many sessions receive it.
+    """
+    def __init__(self, queue_size=1000, max_calls=16):
+        self.queue_size = queue_size
+        self.max_calls = max_calls
+        self.sessions: List[SdkSession] = []
+        self.actions: Dict[str, Callable[[Dict[str, Any]], Any]] = {}
+        self.limiters: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def register(self, name: str, fn: Callable[[Dict[str, Any]], Any], limiter=None):
+        """`limiter` (an admission RouteLimiter) makes the action share the HTTP route's concurrency limit."""
+        self.actions[name] = fn
+        if limiter is not None:
+            self.limiters[name] = limiter
+
+    async def call(self, action: str, args: Dict[str, Any]):
+        fn = self.actions.get(action)
+        if fn is None:
+            raise ActionError(f"Unknown action '{action}'", 404)
+        limiter = self.limiters.get(action)
+        if limiter is None:
+            return await asyncio.to_thread(fn, args)
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            raise ActionError(str(e), 503)
+        try:
+            return await asyncio.to_thread(fn, args)
+        finally:
+            limiter.release()
+
+    def open(self, websocket, fmt="json", name=None) -> SdkSession:
+        self._loop = asyncio.get_running_loop()
+        session = SdkSession(self, websocket, fmt, name, self.queue_size)
+        self.sessions.append(session)
+        print(f"[SDK] Session {session.id} opened ({name or 'anonymous'}, {fmt})")
+        return session
+
+    def close(self, session: SdkSession):
+        session.close()
+        if session in self.sessions:
+            self.sessions.remove(session)
+        print(f"[SDK] Session {session.id} closed ({session.sent} sent, {session.dropped} dropped)")
+
+    def publish(self, name: str, event):
+        """Fans a bridge Message/Event out to matching sessions; safe to call from any thread."""
+        if not self.sessions or self._loop is None or self._loop.is_closed():
+            return
+        targets = [s for s in list(self.sessions) if s.wants(name, event)]
+        if not targets:
+            return
+        frame = {"op": "event", "event": name, "data": event.to_dict()}
+        encoded = {}
+        for s in targets:
+            if s.format not in encoded:
+                encoded[s.format] = encode(frame, s.format)
+        self._loop.call_soon_threadsafe(self._deliver, targets, encoded)
+
+    @staticmethod
+    def _deliver(targets: List[SdkSession], encoded: Dict[str, Any]):
+        for s in targets:
+            s.push(encoded[s.format])
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"sessions": [s.to_dict() for s in self.sessions], "actions": sorted(self.actions),
+                "msgpack": msgpack is not None, "version": PROTOCOL_VERSION}
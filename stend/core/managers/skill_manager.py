@@ -1,14 +1,39 @@
 import os
+import time
+import inspect
 import importlib.util
-from typing import List
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from stend.core.managers.metrics import registry
+from stend.core.managers.tracing import tracer
+from stend.core.managers.profiler import SkillProfiler
+
+SKILL_DURATION = registry.histogram("stend_skill_duration_seconds", "Skill handler execution time", ["skill", "event"])
+SKILL_ERRORS = registry.counter("stend_skill_errors_total", "Skill handler exceptions", ["skill"])
 
 class SkillManager:
-    def __init__(self, skills_dir: str):
+    def __init__(self, skills_dir: str, reply_factory: Optional[Callable[[dict], Callable]] = None,
+                 context: Optional[Dict[str, Any]] = None,
+                 skill_context: Optional[Dict[str, Callable[[str], Any]]] = None, job_workers=4):
         self.skills_dir = skills_dir
         self.skills = []
+        self.by_name: Dict[str, Any] = {}
+        # on_message(chat, reply) skills get a reply bound to the source room
+        self.reply_factory = reply_factory
+        # Injected as module globals before a skill runs (e.g. `directory`), so skills need no imports
+        self.context = context or {}
+        # Same, but built per skill: name -> factory(skill_name) (e.g. a scheduler scoped to the skill)
+        self.skill_context = skill_context or {}
+        self._wants_reply = set()
+        self.profiler = SkillProfiler()
+        # Scheduled jobs run here rather than on the bridge thread
+        self._pool = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix="skill")
 
     def load_skills(self) -> List[str]:
         self.skills = []
+        self.by_name = {}
+        self._wants_reply = set()
         loaded_names = []
         if not os.path.exists(self.skills_dir):
             os.makedirs(self.skills_dir)
@@ -21,19 +46,76 @@ class SkillManager:
                 
                 spec = importlib.util.spec_from_file_location(skill_name, file_path)
                 mod = importlib.util.module_from_spec(spec)
+                for key, value in self.context.items():
+                    setattr(mod, key, value)
+                for key, factory in self.skill_context.items():
+                    setattr(mod, key, factory(skill_name))
                 spec.loader.exec_module(mod)
                 
                 self.skills.append(mod)
+                self.by_name[skill_name] = mod
                 loaded_names.append(skill_name)
+                if self._takes_reply(getattr(mod, "on_message", None)):
+                    self._wants_reply.add(skill_name)
         
         return loaded_names
 
+    @staticmethod
+    def _takes_reply(handler) -> bool:
+        if handler is None:
+            return False
+        try:
+            return len(inspect.signature(handler).parameters) >= 2
+        except (TypeError, ValueError):
+            return False
+
     def dispatch(self, event_type: str, data: dict):
+        reply = None
         for skill in self.skills:
-            try:
-                if event_type == "message" and hasattr(skill, "on_message"):
-                    skill.on_message(data)
-                elif event_type == "stend_event" and hasattr(skill, "on_stend_event"):
-                    skill.on_stend_event(data)
-            except Exception as e:
-                print(f"[SkillManager] Error in skill {getattr(skill, '__name__', 'unknown')}: {e}")
+            if event_type == "message":
+                handler = getattr(skill, "on_message", None)
+            elif event_type == "stend_event":
+                handler = getattr(skill, "on_stend_event", None)
+            else:
+                handler = None
+            if handler is None:
+                continue
+
+            name = getattr(skill, '__name__', 'unknown')
+            args = (data,)
+            if event_type == "message" and name in self._wants_reply and self.reply_factory:
+                if reply is None:
+                    reply = self.reply_factory(data)
+                args = (data, reply)
+            self._invoke(name, event_type, handler, args, data.get("trace_id"))
+
+    def run_job(self, job) -> Future:
+        """Submits a Scheduler job to the skill pool; LookupError if its skill or handler is not loaded."""
+        skill = self.by_name.get(job.skill)
+        if skill is None:
+            raise LookupError(f"Skill '{job.skill}' is not loaded")
+        handler = getattr(skill, job.handler, None)
+        if not callable(handler):
+            raise LookupError(f"Skill '{job.skill}' has no function '{job.handler}'")
+        return self._pool.submit(self._invoke, job.skill, "job", handler, (job,), None, True)
+
+    def _invoke(self, name: str, event_type: str, handler, args, trace_id=None, reraise=False):
+        session = self.profiler.session_for(name) if self.profiler.active else None
+
+        start = time.perf_counter()
+        try:
+            with tracer.span(f"skill:{name}"):
+                if session is None:
+                    handler(*args)
+                else:
+                    self.profiler.run(session, name, handler, *args)
+        except Exception as e:
+            SKILL_ERRORS.labels(name).inc()
+            print(f"[SkillManager] Error in skill {name}: {e}")
+            if reraise:
+                raise
+        finally:
+            duration = time.perf_counter() - start
+            SKILL_DURATION.labels(name, event_type).observe(duration)
+            if duration >= self.profiler.slow_threshold:
+                self.profiler.note_duration(name, event_type, duration, trace_id)
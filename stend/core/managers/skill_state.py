@@ -0,0 +1,207 @@
+import json
+import time
+import threading
+from typing import Any, Dict, Optional
+
+from stend.core.managers.metrics import registry
+
+STATE_FLUSH = registry.histogram("stend_skill_state_flush_seconds", "Skill state write-behind flush time")
+STATE_WRITES = registry.counter("stend_skill_state_writes_total", "Skill state keys written to the store", ["op"])
+
+_MISSING = object()
+
+
+class SkillState:
+    """
+    A skill's persistent key-value namespace (`state` in the skill module).
+
+    Reads and writes hit an in-memory dict loaded from StendStore on first
+    use; changed keys are written back in batches by StateManager. Values
+    must be JSON-serializable. After mutating a stored list/dict in place,
+    call touch(key) so the change is persisted.
+    """
+    def __init__(self, manager: "StateManager", skill: str):
+        self._manager = manager
+        self.skill = skill
+        self.prefix = f"{StateManager.STORE_PREFIX}{skill}:"
+        self._data: Optional[Dict[str, Any]] = None
+        self._dirty = set()
+        self._lock = threading.RLock()
+
+    def _items(self) -> Dict[str, Any]:
+        data = self._data
+        if data is None:
+            with self._lock:
+                if self._data is None:
+                    store = self._manager.store
+                    rows = store.get_prefix(self.prefix) if store is not None else {}
+                    self._data = {k[len(self.prefix):]: v for k, v in rows.items()}
+                data = self._data
+        return data
+
+    # --- Dict-style access ---
+    def get(self, key: str, default=None):
+        return self._items().get(key, default)
+
+    def __getitem__(self, key: str):
+        return self._items()[key]
+
+    def __contains__(self, key: str):
+        return key in self._items()
+
+    def __len__(self):
+        return len(self._items())
+
+    def __iter__(self):
+        return iter(list(self._items()))
+
+    def keys(self):
+        return list(self._items())
+
+    def items(self):
+        return list(self._items().items())
+
+    def set(self, key: str, value):
+        data = self._items()
+        with self._lock:
+            data[key] = value
+            self._dirty.add(key)
+
+    __setitem__ = set
+
+    def delete(self, key: str) -> bool:
+        data = self._items()
+        with self._lock:
+            if data.pop(key, _MISSING) is _MISSING:
+                return False
+            self._dirty.add(key)
+            return True
+
+    def __delitem__(self, key: str):
+        if not self.delete(key):
+            raise KeyError(key)
+
+    def setdefault(self, key: str, default=None):
+        data = self._items()
+        with self._lock:
+            if key not in data:
+                data[key] = default
+                self._dirty.add(key)
+            return data[key]
+
+    def incr(self, key: str, amount=1):
+        """Atomic counter update; returns the new value."""
+        data = self._items()
+        with self._lock:
+            value = data.get(key, 0) + amount
+            data[key] = value
+            self._dirty.add(key)
+            return value
+
+    def touch(self, key: str):
+        with self._lock:
+            if key in self._items():
+                self._dirty.add(key)
+
+    def clear(self):
+        data = self._items()
+        with self._lock:
+            for key in list(data):
+                del data[key]
+                self._dirty.add(key)
+
+    def _take(self):
+        """(dirty keys, {store key: json} to write, store keys to delete); called by the flusher."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            data = self._data or {}
+            writes, deletes = {}, []
+            for key in dirty:
+                if key in data:
+                    try:
+                        # Serialized now so later in-place changes don't leak into this batch
+                        writes[self.prefix + key] = json.dumps(data[key])
+                    except (TypeError, ValueError) as e:
+                        print(f"[SkillState] {self.skill}: '{key}' is not JSON-serializable, not saved: {e}")
+                else:
+                    deletes.append(self.prefix + key)
+            return dirty, writes, deletes
+
+    def _restore(self, keys):
+        # A failed write: mark the keys dirty again for the next flush
+        with self._lock:
+            self._dirty |= keys
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"skill": self.skill, "loaded": self._data is not None,
+                "keys": len(self._data or {}), "dirty": len(self._dirty)}
+
+
+class StateManager:
+    """
+    Hands out one SkillState per skill name and writes their changes
+    behind: every `flush_interval` seconds all dirty keys of all skills go
+    to StendStore in one transaction. The same SkillState object is
+    re-injected when skills are reloaded, so nothing is reread or lost.
+    """
+    STORE_PREFIX = "stend:state:"
+
+    def __init__(self, store=None, flush_interval=1.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.states: Dict[str, SkillState] = {}
+        self.last_flush: Optional[float] = None
+        self.flushed = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+
+    def for_skill(self, skill: str) -> SkillState:
+        with self._lock:
+            state = self.states.get(skill)
+            if state is None:
+                state = self.states[skill] = SkillState(self, skill)
+            return state
+
+    def flush(self) -> int:
+        if self.store is None:
+            return 0
+        pending = [s for s in list(self.states.values()) if s._dirty]
+        if not pending:
+            return 0
+        with self._flush_lock:
+            started = time.perf_counter()
+            taken = [(state,) + state._take() for state in pending]
+            writes, deletes = {}, []
+            for _, _, w, d in taken:
+                writes.update(w)
+                deletes.extend(d)
+            try:
+                self.store.put_many(writes)
+                self.store.delete_many(deletes)
+            except Exception as e:
+                print(f"[SkillState] Flush of {len(writes) + len(deletes)} keys failed: {e}")
+                for state, keys, _, _ in taken:
+                    state._restore(keys)
+                return 0
+            STATE_WRITES.labels("put").inc(len(writes))
+            STATE_WRITES.labels("delete").inc(len(deletes))
+            STATE_FLUSH.observe(time.perf_counter() - started)
+            self.last_flush = time.time()
+            self.flushed += len(writes) + len(deletes)
+            return len(writes) + len(deletes)
+
+    def start(self):
+        if self._thread is not None or self.store is None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(self.flush_interval)
+                self.flush()
+        self._thread = threading.Thread(target=loop, daemon=True, name="skill-state")
+        self._thread.start()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"skills": [s.to_dict() for s in list(self.states.values())],
+                "last_flush": self.last_flush, "flushed": self.flushed, "flush_interval": self.flush_interval}
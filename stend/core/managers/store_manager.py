@@ -2,17 +2,29 @@ import sqlite3
 import json
 import os
 
+from stend.core.managers.metrics import registry
+
+STORE_OPS = registry.meter("stend_store_ops_total", "StendStore operations", ["op"])
+
 class StendStore:
     """
     SQLite-based Key-Value store for bot configurations and user data.
     Port of legacy PyKV from irispy-client.
     """
-    def __init__(self, db_path="stend_store.db"):
+    def __init__(self, db_path="stend_store.db", wal=False):
         self.db_path = db_path
+        self.wal = wal
         self._init_db()
 
+    def _connect(self):
+        # Several worker processes may share the file; wait for their locks instead of failing
+        return sqlite3.connect(self.db_path, timeout=10)
+
     def _init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
+            if self.wal:
+                # Readers no longer block the writer (multi-worker mode)
+                conn.execute("PRAGMA journal_mode=WAL")
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS store (
                     key TEXT PRIMARY KEY,
@@ -22,17 +34,19 @@ class StendStore:
             conn.commit()
 
     def put(self, key, value):
+        STORE_OPS.labels("put").inc()
         # Serialize if not string
         if not isinstance(value, str):
             value = json.dumps(value)
         
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connect() as conn:
             conn.execute("INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)", (key, value))
             conn.commit()
         return True
 
     def get(self, key):
-        with sqlite3.connect(self.db_path) as conn:
+        STORE_OPS.labels("get").inc()
+        with self._connect() as conn:
             cursor = conn.execute("SELECT value FROM store WHERE key = ?", (key,))
             row = cursor.fetchone()
             if row:
@@ -44,17 +58,55 @@ class StendStore:
         return None
 
     def delete(self, key):
-        with sqlite3.connect(self.db_path) as conn:
+        STORE_OPS.labels("delete").inc()
+        with self._connect() as conn:
             conn.execute("DELETE FROM store WHERE key = ?", (key,))
             conn.commit()
         return True
 
+    def put_many(self, items):
+        """Writes {key: value} in one transaction (one commit instead of one per key)."""
+        STORE_OPS.labels("put_many").inc()
+        rows = [(k, v if isinstance(v, str) else json.dumps(v)) for k, v in items.items()]
+        if not rows:
+            return True
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO store (key, value) VALUES (?, ?)", rows)
+            conn.commit()
+        return True
+
+    def delete_many(self, keys):
+        STORE_OPS.labels("delete_many").inc()
+        rows = [(k,) for k in keys]
+        if not rows:
+            return True
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM store WHERE key = ?", rows)
+            conn.commit()
+        return True
+
     def list_keys(self):
-        with sqlite3.connect(self.db_path) as conn:
+        STORE_OPS.labels("list_keys").inc()
+        with self._connect() as conn:
             cursor = conn.execute("SELECT key FROM store")
             return [row[0] for row in cursor.fetchall()]
 
     def search_key(self, keyword):
-        with sqlite3.connect(self.db_path) as conn:
+        STORE_OPS.labels("search_key").inc()
+        with self._connect() as conn:
             cursor = conn.execute("SELECT key FROM store WHERE key LIKE ?", (f"%{keyword}%",))
             return [row[0] for row in cursor.fetchall()]
+
+    def get_prefix(self, prefix):
+        """All entries whose key starts with `prefix`, as {key: value}."""
+        STORE_OPS.labels("get_prefix").inc()
+        escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._connect() as conn:
+            cursor = conn.execute("SELECT key, value FROM store WHERE key LIKE ? ESCAPE '\\'", (escaped + "%",))
+            result = {}
+            for key, val in cursor.fetchall():
+                try:
+                    result[key] = json.loads(val)
+                except:
+                    result[key] = val
+            return result
@@ -0,0 +1,141 @@
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+TRACE_HEADER = "X-Stend-Trace"
+
+_current: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("stend_trace", default=None)
+
+
+class Trace:
+    """
+    One bridge event and everything done on its behalf.
+    Work that outlives the dispatch call (webhooks) holds the trace open, and
+    it is recorded once the last holder releases it.
+    """
+    __slots__ = ("trace_id", "started_at", "t0", "attrs", "spans", "_pending", "_lock", "_tracer")
+
+    def __init__(self, tracer: "Tracer", attrs: Dict[str, Any]):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+        self.attrs = attrs
+        self.spans: List[tuple] = []
+        self._pending = 1
+        self._lock = threading.Lock()
+        self._tracer = tracer
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            # list.append is atomic; spans may come from several threads
+            self.spans.append((name, start - self.t0, end - start))
+
+    def hold(self):
+        with self._lock:
+            self._pending += 1
+
+    def release(self):
+        with self._lock:
+            self._pending -= 1
+            done = self._pending == 0
+        if done:
+            self._tracer._record(self)
+
+    finish = release
+
+    def to_dict(self) -> Dict[str, Any]:
+        spans = sorted(self.spans, key=lambda s: s[1])
+        duration = max((off + dur for _, off, dur in spans), default=0.0)
+        stages: Dict[str, float] = {}
+        device = self.attrs.get("device_ms")
+        if device is not None:
+            stages["device"] = device
+        for name, _, dur in spans:
+            stages[name] = round(stages.get(name, 0.0) + dur * 1000, 3)
+        return {
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "total_ms": round(duration * 1000 + (device or 0.0), 3),
+            "stages": stages,
+            "spans": [{"name": n, "offset_ms": round(o * 1000, 3), "duration_ms": round(d * 1000, 3)} for n, o, d in spans],
+            "attrs": self.attrs,
+        }
+
+
+class Tracer:
+    def __init__(self, path="stend_traces.jsonl", max_bytes=5 * 1024 * 1024, backups=3, keep=2000):
+        self.recent: deque = deque(maxlen=keep)
+        self._open: Dict[str, Trace] = {}
+        self._logger = logging.getLogger("stend.traces")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        if path and not self._logger.handlers:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    def start(self, **attrs) -> Trace:
+        trace = Trace(self, attrs)
+        self._open[trace.trace_id] = trace
+        return trace
+
+    def current(self) -> Optional[Trace]:
+        return _current.get()
+
+    @contextmanager
+    def activate(self, trace: Optional[Trace]):
+        token = _current.set(trace)
+        try:
+            yield trace
+        finally:
+            _current.reset(token)
+
+    def lookup(self, trace_id: str) -> Optional[Trace]:
+        return self._open.get(trace_id)
+
+    def span(self, name: str):
+        """Span on the active trace, or a no-op outside of one."""
+        trace = _current.get()
+        return trace.span(name) if trace is not None else nullcontext()
+
+    def _record(self, trace: Trace):
+        self._open.pop(trace.trace_id, None)
+        entry = trace.to_dict()
+        self.recent.append(entry)
+        try:
+            self._logger.info(json.dumps(entry, ensure_ascii=False, separators=(",", ":")))
+        except Exception as e:
+            print(f"[Tracer] Failed to write trace: {e}")
+
+    def slowest(self, limit=20, window: Optional[float] = None) -> List[Dict[str, Any]]:
+        entries = list(self.recent)
+        if window:
+            cutoff = time.time() - window
+            entries = [e for e in entries if e["started_at"] >= cutoff]
+        entries.sort(key=lambda e: e["total_ms"], reverse=True)
+        return entries[:limit]
+
+    def get(self, trace_id: str) -> Optional[Dict[str, Any]]:
+        trace = self._open.get(trace_id)
+        if trace:
+            return trace.to_dict()
+        for e in reversed(self.recent):
+            if e["trace_id"] == trace_id:
+                return e
+        return None
+
+
+tracer = Tracer()
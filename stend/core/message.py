@@ -0,0 +1,260 @@
+import json
+from typing import Any, Dict, Optional
+
+_UNSET = object()
+
+
+class Ref:
+    """A room or user: id plus display name (either may be None)."""
+    __slots__ = ("id", "name")
+
+    def __init__(self, id, name):
+        self.id = id
+        self.name = name
+
+    def __getitem__(self, key):
+        # ref['id'] / ref['name'], as in the old orchestrator chat dict (see LegacyChat)
+        if key not in Ref.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "name": self.name}
+
+    def __repr__(self):
+        return f"Ref({self.id!r}, {self.name!r})"
+
+
+def _loads(value) -> Dict[str, Any]:
+    if isinstance(value, dict):
+        return value
+    if not value:
+        return {}
+    try:
+        parsed = json.loads(value)
+    except (TypeError, ValueError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+class Payload:
+    """
+    Read-mostly view over a decoded bridge frame.
+
+    Item access reads the original frame, so skills written against the raw
+    dict (data['msg'], data.get('json')) keep working; typed fields are
+    attributes decoded on first use. to_dict() is the schema shared by
+    skills, webhooks and the event stream: the original keys plus the
+    normalized ones, built once per frame. (Deliberately not a
+    collections.abc subclass: ABC isinstance checks cost more than the
+    whole wrap on the dispatch path.)
+    """
+    __slots__ = ("raw", "_dict")
+    kind = "unknown"
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self._dict = None
+
+    @staticmethod
+    def wrap(raw: Dict[str, Any]) -> "Payload":
+        if type(raw) is not dict and isinstance(raw, Payload):
+            return raw
+        if "msg" in raw:
+            return Message(raw)
+        if raw.get("type") == "stend_event":
+            return Event(raw)
+        return Payload(raw)
+
+    # --- Mapping over the raw frame ---
+    def __getitem__(self, key):
+        return self.raw[key]
+
+    def __setitem__(self, key, value):
+        self.raw[key] = value
+        self._dict = None
+
+    def __delitem__(self, key):
+        del self.raw[key]
+        self._dict = None
+
+    def __iter__(self):
+        return iter(self.raw)
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __contains__(self, key):
+        return key in self.raw
+
+    def get(self, key, default=None):
+        return self.raw.get(key, default)
+
+    def keys(self):
+        return self.raw.keys()
+
+    def values(self):
+        return self.raw.values()
+
+    def items(self):
+        return self.raw.items()
+
+    # --- Common fields ---
+    @property
+    def device(self) -> Optional[str]:
+        return self.raw.get("device")
+
+    @property
+    def trace_id(self) -> Optional[str]:
+        return self.raw.get("trace_id")
+
+    @property
+    def chat_id(self):
+        return self.raw.get("chat_id")
+
+    @property
+    def created_at(self):
+        return self.raw.get("timestamp")
+
+    def _fields(self) -> Dict[str, Any]:
+        return {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self._dict is None:
+            d = dict(self.raw)
+            d.update(self._fields())
+            self._dict = d
+        return self._dict
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.raw!r})"
+
+
+class Message(Payload):
+    """A chat message frame: {msg, room, sender, json: <chat_logs row>}."""
+    __slots__ = ("_json", "_room", "_sender", "_attachment")
+    kind = "message"
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.raw = raw
+        self._dict = None
+        j = raw.get("json")
+        # Iris sends the row as an object; only a string needs decoding later
+        self._json = j if type(j) is dict else _UNSET
+        self._room = _UNSET
+        self._sender = _UNSET
+        self._attachment = _UNSET
+
+    @property
+    def json(self) -> Dict[str, Any]:
+        """The chat_logs row (decoded if Iris sent it as a string)."""
+        if self._json is _UNSET:
+            self._json = _loads(self.raw.get("json"))
+        return self._json
+
+    @property
+    def text(self) -> Optional[str]:
+        return self.raw.get("msg")
+
+    def _field(self, key):
+        j = self._json
+        return (j if j is not _UNSET else self.json).get(key)
+
+    @property
+    def id(self):
+        """KakaoTalk log id."""
+        return self._field("id")
+
+    @property
+    def log_id(self):
+        """Local chat_logs _id (monotonic per device)."""
+        return self._field("_id")
+
+    @property
+    def chat_id(self):
+        return self._field("chat_id")
+
+    @property
+    def user_id(self):
+        return self._field("user_id")
+
+    @property
+    def created_at(self):
+        return self._field("created_at")
+
+    @property
+    def thread_id(self):
+        return self._field("thread_id")
+
+    @property
+    def room(self) -> Ref:
+        if self._room is _UNSET:
+            self._room = Ref(self.chat_id, self.raw.get("room"))
+        return self._room
+
+    @property
+    def sender(self) -> Ref:
+        if self._sender is _UNSET:
+            self._sender = Ref(self.user_id, self.raw.get("sender"))
+        return self._sender
+
+    @property
+    def attachment(self) -> Dict[str, Any]:
+        if self._attachment is _UNSET:
+            self._attachment = _loads(self.json.get("attachment"))
+        return self._attachment
+
+    @property
+    def backfill(self) -> bool:
+        return bool(self.raw.get("backfill"))
+
+    def _fields(self) -> Dict[str, Any]:
+        return {"type": "message", "id": self.id, "log_id": self.log_id, "chat_id": self.chat_id,
+                "user_id": self.user_id, "text": self.text, "created_at": self.created_at,
+                "thread_id": self.thread_id, "attachment": self.attachment}
+
+
+class Event(Payload):
+    """A stend_event frame (nickname change, delete, hide, ...)."""
+    __slots__ = ()
+    kind = "stend_event"
+
+    @property
+    def event(self) -> Optional[str]:
+        return self.raw.get("event")
+
+    @property
+    def target_id(self):
+        return self.raw.get("target_id")
+
+    @property
+    def room(self) -> Ref:
+        return Ref(self.chat_id, None)
+
+
+class LegacyChat(Message):
+    """
+    Message with the item access of the old orchestrator chat dict:
+    chat['room'] and chat['sender'] are Refs ({'id', 'name'}),
+    chat['message'] is {'content': text} and chat['raw'] is the frame.
+    Other keys read the frame as usual. Only the legacy orchestrator uses
+    it; on the API node data['room'] stays the room name from the frame.
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key == "room":
+            return self.room
+        if key == "sender":
+            return self.sender
+        if key == "message":
+            return {"content": self.text}
+        if key == "raw":
+            return self.raw
+        return self.raw[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
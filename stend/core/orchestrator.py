@@ -9,6 +9,7 @@ from flask_cors import CORS
 
 from core.adb import AdbManager
 from core.bridge import IrisBridge
+from core.message import LegacyChat
 
 # Stend System Core (Functional)
 
@@ -55,17 +56,12 @@ def load_skills():
 def dispatch_message(packet):
     # Normalized Chat Object
     try:
-        json_payload = packet.get('json', {})
-        chat = {
-            'room': {'id': json_payload.get('chat_id'), 'name': packet.get('room')},
-            'sender': {'id': json_payload.get('user_id'), 'name': packet.get('sender')},
-            'message': {'content': packet.get('msg')},
-            'raw': packet
-        }
+        # Skills written for this dispatcher index the old nested dict shape
+        chat = LegacyChat(packet)
         
         reply_func = lambda text: requests.post("http://localhost:3000/reply", json={
             "type": "text", 
-            "room": chat['room']['id'], 
+            "room": chat.chat_id, 
             "data": text
         })
 
@@ -0,0 +1,168 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Optional, Sequence
+
+PENDING = "pending"
+RUNNING = "running"
+GATING = "gating"
+DONE = "done"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def wait_until(check: Callable[[], bool], timeout: float, initial=0.1, max_interval=2.0) -> bool:
+    """Polls check() with exponential backoff; exceptions count as 'not yet'."""
+    deadline = time.perf_counter() + timeout
+    interval = initial
+    while True:
+        try:
+            if check():
+                return True
+        except Exception:
+            pass
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return False
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
+
+
+class Step:
+    """
+    One node of a Pipeline: `fn` does the work, then `check` (if given) is
+    polled until it passes or `check_timeout` expires. Dependents start only
+    once both have succeeded.
+    """
+    def __init__(self, name: str, fn: Callable[[], object], deps: Sequence[str] = (),
+                 check: Optional[Callable[[], bool]] = None, check_timeout: float = 60.0):
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.check = check
+        self.check_timeout = check_timeout
+        self.reset()
+
+    def reset(self):
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.result = None
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def execute(self):
+        self.started_at = time.perf_counter()
+        self.state = RUNNING
+        try:
+            self.result = self.fn()
+            if self.result is False:
+                raise RuntimeError("step reported failure")
+            if self.check is not None:
+                self.state = GATING
+                if not wait_until(self.check, self.check_timeout):
+                    raise RuntimeError(f"health check timed out after {self.check_timeout}s")
+            self.state = DONE
+        except SystemExit as e:
+            # CLI helpers exit on failure; keep it inside the step
+            self.state = FAILED
+            self.error = f"exited with status {e.code}"
+        except Exception as e:
+            self.state = FAILED
+            self.error = str(e) or type(e).__name__
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def to_dict(self, origin: Optional[float] = None) -> dict:
+        d = {"name": self.name, "state": self.state, "deps": self.deps, "error": self.error,
+             "duration": round(self.duration, 3) if self.duration is not None else None}
+        if origin is not None and self.started_at is not None:
+            d["offset"] = round(self.started_at - origin, 3)
+        return d
+
+
+class Pipeline:
+    """
+    Dependency-aware task runner: every step whose dependencies are done runs
+    concurrently; a failed step skips everything downstream of it.
+    """
+    def __init__(self, name="pipeline"):
+        self.name = name
+        self.steps: Dict[str, Step] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, name: str, fn: Callable[[], object], deps: Sequence[str] = (),
+            check: Optional[Callable[[], bool]] = None, check_timeout: float = 60.0) -> Step:
+        if name in self.steps:
+            raise ValueError(f"Duplicate step '{name}'")
+        # Dependencies must be declared first, which also rules out cycles
+        missing = [d for d in deps if d not in self.steps]
+        if missing:
+            raise ValueError(f"Step '{name}' depends on unknown step(s): {', '.join(missing)}")
+        step = Step(name, fn, deps, check, check_timeout)
+        self.steps[name] = step
+        return step
+
+    def run(self, only: Optional[List[str]] = None) -> bool:
+        """Runs the pipeline; `only` limits it to those steps (others keep their state). True if all ran OK."""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError(f"Pipeline '{self.name}' is already running")
+        try:
+            targets = [s for s in self.steps.values() if only is None or s.name in only]
+            for step in targets:
+                step.reset()
+            self.started_at = time.perf_counter()
+            self.finished_at = None
+            with ThreadPoolExecutor(max_workers=max(len(targets), 1), thread_name_prefix=self.name) as pool:
+                running = {}
+                while True:
+                    for step in targets:
+                        if step.state != PENDING or step in running.values():
+                            continue
+                        dep_states = [self.steps[d].state for d in step.deps]
+                        if any(s in (FAILED, SKIPPED) for s in dep_states):
+                            step.state = SKIPPED
+                            step.error = "dependency failed"
+                        elif all(s == DONE for s in dep_states):
+                            running[pool.submit(step.execute)] = step
+                    if not running:
+                        break
+                    finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        running.pop(fut)
+            self.finished_at = time.perf_counter()
+            return all(s.state == DONE for s in targets)
+        finally:
+            self._lock.release()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def failed(self) -> List[str]:
+        return [s.name for s in self.steps.values() if s.state in (FAILED, SKIPPED)]
+
+    def to_dict(self) -> dict:
+        total = None
+        if self.started_at is not None:
+            total = round((self.finished_at or time.perf_counter()) - self.started_at, 3)
+        return {"name": self.name, "running": self.running, "duration": total,
+                "steps": [s.to_dict(self.started_at) for s in self.steps.values()]}
+
+    def summary(self) -> str:
+        info = self.to_dict()
+        lines = [f"[{self.name}] finished in {info['duration']}s" if info["duration"] is not None else f"[{self.name}] not run"]
+        for s in info["steps"]:
+            timing = f"+{s['offset']:.2f}s  {s['duration']:.2f}s" if s.get("offset") is not None else "-"
+            line = f"  {s['name']:<10} {s['state']:<8} {timing}"
+            if s["error"]:
+                line += f"  ({s['error']})"
+            lines.append(line)
+        return "\n".join(lines)
@@ -1,5 +1,4 @@
 import WebSocket from 'ws';
-import axios from 'axios';
 import { STEND_COMMAND_KEY, STEND_EVENT_KEY, STEND_PREFIX_KEY } from '../decorators';
 
 /**
@@ -9,6 +8,30 @@ import { STEND_COMMAND_KEY, STEND_EVENT_KEY, STEND_PREFIX_KEY } from '../decorat
 export interface StendOptions {
     name: string;
     endpoint: string;
+    /** Wire format of the /ws/sdk channel; 'msgpack' needs the optional @msgpack/msgpack package. */
+    format?: 'json' | 'msgpack';
+    /** Server-side event filter: event names ('message', 'NICKNAME_CHANGE', ...), room ids, message prefix. */
+    events?: string[];
+    rooms?: Array<number | string>;
+    prefix?: string;
+    /** Milliseconds before a pending call() is rejected. */
+    callTimeout?: number;
+}
+
+/**
+ * @class StendCallError
+ * @description A failed action on the SDK channel (status mirrors the HTTP API).
+ */
+export class StendCallError extends Error {
+    constructor(message: string, public readonly status: number) {
+        super(message);
+    }
+}
+
+interface PendingCall {
+    resolve: (value: any) => void;
+    reject: (reason: any) => void;
+    timer: NodeJS.Timeout;
 }
 
 /**
@@ -21,6 +44,9 @@ export class StendBot {
     private eventHandlers: Map<string, Function[]> = new Map();
     private commandRegistry: Map<string, { handler: Function, meta: any }> = new Map();
     private defaultPrefix: string = '/';
+    private pending: Map<number, PendingCall> = new Map();
+    private nextId: number = 1;
+    private codec: { encode: (frame: any) => any, decode: (data: any) => any } | null = null;
 
     constructor(protected readonly options: StendOptions) {
         this.initializeMetadata();
@@ -69,32 +95,111 @@ export class StendBot {
     }
 
     /**
-     * Connects to the Stend API and begins listening for events.
+     * Connects to the Stend SDK channel (/ws/sdk): events arrive and actions
+     * go out over this one connection.
      */
     public async start() {
-        const wsUrl = this.options.endpoint.replace('http', 'ws') + '/ws';
+        const format = this.options.format || 'json';
+        this.codec = format === 'msgpack' ? this.loadMsgpack() : null;
+        const wsUrl = this.options.endpoint.replace('http', 'ws') +
+            `/ws/sdk?format=${format}&name=${encodeURIComponent(this.options.name)}`;
         this.socket = new WebSocket(wsUrl);
 
         this.socket.on('open', () => {
             console.log(`[Stend] Bot '${this.options.name}' online @ ${wsUrl}`);
+            const { events, rooms, prefix } = this.options;
+            this.send({ op: 'subscribe', id: this.nextId++, events, rooms, prefix });
         });
 
-        this.socket.on('message', async (data: string) => {
+        this.socket.on('message', async (data: WebSocket.RawData) => {
             try {
-                const packet = JSON.parse(data);
-                await this.processPacket(packet);
+                const frame = this.codec ? this.codec.decode(data) : JSON.parse(data.toString());
+                await this.processFrame(frame);
             } catch (err) {
-                console.error('[Stend] Failed to process incoming packet:', err);
+                console.error('[Stend] Failed to process incoming frame:', err);
             }
         });
 
-        this.socket.on('close', () => {
-            console.log('[Stend] Disconnected. Re-establishing link in 5s...');
+        this.socket.on('close', (code: number, reason: Buffer) => {
+            for (const call of this.pending.values()) {
+                clearTimeout(call.timer);
+                call.reject(new StendCallError('Connection closed', 503));
+            }
+            this.pending.clear();
+            console.log(`[Stend] Disconnected (${code} ${reason.toString()}). Re-establishing link in 5s...`);
             setTimeout(() => this.start(), 5000);
         });
+
+        this.socket.on('error', (err) => {
+            console.error('[Stend] Socket error:', err.message);
+        });
+    }
+
+    /**
+     * Runs an action on the API node ('reply', 'query', 'store.get', 'store.put',
+     * 'store.delete', 'directory.user', 'directory.room') and resolves with its result.
+     */
+    public call<T = any>(action: string, args: Record<string, any> = {}): Promise<T> {
+        const id = this.nextId++;
+        return new Promise<T>((resolve, reject) => {
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new StendCallError(`Call '${action}' timed out`, 504));
+            }, this.options.callTimeout ?? 15000);
+            this.pending.set(id, { resolve, reject, timer });
+            try {
+                this.send({ op: 'call', id, action, args });
+            } catch (err) {
+                clearTimeout(timer);
+                this.pending.delete(id);
+                reject(err);
+            }
+        });
+    }
+
+    private send(frame: any) {
+        if (!this.socket || this.socket.readyState !== WebSocket.OPEN) {
+            throw new StendCallError('Not connected', 503);
+        }
+        this.socket.send(this.codec ? this.codec.encode(frame) : JSON.stringify(frame));
     }
 
-    private async processPacket(packet: any) {
+    private loadMsgpack() {
+        try {
+            const { encode, decode } = require('@msgpack/msgpack');
+            return { encode: (frame: any) => encode(frame), decode: (data: any) => decode(data) };
+        } catch {
+            throw new Error("format 'msgpack' requires the @msgpack/msgpack package");
+        }
+    }
+
+    private async processFrame(frame: any) {
+        switch (frame.op) {
+            case 'event':
+                return this.processPacket(frame.event, frame.data);
+            case 'result':
+            case 'error': {
+                const call = this.pending.get(frame.id);
+                if (!call) {
+                    if (frame.op === 'error') console.error(`[Stend] ${frame.error}`);
+                    return;
+                }
+                this.pending.delete(frame.id);
+                clearTimeout(call.timer);
+                if (frame.op === 'result') call.resolve(frame.data);
+                else call.reject(new StendCallError(frame.error, frame.status));
+                return;
+            }
+        }
+    }
+
+    private async processPacket(event: string, packet: any) {
+        if (event !== 'message') {
+            // stend_event frames (NICKNAME_CHANGE, ...): handlers by name, then catch-all 'event' handlers
+            const handlers = [...(this.eventHandlers.get(event) || []), ...(this.eventHandlers.get('event') || [])];
+            for (const h of handlers) await h(packet);
+            return;
+        }
         const ctx = this.createContext(packet);
 
         // Core message dispatch
@@ -102,7 +207,7 @@ export class StendBot {
         for (const h of handlers) await h(ctx);
 
         // Command processing
-        const content = ctx.message.text.trim();
+        const content = (ctx.message.text || '').trim();
         if (content.startsWith(this.defaultPrefix)) {
             const tokens = content.slice(this.defaultPrefix.length).split(/\s+/);
             const cmdName = tokens[0];
@@ -119,18 +224,12 @@ export class StendBot {
      * Maps raw Stend packets to a developer-friendly context.
      */
     private createContext(packet: any) {
-        const rawJson = packet.json || {};
         return {
-            room: { id: rawJson.chat_id, name: packet.room, type: packet.type },
-            sender: { id: rawJson.user_id, name: packet.sender },
-            message: { text: packet.msg, id: rawJson.id, timestamp: packet.created_at },
-            reply: async (msg: string) => {
-                await axios.post(`${this.options.endpoint}/api/stend/reply`, {
-                    room: rawJson.chat_id,
-                    data: msg,
-                    type: 'text'
-                });
-            },
+            room: { id: packet.chat_id, name: packet.room, type: packet.type },
+            sender: { id: packet.user_id, name: packet.sender },
+            message: { text: packet.text, id: packet.id, timestamp: packet.created_at },
+            reply: (msg: string, threadId?: string) =>
+                this.call('reply', { room: packet.chat_id, data: msg, type: 'text', threadId }),
             raw: packet
         };
     }
@@ -1,13 +1,26 @@
 import os
 import sys
+import argparse
 import uvicorn
 
 # Add project root (where stend.py lives) to path
 # This allows 'import stend.core...' to work
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from stend.core.api_server import app
-
 if __name__ == "__main__":
-    print("Launching Stend Platform (Advanced API Mode)...")
-    uvicorn.run("stend.core.api_server:app", host="0.0.0.0", port=5001, reload=True)
+    parser = argparse.ArgumentParser(description="Stend API node")
+    parser.add_argument("--prod", action="store_true", help="Serve without auto-reload")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="uvicorn worker processes (implies --prod); one elected worker owns the bridge and skills")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5001)
+    args = parser.parse_args()
+
+    if args.workers > 1 or args.prod:
+        # Workers inherit the environment; api_server switches to store-backed shared state
+        os.environ["STEND_WORKERS"] = str(args.workers)
+        print(f"Launching Stend Platform (Production Mode, {args.workers} worker(s))...")
+        uvicorn.run("stend.core.api_server:app", host=args.host, port=args.port, workers=args.workers)
+    else:
+        print("Launching Stend Platform (Advanced API Mode)...")
+        uvicorn.run("stend.core.api_server:app", host=args.host, port=args.port, reload=True)
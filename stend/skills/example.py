@@ -1,7 +1,7 @@
 def on_message(chat, reply):
-    msg = chat['message']['content']
-    sender = chat['sender']['name']
-    room = chat['room']['name']
+    msg = chat.text
+    sender = chat.sender.name
+    room = chat.room.name
     
     print(f"[{room}] {sender}: {msg}")
     
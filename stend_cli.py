@@ -3,9 +3,12 @@ import argparse
 import subprocess
 import os
 import sys
-import time
 import requests
 
+from stend.core.managers.adb import AdbManager
+from stend.core.pipeline import Pipeline
+from stend.core.builder import AndroidBuilder
+
 # --- Configuration ---
 ADB_TARGET = "localhost:5555"
 ANDROID_PROJECT_DIR = os.path.join("stend", "android_project")
@@ -14,6 +17,8 @@ API_SERVER_SCRIPT = os.path.join("stend", "run.py")
 APK_PATH = os.path.join(ANDROID_PROJECT_DIR, "app/build/outputs/apk/debug/app-debug.apk")
 TARGET_APK_REMOTE = "/data/local/tmp/Stend.apk"
 MAIN_CLASS = "party.qwer.iris.Main"
+IRIS_PORT = 3000
+API_URL = "http://localhost:5001"
 
 def run_cmd(cmd, cwd=None, shell=False, check=True):
     print(f"[CMD] {' '.join(cmd) if isinstance(cmd, list) else cmd}")
@@ -26,44 +31,96 @@ def run_cmd(cmd, cwd=None, shell=False, check=True):
         if check: sys.exit(1)
         return None
 
-def build():
+def build(force=False):
     print("\n[1/3] Building Android Subsystem (Gradle)...")
-    gradle_cmd = "gradlew.bat" if os.name == "nt" else "./gradlew"
-    run_cmd([gradle_cmd, "assembleDebug"], cwd=ANDROID_PROJECT_DIR, shell=(os.name == "nt"))
-    
-    if not os.path.exists(APK_PATH):
-        print(f"[ERROR] APK not found at {APK_PATH}")
+    # Gradle is skipped when the source fingerprint matches the existing APK
+    builder = AndroidBuilder(os.path.abspath(ANDROID_PROJECT_DIR))
+    # A failed build must not fall through to an older APK left in the output dir
+    if not builder.build_debug(use_cache=not force) or not os.path.exists(APK_PATH):
+        print(f"[ERROR] Build failed or APK not found at {APK_PATH}")
         sys.exit(1)
-    print(f"[SUCCESS] APK Built: {APK_PATH}")
+    info = builder.last_build or {}
+    print(f"[SUCCESS] APK Built: {APK_PATH} (cache {info.get('cache')}, {info.get('seconds')}s)")
 
-def deploy():
+def deploy(restart=None):
     print("\n[2/3] Deploying Subsystem to Redroid...")
+    adb = AdbManager(target=ADB_TARGET)
     # Ensure connected
-    subprocess.run(["adb", "disconnect"], capture_output=True)
-    subprocess.run(["adb", "connect", ADB_TARGET], capture_output=True)
-    
-    print(f"Pushing APK to {TARGET_APK_REMOTE}...")
-    run_cmd(["adb", "push", APK_PATH, TARGET_APK_REMOTE])
-    
-    print("Launching Engine via app_process...")
-    # Kill previous
-    run_cmd(["adb", "shell", f"pkill -f {MAIN_CLASS}"], check=False)
-    
-    # Run in background via nohup-like shell command
-    launch_cmd = f"export CLASSPATH={TARGET_APK_REMOTE}; app_process /system/bin {MAIN_CLASS} > /data/local/tmp/stend_engine.log 2>&1 &"
-    run_cmd(["adb", "shell", launch_cmd])
-    
+    adb.fast_connect()
+    # Readiness is probed over HTTP, so forward Iris before launching
+    adb.setup_port_forward(IRIS_PORT, IRIS_PORT)
+
+    # Pushes only when the APK hash differs from the device copy
+    report = adb.deploy_iris(APK_PATH, iris_url=f"http://localhost:{IRIS_PORT}", remote=TARGET_APK_REMOTE,
+                             log_path="/data/local/tmp/stend_engine.log", restart=restart)
+    if report.get("error"):
+        print(f"[ERROR] Engine deploy aborted: {report['error']}")
+        sys.exit(1)
+    if not report["ready"]:
+        print("[ERROR] Engine did not answer on /dashboard/status (log: /data/local/tmp/stend_engine.log)")
+        sys.exit(1)
     print("[SUCCESS] Engine Deployed and Running.")
+    return report
 
-def start_api():
+def start_api(autostart=True):
     print("\n[3/3] Launching Stend API Server...")
+    # With autostart off the API waits for /api/control/start (see attach_api)
+    env = dict(os.environ, STEND_AUTOSTART="1" if autostart else "0", STEND_APK_PATH=os.path.abspath(APK_PATH))
     # Non-blocking execution of the API server
     try:
-        subprocess.Popen([sys.executable, API_SERVER_SCRIPT])
+        subprocess.Popen([sys.executable, API_SERVER_SCRIPT], env=env)
         print("[SUCCESS] API Server Started at http://localhost:5001")
         print("Tip: Use 'python stend_cli.py stop' to shut down everything.")
     except Exception as e:
         print(f"[ERROR] Failed to start API: {e}")
+        return False
+
+def start_docker():
+    print("Launching Stend Infrastructure (Docker-Compose)...")
+    run_cmd(["docker-compose", "up", "-d"], cwd=DOCKER_ENV_DIR)
+
+def attach_api():
+    requests.post(f"{API_URL}/api/control/start", timeout=5).raise_for_status()
+
+# --- Health-check gates ---
+def device_ready():
+    adb = AdbManager(target=ADB_TARGET)
+    adb.fast_connect()
+    return adb.run(["get-state"]) == "device"
+
+def apk_ready():
+    return os.path.exists(APK_PATH)
+
+def api_ready():
+    return requests.get(f"{API_URL}/api/status", timeout=1).ok
+
+def bridge_ready():
+    devices = requests.get(f"{API_URL}/api/status", timeout=1).json().get("devices", [])
+    return any(d.get("bridge") == "connected" for d in devices)
+
+def make_start_pipeline(docker=start_docker, build_step=None, deploy_step=None, api=None, attach=attach_api,
+                        device_check=device_ready, apk_check=apk_ready, api_check=api_ready, bridge_check=bridge_ready):
+    """
+    docker and build run in parallel, deploy waits for both; the API process
+    starts right away and is attached (bridge up) once the engine is deployed.
+    Every callable can be replaced, e.g. with stubs for a dry run.
+    """
+    pipeline = Pipeline("start")
+    pipeline.add("docker", docker, check=device_check, check_timeout=120)
+    pipeline.add("build", build_step or build, check=apk_check, check_timeout=5)
+    pipeline.add("api", api or (lambda: start_api(autostart=False)), check=api_check, check_timeout=30)
+    pipeline.add("deploy", deploy_step or deploy, deps=["docker", "build"])
+    pipeline.add("attach", attach, deps=["deploy", "api"], check=bridge_check, check_timeout=60)
+    return pipeline
+
+def start():
+    pipeline = make_start_pipeline()
+    ok = pipeline.run()
+    print("\n" + pipeline.summary())
+    if not ok:
+        print(f"\n[ERROR] Start failed: {', '.join(pipeline.failed())}")
+        sys.exit(1)
+    print("\nStend is READY.")
 
 def stop():
     print("\nStopping Stend Platform...")
@@ -85,8 +142,10 @@ def main():
     subparsers = parser.add_subparsers(dest="command", help="Commands")
 
     subparsers.add_parser("start", help="Full start (Docker -> Build -> Deploy -> API)")
-    subparsers.add_parser("build", help="Build the Android project")
-    subparsers.add_parser("deploy", help="Push and run the APK in redroid")
+    parser_build = subparsers.add_parser("build", help="Build the Android project")
+    parser_build.add_argument("--force", action="store_true", help="Ignore the build cache and always run Gradle")
+    parser_deploy = subparsers.add_parser("deploy", help="Push and run the APK in redroid")
+    parser_deploy.add_argument("--restart", action="store_true", default=None, help="Restart Iris even if the APK is unchanged")
     subparsers.add_parser("stop", help="Stop all services")
     subparsers.add_parser("api", help="Start only the API server")
     
@@ -98,19 +157,13 @@ def main():
     args = parser.parse_args()
 
     if args.command == "start":
-        print("Launching Stend Infrastructure (Docker-Compose)...")
-        run_cmd(["docker-compose", "up", "-d"], cwd=DOCKER_ENV_DIR)
-        time.sleep(5)
-        build()
-        deploy()
-        start_api()
-        print("\nStend is READY.")
+        start()
         
     elif args.command == "build":
-        build()
+        build(force=args.force)
         
     elif args.command == "deploy":
-        deploy()
+        deploy(restart=args.restart)
         
     elif args.command == "stop":
         stop()
@@ -0,0 +1,112 @@
+import os
+import asyncio
+
+import pytest
+
+from conftest import free_port
+from stend.bench.fake_adb import FakeAdbServer
+from stend.core.managers.adb import AdbManager
+from stend.core.managers.adb_protocol import AdbClient, AdbError, get_runner
+
+DEVICE = "127.0.0.1:5555"
+
+
+@pytest.fixture
+def fake_adb(tmp_path, event_loop_thread):
+    fake = FakeAdbServer(str(tmp_path / "device"), {DEVICE})
+    os.makedirs(fake.root)
+    port = free_port()
+    server = asyncio.run_coroutine_threadsafe(
+        asyncio.start_server(fake.handle, "127.0.0.1", port), event_loop_thread).result(5)
+    fake.port = port
+    yield fake
+    event_loop_thread.call_soon_threadsafe(server.close)
+
+
+@pytest.fixture
+def fake_cli(tmp_path):
+    """An `adb` executable that records its arguments and echoes them back."""
+    log = tmp_path / "cli.log"
+    path = tmp_path / "adb"
+    path.write_text(f'#!/bin/sh\necho "$@" >> "{log}"\necho "cli: $@"\n')
+    path.chmod(0o755)
+    return str(path), log
+
+
+def run(coro):
+    return get_runner().run(coro, 10)
+
+
+def test_host_request_framing(fake_adb):
+    client = AdbClient(port=fake_adb.port)
+    assert run(client.version()) == 0x29
+    assert run(client.get_state(DEVICE)) == "device"
+    # Requests go out as <4 hex digit length><payload>
+    assert fake_adb.requests[:2] == ["host:version", f"host-serial:{DEVICE}:get-state"]
+
+
+def test_fail_reply_raises_with_server_message(fake_adb):
+    client = AdbClient(port=fake_adb.port)
+    with pytest.raises(AdbError, match="device 'nope' not found"):
+        run(client.get_state("nope"))
+    with pytest.raises(AdbError, match="not found"):
+        run(client.shell("nope", "true"))
+
+
+def test_forward_reads_both_okays(fake_adb):
+    run(AdbClient(port=fake_adb.port).forward(DEVICE, "tcp:3000", "tcp:3000"))
+    assert fake_adb.forwards == {"tcp:3000": (DEVICE, "tcp:3000")}
+
+
+def test_persistent_shell_reuses_one_session(fake_adb, fake_cli):
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, adb_port=fake_adb.port)
+    assert adb.run(["shell", "echo hello"]) == "hello"
+    assert adb.run(["shell", "export X=1; echo $X"]) == "1"
+    # Each command runs in a subshell, like separate `adb shell` calls
+    assert adb.run(["shell", "echo ${X:-unset}"]) == "unset"
+    # Non-zero exit codes map to None, as with the CLI
+    assert adb.run(["shell", "exit 3"]) is None
+    assert fake_adb.requests.count("exec:sh") == 1
+    assert not fake_cli[1].exists()
+
+
+def test_push_uses_sync_protocol(fake_adb, fake_cli, tmp_path):
+    apk = tmp_path / "Stend.apk"
+    apk.write_bytes(os.urandom(200 * 1024))
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, adb_port=fake_adb.port)
+    out = adb.push(str(apk), "/data/local/tmp/Stend.apk")
+    assert "1 file pushed" in out
+    with open(os.path.join(fake_adb.root, "data/local/tmp/Stend.apk"), "rb") as f:
+        assert f.read() == apk.read_bytes()
+    assert "sync:" in fake_adb.requests
+
+
+def test_unsupported_command_falls_back_to_cli(fake_adb, fake_cli):
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, adb_port=fake_adb.port)
+    assert adb.run(["install", "-r", "x.apk"]) == f"cli: -s {DEVICE} install -r x.apk"
+
+
+def test_server_down_falls_back_to_cli(fake_cli):
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, adb_port=free_port())
+    assert adb.run(["shell", "echo", "hi"]) == f"cli: -s {DEVICE} shell echo hi"
+    assert adb.run(["get-state"]) == f"cli: -s {DEVICE} get-state"
+
+
+def test_socket_backend_does_not_fall_back(fake_cli):
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, backend="socket", adb_port=free_port())
+    assert adb.run(["shell", "echo", "hi"]) is None
+    assert not fake_cli[1].exists()
+
+
+def test_cli_backend_skips_the_socket(fake_adb, fake_cli):
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, backend="cli", adb_port=fake_adb.port)
+    assert adb.run(["get-state"]) == f"cli: -s {DEVICE} get-state"
+    assert fake_adb.requests == []
+
+
+def test_shell_async_bounds_output(fake_adb, fake_cli):
+    adb = AdbManager(adb_path=fake_cli[0], target=DEVICE, adb_port=fake_adb.port)
+    result = run(adb.shell_async("yes | head -c 10000", timeout=5, max_bytes=1000))
+    assert result["truncated"] and len(result["output"]) == 1000 and not result["timed_out"]
+    result = run(adb.shell_async("sleep 5", timeout=0.2))
+    assert result["timed_out"]
@@ -0,0 +1,36 @@
+import pytest
+
+from stend.bench.fake_iris import FakeKakaoDB
+from stend.core.managers.bridge import IrisBridge
+
+
+@pytest.fixture
+def kakao_db():
+    return FakeKakaoDB(rooms=2, users=2)
+
+
+def bridge_on(db):
+    bridge = IrisBridge(iris_url="http://127.0.0.1:1")
+    bridge._query = lambda sql, *binds: db.query(sql, [str(b) for b in binds])
+    return bridge
+
+
+def test_open_chat_nickname_is_per_room(kakao_db):
+    kakao_db.conn.executescript("""
+        ALTER TABLE chat_rooms ADD COLUMN link_id INTEGER;
+        UPDATE chat_rooms SET link_id = id + 1;
+        CREATE TABLE open_chat_member (link_id INTEGER, user_id INTEGER, nickname TEXT, enc INTEGER);
+        INSERT INTO open_chat_member VALUES (1001, 5000, 'Nick in room 0', 0);
+        INSERT INTO open_chat_member VALUES (1002, 5000, 'Nick in room 1', 0);
+    """)
+    rows = [{"chat_id": "1000", "user_id": "5000"}, {"chat_id": "1001", "user_id": "5000"},
+            {"chat_id": "1001", "user_id": "5001"}]
+    names = bridge_on(kakao_db)._names(rows)
+    assert names["rooms"] == {"1000": "Room 0", "1001": "Room 1"}
+    assert names["users"] == {"1000:5000": "Nick in room 0", "1001:5000": "Nick in room 1", "1001:5001": "User 1"}
+
+
+def test_friends_only_database(kakao_db):
+    rows = [{"chat_id": "1000", "user_id": "5000"}, {"chat_id": "1001", "user_id": "5000"}]
+    names = bridge_on(kakao_db)._names(rows)
+    assert names["users"] == {"1000:5000": "User 0", "1001:5000": "User 0"}
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+from stend.core.builder import AndroidBuilder
+
+APK = "app/build/outputs/apk/debug/app-debug.apk"
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch):
+    """A minimal project whose gradlew writes the APK and counts its runs; cwd is its parent."""
+    root = tmp_path / "android_project"
+    (root / "app/src/main").mkdir(parents=True)
+    (root / "app/src/main/Main.kt").write_text("fun main() {}\n")
+    (root / "build.gradle.kts").write_text("// root\n")
+    (root / "app/settings.gradle.kts").write_text("// app settings\n")
+    (root / "gradlew").write_text('#!/bin/sh\nmkdir -p app/build/outputs/apk/debug\n'
+                                  'echo apk > app/build/outputs/apk/debug/app-debug.apk\necho run >> runs.log\n')
+    monkeypatch.chdir(tmp_path)
+    return root
+
+
+def runs(root):
+    log = root / "runs.log"
+    return len(log.read_text().splitlines()) if log.exists() else 0
+
+
+def test_miss_with_relative_root_runs_gradle(project):
+    builder = AndroidBuilder("android_project")
+    apk = builder.build_debug()
+    assert apk and os.path.samefile(apk, project / APK)
+    assert builder.last_build["cache"] == "miss" and runs(project) == 1
+
+
+def test_unchanged_inputs_reuse_the_apk(project):
+    AndroidBuilder("android_project").build_debug()
+    builder = AndroidBuilder("android_project")
+    assert builder.build_debug()
+    assert builder.last_build["cache"] == "hit" and runs(project) == 1
+
+
+@pytest.mark.parametrize("rel", ["app/src/main/Main.kt", "build.gradle.kts", "app/settings.gradle.kts"])
+def test_input_change_rebuilds(project, rel):
+    builder = AndroidBuilder("android_project")
+    builder.build_debug()
+    with open(project / rel, "a") as f:
+        f.write("// changed\n")
+    builder.build_debug()
+    assert builder.last_build["cache"] == "miss" and runs(project) == 2
+
+
+def test_missing_gradlew_fails_cleanly(project):
+    (project / "gradlew").unlink()
+    builder = AndroidBuilder("android_project")
+    assert builder.build_debug() is None
+    assert builder.last_build["apk"] is None and builder.last_build["error"]
+
+
+def test_failing_gradle_returns_none(project):
+    (project / "gradlew").write_text("#!/bin/sh\nexit 1\n")
+    assert AndroidBuilder("android_project").build_debug() is None
@@ -0,0 +1,150 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+
+from stend.bench import fake_sharer
+from stend.core.managers.link_manager import KakaoLinkManager
+
+TOKEN = "fake-token-fake-device"
+
+
+@pytest.fixture
+def aot():
+    """What the fake Iris answers on /aot; tests may change it."""
+    return {"aot": {"access_token": "fake-token", "d_id": "fake-device", "expires_in": 3600}, "calls": 0}
+
+
+@pytest.fixture
+def links(serve_app, aot):
+    iris = FastAPI()
+
+    @iris.get("/aot")
+    def get_aot():
+        aot["calls"] += 1
+        return {"success": True, "aot": aot["aot"]}
+
+    fake_sharer.STATE.update(token=TOKEN, latency_ms=0.0, rooms=5, friends=5, keys={}, sent=[],
+                             link_calls=0, send_calls=0)
+    return KakaoLinkManager(iris_url=serve_app(iris), sharer_url=serve_app(fake_sharer.app))
+
+
+def send(links, receiver="Room 1", **kw):
+    return links.send(receiver, 1234, kw.get("args", {"a": 1}), "app-key", "https://example.com")
+
+
+def test_repeated_sends_hit_both_caches(links, aot):
+    assert send(links) == {"success": True}
+    assert send(links, "User 2") == {"success": True}
+    # One token fetch and one validation; only picker/send repeats
+    assert aot["calls"] == 1
+    assert fake_sharer.STATE["link_calls"] == 1
+    assert [s["receiver"] for s in fake_sharer.STATE["sent"]] == ["Room 1", "User 2"]
+    # Different template args are validated separately
+    assert send(links, args={"a": 2}) == {"success": True}
+    assert fake_sharer.STATE["link_calls"] == 2
+
+
+def test_validation_cache_expires(links):
+    links.server_data_ttl = 0.05
+    send(links)
+    time.sleep(0.1)
+    send(links)
+    assert fake_sharer.STATE["link_calls"] == 2
+
+
+def test_unknown_receiver(links):
+    res = send(links, "Nobody")
+    assert not res["success"] and "not found" in res["error"]
+    assert fake_sharer.STATE["send_calls"] == 0
+
+
+def test_stale_token_is_refreshed_once_on_401(links, aot):
+    assert send(links)["success"]
+    # The sharer now wants a new token, which Iris hands out on the next /aot
+    fake_sharer.STATE["token"] = "new-token-fake-device"
+    aot["aot"] = dict(aot["aot"], access_token="new-token")
+    assert send(links, "User 1") == {"success": True}
+    assert aot["calls"] == 2
+    assert fake_sharer.STATE["sent"][-1]["receiver"] == "User 1"
+
+
+def test_persistent_401_fails_without_looping(links, aot):
+    fake_sharer.STATE["token"] = "something-else"
+    res = send(links)
+    assert res == {"success": False, "error": "unauthorized"}
+    assert aot["calls"] == 2 and fake_sharer.STATE["link_calls"] == 2
+
+
+def test_stale_validation_is_redone_on_400(links):
+    assert send(links)["success"]
+    # The sharer forgot the short key (as after a deploy): one revalidation, then it goes through
+    fake_sharer.STATE["keys"].clear()
+    assert send(links, "User 3") == {"success": True}
+    assert fake_sharer.STATE["link_calls"] == 2
+
+
+@pytest.mark.parametrize("answer", [{}, {"access_token": "t"}, {"d_id": "d"}, {"access_token": None, "d_id": None}])
+def test_incomplete_token_is_not_cached(links, aot, answer):
+    aot["aot"] = answer
+    assert send(links) == {"success": False, "error": "Authorization failed"}
+    assert links._auth is None
+    aot["aot"] = {"access_token": "fake-token", "d_id": "fake-device"}
+    assert send(links)["success"]
+
+
+def test_bulk_send(links, aot):
+    receivers = ["Room 0", "User 1", "Nobody", "Room 2", "Room 0"]
+    results = list(links.send_bulk(receivers, 1234, {}, "app-key", "https://example.com", concurrency=4, rate=100))
+    by_name = {r["receiver"]: r for r in results}
+    # Duplicates are sent once; unknown names fail without a send
+    assert len(results) == 4
+    assert not by_name["Nobody"]["success"] and "not found" in by_name["Nobody"]["error"]
+    assert all(by_name[n]["success"] for n in ("Room 0", "User 1", "Room 2"))
+    assert sorted(s["receiver"] for s in fake_sharer.STATE["sent"]) == ["Room 0", "Room 2", "User 1"]
+    assert fake_sharer.STATE["link_calls"] == 1 and aot["calls"] == 1
+
+
+def test_bulk_send_is_rate_limited(links):
+    started = time.perf_counter()
+    results = list(links.send_bulk([f"User {i}" for i in range(5)], 1234, {}, "app-key", "https://example.com",
+                                   concurrency=5, rate=20))
+    assert all(r["success"] for r in results)
+    # Five sends at 20/s are spaced 50ms apart whatever the concurrency
+    assert time.perf_counter() - started >= 0.19
+
+
+def test_bulk_send_refreshes_a_stale_token(links, aot):
+    send(links)
+    fake_sharer.STATE["token"] = "new-token-fake-device"
+    aot["aot"] = dict(aot["aot"], access_token="new-token")
+    results = list(links.send_bulk(["Room 1", "Room 2"], 1234, {"a": 1}, "app-key", "https://example.com"))
+    assert all(r["success"] for r in results)
+    assert aot["calls"] == 2
+
+
+def test_bulk_send_reports_auth_failure_per_receiver(links, aot):
+    aot["aot"] = {}
+    results = list(links.send_bulk(["Room 1", "Room 2"], 1234, {}, "app-key", "https://example.com"))
+    assert results == [{"receiver": "Room 1", "success": False, "error": "Authorization failed"},
+                       {"receiver": "Room 2", "success": False, "error": "Authorization failed"}]
+
+
+def test_stuck_sharer_call_times_out(links):
+    links.SHARER_TIMEOUT = (1, 0.2)
+    fake_sharer.STATE["latency_ms"] = 1000
+    started = time.perf_counter()
+    res = send(links)
+    assert not res["success"] and "timed out" in res["error"].lower()
+    assert time.perf_counter() - started < 0.9
+
+
+def test_closing_a_bulk_send_stops_queued_sends(links):
+    fake_sharer.STATE["latency_ms"] = 50
+    receivers = [f"User {i}" for i in range(5)] + [f"Room {i}" for i in range(5)]
+    results = links.send_bulk(receivers, 1234, {}, "app-key", "https://example.com", concurrency=1, rate=100)
+    assert next(results)["success"]
+    results.close()
+    time.sleep(0.3)
+    # One in flight at most when the client left; the rest were never sent
+    assert fake_sharer.STATE["send_calls"] <= 2
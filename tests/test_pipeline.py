@@ -0,0 +1,144 @@
+import time
+import threading
+
+import pytest
+
+from stend.core.pipeline import DONE, FAILED, PENDING, SKIPPED, Pipeline
+
+
+class Recorder:
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def step(self, name, delay=0.0, result=None, error=None):
+        def fn():
+            with self._lock:
+                self.events.append(("start", name))
+            time.sleep(delay)
+            with self._lock:
+                self.events.append(("end", name))
+            if error is not None:
+                raise error
+            return result
+        return fn
+
+    def index(self, kind, name):
+        return self.events.index((kind, name))
+
+
+def diamond(rec, **overrides):
+    """a -> (b, c) -> d"""
+    p = Pipeline("test")
+    p.add("a", overrides.get("a", rec.step("a")))
+    p.add("b", overrides.get("b", rec.step("b", delay=0.1)), deps=["a"])
+    p.add("c", overrides.get("c", rec.step("c", delay=0.1)), deps=["a"])
+    p.add("d", overrides.get("d", rec.step("d")), deps=["b", "c"])
+    return p
+
+
+def test_steps_start_after_their_dependencies():
+    rec = Recorder()
+    p = diamond(rec)
+    assert p.run()
+    assert rec.index("end", "a") < rec.index("start", "b")
+    assert rec.index("end", "a") < rec.index("start", "c")
+    assert rec.index("end", "b") < rec.index("start", "d")
+    assert rec.index("end", "c") < rec.index("start", "d")
+    assert all(s.state == DONE for s in p.steps.values())
+
+
+def test_independent_steps_run_concurrently():
+    rec = Recorder()
+    both = threading.Barrier(2, timeout=2)
+    p = diamond(rec, b=lambda: both.wait(), c=lambda: both.wait())
+    # Would time out (BrokenBarrierError -> failed step) if b and c ran one after the other
+    assert p.run()
+    offsets = {s["name"]: s["offset"] for s in p.to_dict()["steps"]}
+    assert abs(offsets["b"] - offsets["c"]) < 0.1
+
+
+def test_failure_skips_everything_downstream():
+    rec = Recorder()
+    p = diamond(rec, b=rec.step("b", error=RuntimeError("boom")))
+    p.add("e", rec.step("e"), deps=["d"])
+    assert not p.run()
+    states = {name: s.state for name, s in p.steps.items()}
+    assert states == {"a": DONE, "b": FAILED, "c": DONE, "d": SKIPPED, "e": SKIPPED}
+    assert p.steps["b"].error == "boom"
+    assert p.steps["d"].error == "dependency failed"
+    assert ("start", "d") not in rec.events and ("start", "e") not in rec.events
+    assert p.failed() == ["b", "d", "e"]
+
+
+def cli_exit():
+    raise SystemExit(2)
+
+
+def bare_error():
+    raise KeyError()
+
+
+@pytest.mark.parametrize("fn, error", [
+    (lambda: False, "step reported failure"),
+    (cli_exit, "exited with status 2"),
+    (bare_error, "KeyError"),
+])
+def test_step_failure_modes(fn, error):
+    p = Pipeline("test")
+    p.add("x", fn)
+    p.add("y", lambda: None, deps=["x"])
+    assert not p.run()
+    assert p.steps["x"].state == FAILED and p.steps["x"].error == error
+    assert p.steps["y"].state == SKIPPED
+
+
+def test_health_check_gates_dependents():
+    ready = threading.Event()
+    p = Pipeline("test")
+    p.add("launch", lambda: threading.Timer(0.2, ready.set).start(), check=ready.is_set, check_timeout=5)
+    p.add("use", lambda: ready.is_set() or False, deps=["launch"])
+    assert p.run()
+
+    p = Pipeline("test")
+    p.add("launch", lambda: None, check=lambda: False, check_timeout=0.2)
+    p.add("use", lambda: None, deps=["launch"])
+    assert not p.run()
+    assert "health check timed out" in p.steps["launch"].error
+    assert p.steps["use"].state == SKIPPED
+
+
+def test_dependencies_must_be_declared_first():
+    p = Pipeline("test")
+    p.add("a", lambda: None)
+    with pytest.raises(ValueError, match="unknown step"):
+        p.add("b", lambda: None, deps=["c"])
+    with pytest.raises(ValueError, match="Duplicate"):
+        p.add("a", lambda: None)
+
+
+def test_only_reruns_selected_steps():
+    rec = Recorder()
+    p = diamond(rec)
+    assert p.run()
+    rec.events.clear()
+    assert p.run(only=["b", "d"])
+    assert [e for e in rec.events if e[0] == "start"] == [("start", "b"), ("start", "d")]
+
+
+def test_concurrent_run_is_rejected():
+    started, release = threading.Event(), threading.Event()
+    p = Pipeline("test")
+    p.add("slow", lambda: started.set() or release.wait(5))
+    t = threading.Thread(target=p.run)
+    t.start()
+    started.wait(5)
+    try:
+        assert p.running
+        with pytest.raises(RuntimeError, match="already running"):
+            p.run()
+    finally:
+        release.set()
+        t.join(5)
+    assert p.steps["slow"].state == DONE and not p.running
+    assert PENDING not in {s.state for s in p.steps.values()}
@@ -0,0 +1,36 @@
+import time
+
+from stend.core.managers.profiler import SkillProfiler
+
+
+class NoLock:
+    def __enter__(self):
+        raise AssertionError("lock taken")
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_unprofiled_skill_skips_the_lock():
+    profiler = SkillProfiler()
+    profiler.start("busy", invocations=5)
+    lock, profiler._lock = profiler._lock, NoLock()
+    assert profiler.session_for("other") is None
+    assert profiler.session_for("busy").target == "busy"
+    profiler._lock = lock
+
+
+def test_finished_session_is_dropped_from_dispatch():
+    profiler = SkillProfiler()
+    profiler.start("busy", seconds=0.05)
+    time.sleep(0.1)
+    assert profiler.session_for("busy") is None
+    assert not profiler.active and not profiler._targets
+
+
+def test_all_skills_session_matches_any_skill():
+    profiler = SkillProfiler()
+    session = profiler.start(invocations=1)
+    assert profiler.session_for("anything") is session
+    profiler.stop()
+    assert profiler.session_for("anything") is None
@@ -0,0 +1,37 @@
+import pytest
+
+from stend.core.managers.query_cache import extract_tables, is_read_only
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT replace(message, 'a', 'b') FROM chat_logs",
+    "SELECT * FROM chat_logs WHERE message = 'update me; then delete'",
+    'SELECT message AS "update", 1 AS replace FROM chat_logs',
+    "SELECT 1 -- delete\n",
+    "SELECT 1;",
+    "SELECT * FROM (SELECT 1)",
+    "WITH x AS (SELECT 1), y(a) AS MATERIALIZED (SELECT 2) SELECT * FROM x, y",
+    "WITH RECURSIVE c(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM c WHERE n < 5) SELECT n FROM c",
+])
+def test_read_only(sql):
+    assert is_read_only(sql)
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM chat_logs",
+    "REPLACE INTO t VALUES (1)",
+    "UPDATE t SET a = (SELECT 1)",
+    "WITH x AS (SELECT 1) DELETE FROM chat_logs",
+    "with x as (select 1), y as (select 2) insert into t select * from x",
+    "SELECT 1; DELETE FROM t",
+    "SELECT 'unterminated",
+    "SELECT (1",
+    "WITH x AS SELECT 1",
+])
+def test_not_read_only(sql):
+    assert not is_read_only(sql)
+
+
+def test_extract_tables_ignores_literals():
+    assert extract_tables("SELECT * FROM chat_logs c, friends f WHERE c.message = 'join open_link'") == \
+        ["chat_logs", "friends"]
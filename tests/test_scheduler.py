@@ -0,0 +1,44 @@
+import time
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from stend.core.managers.scheduler import Cron, Scheduler
+
+
+@pytest.mark.parametrize("expr, minutes", [
+    ("5/10 * * * *", {5, 15, 25, 35, 45, 55}),
+    ("*/20 * * * *", {0, 20, 40}),
+    ("10-20/5 * * * *", {10, 15, 20}),
+    ("7 * * * *", {7}),
+])
+def test_cron_steps(expr, minutes):
+    assert Cron(expr).minutes == minutes
+
+
+@pytest.mark.parametrize("expr", ["60 * * * *", "5/0 * * * *", "* * *"])
+def test_cron_rejects_bad_fields(expr):
+    with pytest.raises(ValueError):
+        Cron(expr)
+
+
+def test_runner_error_does_not_stop_the_timer():
+    fired = threading.Event()
+
+    def runner(job):
+        if job.handler == "broken":
+            raise RuntimeError("boom")
+        fired.set()
+        done = Future()
+        done.set_result(None)
+        return done
+
+    sched = Scheduler(runner=runner)
+    sched.start()
+    now = time.time()
+    bad = sched.add("skill", "broken", at=now)
+    sched.add("skill", "ok", at=now + 0.1)
+    assert fired.wait(2)
+    # The failed one-shot is dropped and its error kept
+    assert sched.get(bad.id) is None and bad.last_error == "boom" and not bad.running